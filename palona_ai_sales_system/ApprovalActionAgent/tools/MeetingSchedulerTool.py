@@ -1,17 +1,21 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 import os
+import sys
 from typing import Optional
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from llm.next_action import classify_next_action
+
 load_dotenv()
 
 class MeetingSchedulerTool(BaseTool):
     """
     Schedules a meeting with a prospect using Google Calendar API only.
     Accepts lead info, meeting details, and timezone (from LinkedInResearchTool output).
-    Uses LLM-based action detection for consistency with MessageActionTool.
+    Uses the same next-action classifier as MessageActionTool.
     """
     lead_email: str = Field(..., description="Email of the prospect to invite")
     lead_name: str = Field(..., description="Name of the prospect")
@@ -21,35 +25,8 @@ class MeetingSchedulerTool(BaseTool):
     duration_minutes: int = Field(default=30, description="Duration of the meeting in minutes")
     timezone: str = Field(default="UTC", description="Timezone for the meeting (e.g., 'America/Los_Angeles')")
 
-    def _llm_extract_next_step(self, message_body: str) -> str:
-        # Use OpenAI/Claude to classify the next action
-        import openai
-        import os
-        prompt = f"Given the following email, what is the next action for the sales rep? (send_email, schedule_meeting, follow_up, etc.)\nEmail:\n{message_body}\nAction:(return only the action label (e.g. send_email, schedule_meeting, follow_up, etc.))"
-        claude_key = os.getenv("CLAUDE_API_KEY")
-        if claude_key:
-            import anthropic
-            client = anthropic.Anthropic(api_key=claude_key)
-            response = client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=20,
-                temperature=0,
-                system="You are a helpful assistant.",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text.strip().split("\n")[0]
-        openai_key = os.getenv("OPENAI_API_KEY")
-        if openai_key:
-            client = openai.OpenAI(api_key=openai_key)
-            completion = client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "system", "content": "You are a helpful assistant."},
-                          {"role": "user", "content": prompt}],
-                max_tokens=20,
-                temperature=0
-            )
-            return completion.choices[0].message.content.strip().split("\n")[0]
-        return "send_email"
+    def _extract_next_step(self, message_body: str) -> str:
+        return classify_next_action(message_body, tool="MeetingSchedulerTool")["label"]
 
     def _schedule_google(self):
         try:
@@ -1,6 +1,7 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 import os
+import sys
 import json
 from typing import Literal
 from datetime import datetime, timedelta
@@ -8,12 +9,17 @@ from dotenv import load_dotenv
 from pathlib import Path
 import importlib.util
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from crm.repository import get_repository
+from llm.next_action import classify_next_action
+
 load_dotenv()
 
 class MessageActionTool(BaseTool):
     """
     Executes approved message actions (send email, update CRM, schedule meeting, etc.).
-    Reads message from a txt file, fetches recipient info from CRM, uses Gmail API by default, and uses LLM to extract next step.
+    Reads message from a txt file, fetches recipient info from CRM, uses Gmail API by default, and classifies the next step
+    locally (rules and a small linear model, with a fast LLM only for unclear messages).
     """
     message_file: str = Field(
         ..., description="Path to the message txt file (output of MessageDraftingTool.py)"
@@ -38,10 +44,7 @@ class MessageActionTool(BaseTool):
         return {"subject": subject, "body": body}
 
     def _get_recipient_info(self, lead_id: str):
-        data_file = Path(__file__).parent.parent.parent / 'data' / 'crm_data.json'
-        with open(data_file, 'r') as f:
-            crm_data = json.load(f)
-        lead = next((l for l in crm_data["crm_leads"] if l["record_id"] == lead_id), None)
+        lead = get_repository().get_lead(lead_id)
         if not lead:
             raise ValueError(f"Lead with id {lead_id} not found.")
         return {
@@ -123,35 +126,8 @@ class MessageActionTool(BaseTool):
             "from_email": os.getenv("FROM_EMAIL")
         }
 
-    def _llm_extract_next_step(self, message_body: str) -> str:
-        # Use OpenAI/Claude to classify the next action
-        import openai
-        import os
-        prompt = f"Given the following email, what is the next action for the sales rep? (send_email, schedule_meeting, follow_up, etc.)\nEmail:\n{message_body}\nAction:(return only the action label (e.g. send_email, schedule_meeting, follow_up, etc.))"
-        claude_key = os.getenv("CLAUDE_API_KEY")
-        if claude_key:
-            import anthropic
-            client = anthropic.Anthropic(api_key=claude_key)
-            response = client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=20,
-                temperature=0,
-                system="You are a helpful assistant.",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text.strip().split("\n")[0]
-        openai_key = os.getenv("OPENAI_API_KEY")
-        if openai_key:
-            client = openai.OpenAI(api_key=openai_key)
-            completion = client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "system", "content": "You are a helpful assistant."},
-                          {"role": "user", "content": prompt}],
-                max_tokens=20,
-                temperature=0
-            )
-            return completion.choices[0].message.content.strip().split("\n")[0]
-        return "send_email"
+    def _extract_next_step(self, message_body: str) -> str:
+        return classify_next_action(message_body, tool="MessageActionTool")["label"]
 
     def _update_crm(self, sent_message: str, lead_id: str, sent_date: str, next_follow_up: str = None):
         # Dynamically import CRMUpdateTool
@@ -201,8 +177,8 @@ class MessageActionTool(BaseTool):
                 success = self._send_email_gmail_api(message, recipient)
             else:
                 success = self._send_email_smtp(message, recipient)
-            # LLM extract next step
-            next_action = self._llm_extract_next_step(message["body"])
+            # Classify next step
+            next_action = self._extract_next_step(message["body"])
             # Update CRM
             crm_update_result = self._update_crm(
                 sent_message=message["body"],
@@ -0,0 +1,54 @@
+from agency_swarm.tools import BaseTool
+from pydantic import Field
+import os
+import sys
+import json
+from typing import Dict, List
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from crm.interactions import build_interaction_update
+from crm.repository import get_repository
+
+load_dotenv()
+
+class CRMBatchUpdateTool(BaseTool):
+    """
+    Logs many sent messages to the mock CRM system in one transaction (e.g. after a campaign).
+    Each entry is applied like CRMUpdateTool (message_log, last_contact_date, next_follow_up, interaction_count),
+    but the whole batch shares one CRM load and one write, and a status is reported per record.
+    """
+    updates: List[Dict] = Field(
+        ..., description="List of updates, each with record_id, email_message, email_sent_date (YYYY-MM-DD) and optional next_follow_up (YYYY-MM-DD)"
+    )
+
+    def run(self):
+        try:
+            batch = []
+            for entry in self.updates:
+                def build(lead, entry=entry):
+                    return build_interaction_update(
+                        lead,
+                        entry.get("email_message"),
+                        entry.get("email_sent_date"),
+                        entry.get("next_follow_up")
+                    )
+                batch.append((str(entry.get("record_id") or ""), build))
+            results = get_repository().update_leads(batch)
+            messages = {
+                "success": "Lead updated successfully",
+                "no_update": "No fields updated (missing or empty info)",
+                "not_found": "record_id not found"
+            }
+            for result in results:
+                result.setdefault("message", messages.get(result["status"], ""))
+            return json.dumps({
+                "status": "success",
+                "updated": sum(1 for r in results if r["status"] == "success"),
+                "results": results
+            })
+        except Exception as e:
+            return json.dumps({
+                "status": "error",
+                "message": str(e)
+            })
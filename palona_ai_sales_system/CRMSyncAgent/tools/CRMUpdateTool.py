@@ -1,20 +1,25 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 import os
+import sys
 import json
-from datetime import datetime, timedelta
+import time
 from dotenv import load_dotenv
-from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from crm.interactions import build_interaction_update
+from crm.repository import CRMVersionConflict, get_repository
 
 load_dotenv()
 
-# Robust path resolution for crm_data.json
-CRM_DATA_PATH = str(Path(__file__).parent.parent.parent / 'data' / 'crm_data.json')
+# How many times to re-read and re-apply an update that lost a race with a concurrent writer
+MAX_UPDATE_ATTEMPTS = 5
 
 class CRMUpdateTool(BaseTool):
     """
     Updates the mock CRM system (crm_data.json) after actions are taken.
     Adds to message_log, updates last_contact_date, next_follow_up, increments interaction_count, and handles missing info gracefully.
+    Updates are versioned: if another session changes the lead concurrently, the update is recomputed and retried.
     """
     record_id: str = Field(
         ..., description="Lead record_id to update"
@@ -29,6 +34,10 @@ class CRMUpdateTool(BaseTool):
         default=None, description="Next follow-up date (YYYY-MM-DD, optional)"
     )
 
+    def _build_update(self, lead):
+        """Compute the field changes and message_log entry for a lead, based on its current state"""
+        return build_interaction_update(lead, self.email_message, self.email_sent_date, self.next_follow_up)
+
     def run(self):
         try:
             # Validate record_id
@@ -37,66 +46,44 @@ class CRMUpdateTool(BaseTool):
                     "status": "error",
                     "message": "record_id is required"
                 })
-            # Path to crm_data.json
-            data_file = CRM_DATA_PATH
-            with open(data_file, 'r') as f:
-                crm_data = json.load(f)
-            updated = False
-            found = False
-            for lead in crm_data["crm_leads"]:
-                if lead["record_id"] == self.record_id:
-                    found = True
-                    # Add to message_log and update last_contact_date only if both email_message and email_sent_date are provided
-                    if self.email_message and self.email_sent_date:
-                        if "message_log" not in lead or not isinstance(lead["message_log"], list):
-                            lead["message_log"] = []
-                        lead["message_log"].append({
-                            "message": self.email_message,
-                            "timestamp": self.email_sent_date
+            repo = get_repository()
+            for attempt in range(MAX_UPDATE_ATTEMPTS):
+                lead = repo.get_lead(self.record_id)
+                if not lead:
+                    return json.dumps({
+                        "status": "error",
+                        "message": f"record_id {self.record_id} not found"
+                    })
+                # Read the version before the fields it guards
+                version = lead.get("version", 0)
+                fields, message = self._build_update(lead)
+                if not fields and message is None:
+                    return json.dumps({
+                        "status": "no_update",
+                        "message": "No fields updated (missing or empty info)",
+                        "record_id": self.record_id
+                    })
+                try:
+                    if not repo.update_lead(self.record_id, fields, message, expected_version=version):
+                        # The lead was removed between the read and the write
+                        return json.dumps({
+                            "status": "error",
+                            "message": f"record_id {self.record_id} not found, update not applied"
                         })
-                        lead["last_contact_date"] = self.email_sent_date
-                        updated = True
-                        # Update next_follow_up if provided, else auto-calc
-                        next_follow_up_val = self.next_follow_up
-                        if not next_follow_up_val:
-                            try:
-                                dt = datetime.strptime(self.email_sent_date, "%Y-%m-%d")
-                                next_dt = dt + timedelta(days=7)
-                                next_follow_up_val = next_dt.strftime("%Y-%m-%d")
-                            except Exception:
-                                next_follow_up_val = None
-                        if next_follow_up_val:
-                            lead["next_follow_up"] = next_follow_up_val
-                            updated = True
-                    # If only next_follow_up is provided, update it
-                    elif self.next_follow_up:
-                        lead["next_follow_up"] = self.next_follow_up
-                        updated = True
-                    # Increment interaction_count if any update
-                    if updated and "interaction_count" in lead:
-                        lead["interaction_count"] = int(lead["interaction_count"]) + 1
-                    break
-            if not found:
-                return json.dumps({
-                    "status": "error",
-                    "message": f"record_id {self.record_id} not found"
-                })
-            if updated:
-                with open(data_file, 'w') as f:
-                    json.dump(crm_data, f, indent=4)
-                return json.dumps({
-                    "status": "success",
-                    "message": "Lead updated successfully",
-                    "record_id": self.record_id
-                })
-            else:
-                return json.dumps({
-                    "status": "no_update",
-                    "message": "No fields updated (missing or empty info)",
-                    "record_id": self.record_id
-                })
+                    return json.dumps({
+                        "status": "success",
+                        "message": "Lead updated successfully",
+                        "record_id": self.record_id
+                    })
+                except CRMVersionConflict:
+                    # Another writer got there first; back off briefly and recompute from the fresh lead
+                    time.sleep(0.01 * (attempt + 1))
+            return json.dumps({
+                "status": "error",
+                "message": f"record_id {self.record_id} was modified concurrently, please retry"
+            })
         except Exception as e:
             return json.dumps({
                 "status": "error",
                 "message": str(e)
-            }) 
\ No newline at end of file
+            }) 
@@ -3,9 +3,14 @@ from pydantic import Field
 import json
 from pathlib import Path
 import os
+import sys
+from typing import Optional
 from datetime import datetime
 from dotenv import load_dotenv
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from crm.repository import get_repository
+
 load_dotenv()
 
 class CommunicationHistoryTool(BaseTool):
@@ -18,21 +23,28 @@ class CommunicationHistoryTool(BaseTool):
         ...,
         description="The ID of the lead to retrieve communication history for"
     )
+    message_limit: Optional[int] = Field(
+        default=None,
+        description="Number of most recent messages to return from the message log (optional, all messages by default)"
+    )
+    since: Optional[str] = Field(
+        default=None,
+        description="Only return messages sent on or after this date (YYYY-MM-DD, optional)"
+    )
+    until: Optional[str] = Field(
+        default=None,
+        description="Only return messages sent on or before this date (YYYY-MM-DD, optional)"
+    )
     
     def run(self):
         """
         Retrieve communication-related fields for the specified lead, including notes, last contact date, interaction count, preferred contact method, timezone, and message log.
+        Only the requested slice of the message log (most recent message_limit messages, optionally within since/until) is read.
         """
         try:
-            # Direct path to the CRM data file
-            data_file = Path(__file__).parent.parent.parent / 'data' / 'crm_data.json'
-            
-            # Read the CRM data
-            with open(data_file, 'r') as f:
-                crm_data = json.load(f)
-            
             # Get lead information
-            lead = next((l for l in crm_data["crm_leads"] if l["record_id"] == self.lead_id), None)
+            repo = get_repository()
+            lead = repo.get_lead(self.lead_id)
             if not lead:
                 return {
                     "status": "error",
@@ -46,7 +58,7 @@ class CommunicationHistoryTool(BaseTool):
                 "interaction_count": lead["interaction_count"],
                 "preferred_contact_method": lead["preferred_contact_method"],
                 "timezone": lead["timezone"],
-                "message_log": lead["message_log"]
+                "message_log": repo.get_messages(self.lead_id, limit=self.message_limit, start=self.since, end=self.until)
             }
             
             return {
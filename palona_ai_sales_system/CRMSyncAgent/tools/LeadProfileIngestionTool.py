@@ -3,25 +3,51 @@ from pydantic import Field
 import json
 from pathlib import Path
 import os
+import sys
+from typing import Dict, List, Optional
 from datetime import datetime
 import streamlit as st
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from crm.repository import get_repository
+
 class LeadProfileIngestionTool(BaseTool):
     """
     Tool for ingesting and managing lead profiles from the CRM system.
-    This tool handles reading lead data and updating profiles. If selected_lead is provided, returns info for that lead; otherwise, returns all leads and deals.
+    This tool handles reading lead data and updating profiles. If selected_lead is provided, returns info for that lead; otherwise, returns leads (optionally filtered, sorted, projected to a few fields and paged) and deals.
     """
     selected_lead: str = Field(
         default=None,
         description="The selected lead in format 'First Last - Company'. If provided, returns info for this lead only. If not, returns all leads and deals."
     )
+    limit: Optional[int] = Field(
+        default=None,
+        description="Maximum number of leads to return when listing leads (all leads if not provided)"
+    )
+    offset: int = Field(
+        default=0,
+        description="Number of leads to skip when listing leads, for paging through the CRM"
+    )
+    fields: Optional[List[str]] = Field(
+        default=None,
+        description="Lead fields to return when listing leads, e.g. ['first_name', 'last_name', 'company_name'] (all fields if not provided)"
+    )
+    filters: Optional[Dict[str, str]] = Field(
+        default=None,
+        description="Filters to apply when listing leads; supported keys are 'sales_rep', 'status' and 'segment'"
+    )
+    sort: Optional[str] = Field(
+        default=None,
+        description="Lead field to sort by when listing leads, prefixed with '-' for descending order (e.g. '-became_a_lead_date')"
+    )
+    include_deals: bool = Field(
+        default=True,
+        description="Whether to include deals alongside the listed leads"
+    )
 
     def run(self):
         try:
-            # Direct path to the CRM data file
-            data_file = Path(__file__).parent.parent.parent / 'data' / 'crm_data.json'
-            with open(data_file, 'r') as f:
-                crm_data = json.load(f)
+            repo = get_repository()
 
             if self.selected_lead:
                 # Parse the selected lead string
@@ -31,26 +57,23 @@ class LeadProfileIngestionTool(BaseTool):
                 last_name = name_split[1] if len(name_split) > 1 else ""
                 company_name = company_name.strip()
 
-                # Find the matching lead (original logic)
+                # Find the matching lead via the (first, last, company) index
                 lead_info = None
-                for lead in crm_data["crm_leads"]:
-                    if (lead["first_name"].lower() == first_name.lower() and 
-                        lead["last_name"].lower() == last_name.lower() and 
-                        lead["company_name"].lower() == company_name.lower()):
-                        lead_info = {
-                            "lead_id": lead["record_id"],
-                            "linkedin_url": lead.get("linkedin_url", ""),
-                            "email": lead.get("email", ""),
-                            "timezone": lead.get("timezone", "America/Los_Angeles"),
-                            "first_name": lead["first_name"],
-                            "last_name": lead["last_name"],
-                            "company_name": lead["company_name"],
-                            "job_title": lead.get("job_title", ""),
-                            "phone": lead.get("phone", ""),
-                            "lead_score": lead.get("lead_score", 0),
-                            "customer_segment": lead.get("customer_segment", "")
-                        }
-                        break
+                lead = repo.find_lead(first_name, last_name, company_name)
+                if lead:
+                    lead_info = {
+                        "lead_id": lead["record_id"],
+                        "linkedin_url": lead.get("linkedin_url", ""),
+                        "email": lead.get("email", ""),
+                        "timezone": lead.get("timezone", "America/Los_Angeles"),
+                        "first_name": lead["first_name"],
+                        "last_name": lead["last_name"],
+                        "company_name": lead["company_name"],
+                        "job_title": lead.get("job_title", ""),
+                        "phone": lead.get("phone", ""),
+                        "lead_score": lead.get("lead_score", 0),
+                        "customer_segment": lead.get("customer_segment", "")
+                    }
 
                 if not lead_info:
                     return {
@@ -65,12 +88,16 @@ class LeadProfileIngestionTool(BaseTool):
                     "lead_info": lead_info
                 }
             else:
-                # Return all leads and deals
-                return {
+                # Return the requested page of leads (total counts every lead matching the filters), plus deals
+                leads, total = repo.query_leads(self.fields, self.filters, self.sort, self.limit, self.offset)
+                result = {
                     "status": "success",
-                    "leads": crm_data["crm_leads"],
-                    "deals": crm_data["deals"]
+                    "leads": leads,
+                    "total": total
                 }
+                if self.include_deals:
+                    result["deals"] = repo.get_deals()
+                return result
         except Exception as e:
             return {
                 "status": "error",
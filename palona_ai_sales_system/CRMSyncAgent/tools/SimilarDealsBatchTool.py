@@ -0,0 +1,51 @@
+from agency_swarm.tools import BaseTool
+from pydantic import Field
+import os
+import sys
+import json
+from typing import Dict, List, Literal
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from crm.deals import similar_deals_batch
+from crm.repository import get_repository
+from crm.semantic_deals import semantic_similar_deals_batch
+
+load_dotenv()
+
+class SimilarDealsBatchTool(BaseTool):
+    """
+    Identifies similar past deals for many leads at once (e.g. a rep's whole queue before drafting).
+    Each query is matched like SimilarDealsTool, but all of them are scored in one pass over the deals,
+    and the top matches are returned per query, in query order.
+    """
+    queries: List[Dict] = Field(
+        ..., description="List of queries, each with industry and optional deal_size (plus any other SimilarDealsTool criteria)"
+    )
+    search: Literal["keyword", "semantic"] = Field(
+        default="keyword", description="Match deals by industry keywords (default) or, opt-in, by semantic similarity"
+    )
+    k: int = Field(
+        default=5, description="Number of matches per query"
+    )
+
+    def run(self):
+        try:
+            queries = [
+                (query.get("industry") or "", {key: value for key, value in query.items() if key != "industry"})
+                for query in self.queries
+            ]
+            search = semantic_similar_deals_batch if self.search == "semantic" else similar_deals_batch
+            matches = search(get_repository(), queries, k=self.k)
+            return json.dumps({
+                "status": "success",
+                "results": [
+                    {"industry": industry, "criteria": criteria, "matches": query_matches}
+                    for (industry, criteria), query_matches in zip(queries, matches)
+                ]
+            })
+        except Exception as e:
+            return json.dumps({
+                "status": "error",
+                "message": str(e)
+            })
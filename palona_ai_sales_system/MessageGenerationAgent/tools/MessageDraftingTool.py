@@ -1,15 +1,29 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
+from typing import Dict, Optional
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
-import openai
 import json
-import importlib.util
-import requests
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from crm.deals import similar_deals
+from crm.repository import get_repository
+from llm.gateway import acomplete, complete, provider_options, stream
 
 load_dotenv()
 
+# Per provider, as before the gateway: the Claude request had no system prompt, OpenAI drafts were capped at 500 tokens
+MESSAGE_LLM_OPTIONS = {
+    "claude": {"max_tokens": 1000, "temperature": 0.7},
+    "openai": {
+        "max_tokens": 500,
+        "temperature": 0.7,
+        "system": "You are an expert sales copywriter specializing in personalized B2B outreach messages."
+    }
+}
+
 class MessageDraftingTool(BaseTool):
     """
     Generates a personalized sales message using GPT-4/Claude, based on:
@@ -28,16 +42,10 @@ class MessageDraftingTool(BaseTool):
     lead_id: str = Field(
         ..., description="Lead ID to reference communication history and CRM segmentation"
     )
-
-    def _get_openai_key(self) -> str:
-        """Get OpenAI API key from environment"""
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OpenAI API key not found in environment")
-        return api_key
-
-    def _get_claude_api_key(self):
-        return os.getenv("CLAUDE_API_KEY")
+    similar_deal: Optional[Dict] = Field(
+        default=None,
+        description="Similar deal to reference, e.g. a match from SimilarDealsBatchTool when drafting a whole queue; looked up when omitted"
+    )
 
     def _read_input_file(self, filename: str) -> str:
         """Read content from a file in the data/outputs directory"""
@@ -49,10 +57,7 @@ class MessageDraftingTool(BaseTool):
             return f"Error reading {filename}: {str(e)}"
 
     def _get_lead_info(self, lead_id: str):
-        data_file = Path(__file__).parent.parent.parent / 'data' / 'crm_data.json'
-        with open(data_file, 'r') as f:
-            crm_data = json.load(f)
-        lead = next((l for l in crm_data["crm_leads"] if l["record_id"] == lead_id), None)
+        lead = get_repository().get_lead(lead_id)
         if not lead:
             raise ValueError(f"Lead with id {lead_id} not found.")
         return {
@@ -66,20 +71,12 @@ class MessageDraftingTool(BaseTool):
         }
 
     def _get_similar_deal(self, industry: str, deal_size):
-        # Dynamically import SimilarDealsTool
-        tool_path = Path(__file__).parent.parent.parent / 'CRMSyncAgent' / 'tools' / 'SimilarDealsTool.py'
-        spec = importlib.util.spec_from_file_location("SimilarDealsTool", tool_path)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        SimilarDealsTool = getattr(module, "SimilarDealsTool")
-        # Prepare criteria
+        # Same (default keyword) search as SimilarDealsTool, without re-importing the tool for every draft
         criteria = {"deal_size": deal_size} if deal_size else {}
-        tool = SimilarDealsTool(industry=industry, criteria=criteria)
-        result = tool.run()
         try:
-            result_json = json.loads(result)
-            if result_json["status"] == "success" and result_json["matches"]:
-                return result_json["matches"][0]  # Top match
+            matches = similar_deals(get_repository(), industry, criteria, k=1)
+            if matches:
+                return matches[0]  # Top match
         except Exception:
             pass
         return None
@@ -197,88 +194,71 @@ The message should be ready to send, with no additional formatting needed.
 """
         return prompt
 
-    def _call_claude(self, prompt: str) -> str:
-        api_key = self._get_claude_api_key()
-        if not api_key:
-            raise ValueError("CLAUDE_API_KEY not found in environment variables.")
-        headers = {
-            "x-api-key": api_key,
-            "anthropic-version": "2023-06-01",
-            "content-type": "application/json"
-        }
-        data = {
-            "model": "claude-3-opus-20240229",
-            "max_tokens": 1000,
-            "temperature": 0.7,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ]
-        }
-        response = requests.post("https://api.anthropic.com/v1/messages", headers=headers, json=data)
-        response.raise_for_status()
-        result = response.json()
-        return result["content"][0]["text"].strip()
-
-    def _call_openai(self, prompt: str) -> str:
-        api_key = self._get_openai_key()
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert sales copywriter specializing in personalized B2B outreach messages."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=500
-        )
-        return response.choices[0].message.content.strip()
+    @staticmethod
+    def parse_message(message: str) -> dict:
+        """Split a generated message into subject (first paragraph) and body"""
+        parts = message.split("\n\n", 1)
+        subject = parts[0].replace("Subject:", "").strip()
+        body = parts[1] if len(parts) > 1 else message
+        return {"subject": subject, "body": body}
 
     def _generate_message(self, prompt: str) -> dict:
         try:
-            if self._get_claude_api_key():
-                message = self._call_claude(prompt)
-            else:
-                message = self._call_openai(prompt)
-            parts = message.split("\n\n", 1)
-            subject = parts[0].replace("Subject:", "").strip()
-            body = parts[1] if len(parts) > 1 else message
-            return {
-                "subject": subject,
-                "body": body,
-                "recipient": self.prospect_name,
-                "company": self.company_name
-            }
+            message = complete(prompt, "large", **provider_options(MESSAGE_LLM_OPTIONS), tool="MessageDraftingTool")
+            return self._message(message)
+        except Exception as e:
+            raise Exception(f"Error generating message: {str(e)}")
+
+    async def _agenerate_message(self, prompt: str) -> dict:
+        try:
+            message = await acomplete(prompt, "large", **provider_options(MESSAGE_LLM_OPTIONS), tool="MessageDraftingTool")
+            return self._message(message)
         except Exception as e:
             raise Exception(f"Error generating message: {str(e)}")
 
+    def _message(self, message: str) -> dict:
+        return {
+            **self.parse_message(message),
+            "recipient": self.prospect_name,
+            "company": self.company_name
+        }
+
+    def _safe_names(self):
+        return self.company_name.replace(' ', '_').lower(), self.prospect_name.replace(' ', '_').lower()
+
+    def _build_prompt(self) -> str:
+        """Read the saved report and communication summary, look up the lead and a similar deal, and build the prompt"""
+        safe_company, safe_name = self._safe_names()
+        report_summary = self._read_input_file(f'report_{safe_company}_{safe_name}.txt')
+        comm_summary = self._read_input_file(f'comm_{self.lead_id}.txt')
+        lead_info = self._get_lead_info(self.lead_id)
+        similar_deal = self.similar_deal or self._get_similar_deal(lead_info["industry"], lead_info["deal_size"])
+        return self._create_message_prompt(report_summary, comm_summary, similar_deal, lead_info)
+
+    def _save_message(self, message: dict) -> Path:
+        safe_company, safe_name = self._safe_names()
+        outputs_dir = Path(__file__).parent.parent.parent / 'data' / 'outputs'
+        outputs_dir.mkdir(parents=True, exist_ok=True)
+        output_file = outputs_dir / f'message_{safe_company}_{safe_name}.txt'
+        with open(output_file, 'w') as f:
+            f.write(f"Subject: {message['subject']}\n\n")
+            f.write(message['body'])
+        return output_file
+
     def run(self):
         """
         Generates a personalized sales message based on sales preparation report, communication summary, recent similar deal, and lead segmentation.
         Reads from saved text files and saves the generated message.
         """
         try:
-            # Read input files
-            safe_company = self.company_name.replace(' ', '_').lower()
-            safe_name = self.prospect_name.replace(' ', '_').lower()
-            
-            report_summary = self._read_input_file(f'report_{safe_company}_{safe_name}.txt')
-            comm_summary = self._read_input_file(f'comm_{self.lead_id}.txt')
-            lead_info = self._get_lead_info(self.lead_id)
-            similar_deal = self._get_similar_deal(lead_info["industry"], lead_info["deal_size"])
-            
             # Create the prompt
-            prompt = self._create_message_prompt(report_summary, comm_summary, similar_deal, lead_info)
+            prompt = self._build_prompt()
             
             # Generate the message
             message = self._generate_message(prompt)
             
             # Save output
-            outputs_dir = Path(__file__).parent.parent.parent / 'data' / 'outputs'
-            outputs_dir.mkdir(parents=True, exist_ok=True)
-            output_file = outputs_dir / f'message_{safe_company}_{safe_name}.txt'
-            with open(output_file, 'w') as f:
-                f.write(f"Subject: {message['subject']}\n\n")
-                f.write(message['body'])
+            output_file = self._save_message(message)
             
             return {
                 "status": "success",
@@ -292,6 +272,36 @@ The message should be ready to send, with no additional formatting needed.
                 "message": str(e)
             }
 
+    async def arun(self):
+        """Async run(), generating the message with acomplete"""
+        try:
+            prompt = self._build_prompt()
+            message = await self._agenerate_message(prompt)
+            output_file = self._save_message(message)
+            return {
+                "status": "success",
+                "message": message,
+                "output_file": str(output_file)
+            }
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+
+    def run_stream(self):
+        """
+        Like run(), but yields the raw message text (subject line first) as the model writes it, for the UI to render
+        live; the message is saved once complete. Errors are raised rather than returned.
+        Parse the full text with parse_message.
+        """
+        prompt = self._build_prompt()
+        chunks = []
+        for chunk in stream(prompt, "large", **provider_options(MESSAGE_LLM_OPTIONS), tool="MessageDraftingTool"):
+            chunks.append(chunk)
+            yield chunk
+        self._save_message(self.parse_message("".join(chunks)))
+
 if __name__ == "__main__":
     # Test with actual output files and CRM data
     tool = MessageDraftingTool(
@@ -1,13 +1,26 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 import os
+import sys
 import json
 from typing import Optional
 from pathlib import Path
 from dotenv import load_dotenv
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from crm.repository import get_repository
+from llm.gateway import acomplete, available, complete, provider_options, stream
+
 load_dotenv()
 
+# Most recent messages included in the summary prompt by default (None: the whole message log)
+SUMMARY_MESSAGE_LIMIT = None
+# Per provider (the Claude request never had a system message)
+SUMMARY_LLM_OPTIONS = {
+    "claude": {"max_tokens": 600, "temperature": 0.2},
+    "openai": {"max_tokens": 600, "temperature": 0.2, "system": "You are a helpful sales research assistant."}
+}
+
 class CommunicationSummaryTool(BaseTool):
     """
     Combines 'notes' and 'message_log' fields from crm_data.json for a given lead, plus an optional uploaded communication document, and optionally a sales prep report, and generates a <300-word, natural language summary for sales preparation. Output is plain text, not JSON.
@@ -23,28 +36,27 @@ class CommunicationSummaryTool(BaseTool):
         default=None,
         description="Text content of the sales prep report generated by ReportGenerationTool, if any"
     )
+    message_limit: Optional[int] = Field(
+        default=SUMMARY_MESSAGE_LIMIT,
+        description="Number of most recent messages to include in the summary (optional, all messages by default)"
+    )
 
     def _get_crm_communications(self) -> str:
-        data_file = Path(__file__).parent.parent.parent / 'data' / 'crm_data.json'
         try:
-            with open(data_file, 'r') as f:
-                crm_data = json.load(f)
-            lead = next((l for l in crm_data["crm_leads"] if l["record_id"] == self.lead_id), None)
+            repo = get_repository()
+            lead = repo.get_lead(self.lead_id)
             if not lead:
                 return ""
             notes = lead.get("notes", "")
-            message_log = lead.get("message_log", [])
+            message_log = repo.get_messages(self.lead_id, limit=self.message_limit)
             messages = "\n".join([m["message"] if isinstance(m, dict) and "message" in m else str(m) for m in message_log])
             combined = f"Notes: {notes}\nMessages: {messages}"
             return combined.strip()
         except Exception:
             return ""
 
-    def _llm_generate_summary(self, communications: str, uploaded_document: Optional[str], report_text: Optional[str]) -> str:
-        import openai
-        import anthropic
-        import os
-        prompt = f"""
+    def _summary_prompt(self, communications: str, uploaded_document: Optional[str], report_text: Optional[str]) -> str:
+        return f"""
 You are a sales enablement strategist. Your task is to review the provided communication history, uploaded document (if available), and sales prep report (if available), and generate a concise, insightful briefing for a sales representative.
 
 Your summary must be written in natural language prose (no lists, bullet points, tags, or JSON), limited to 300 words maximum. It should be suitable for inclusion in a CRM or internal briefing note, and maintain a consistent, professional tone throughout—avoid any conversational phrases, greetings, or motivational language.
@@ -77,45 +89,23 @@ Do not include personal touches like "Hi," "Hope this helps," or "You've got thi
 
 Write clearly, insightfully, and professionally.
 """
-        claude_key = os.getenv("CLAUDE_API_KEY")
-        if claude_key:
-            client = anthropic.Anthropic(api_key=claude_key)
-            response = client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=600,
-                temperature=0.2,
-                system="You are a helpful sales research assistant.",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text.strip()
-        openai_key = os.getenv("OPENAI_API_KEY")
-        if openai_key:
-            client = openai.OpenAI(api_key=openai_key)
-            try:
-                completion = client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[{"role": "system", "content": "You are a helpful sales research assistant."},
-                              {"role": "user", "content": prompt}],
-                    max_tokens=600,
-                    temperature=0.2
-                )
-                return completion.choices[0].message.content.strip()
-            except openai.OpenAIError as e:
-                if hasattr(e, 'status_code') and e.status_code == 404:
-                    # Try gpt-3.5-turbo as fallback
-                    completion = client.chat.completions.create(
-                        model="gpt-3.5-turbo",
-                        messages=[{"role": "system", "content": "You are a helpful sales research assistant."},
-                                  {"role": "user", "content": prompt}],
-                        max_tokens=600,
-                        temperature=0.2
-                    )
-                    return completion.choices[0].message.content.strip()
-                else:
-                    raise
+
+    def _fallback_summary(self, communications: str, uploaded_document: Optional[str], report_text: Optional[str]) -> str:
         # Fallback: concatenate text
         return f"COMMUNICATIONS: {communications}\nUPLOADED: {uploaded_document or ''}\nREPORT: {report_text or ''}"
 
+    def _llm_generate_summary(self, communications: str, uploaded_document: Optional[str], report_text: Optional[str]) -> str:
+        if available():
+            prompt = self._summary_prompt(communications, uploaded_document, report_text)
+            return complete(prompt, "large", **provider_options(SUMMARY_LLM_OPTIONS), tool="CommunicationSummaryTool")
+        return self._fallback_summary(communications, uploaded_document, report_text)
+
+    def _save_summary(self, summary: str):
+        outputs_dir = Path(__file__).parent.parent.parent / 'data' / 'outputs'
+        outputs_dir.mkdir(parents=True, exist_ok=True)
+        with open(outputs_dir / f'comm_{self.lead_id}.txt', 'w') as f:
+            f.write(summary)
+
     def run(self):
         """
         Combines CRM notes, message log, optional uploaded document, and optional sales prep report, then generates a <300-word natural language summary using an LLM. Returns plain text only. Also saves the output to data/outputs/comm_{lead_id}.txt.
@@ -124,10 +114,38 @@ Write clearly, insightfully, and professionally.
             communications = self._get_crm_communications()
             summary = self._llm_generate_summary(communications, self.uploaded_document, self.report_text)
             # Save output
-            outputs_dir = Path(__file__).parent.parent.parent / 'data' / 'outputs'
-            outputs_dir.mkdir(parents=True, exist_ok=True)
-            with open(outputs_dir / f'comm_{self.lead_id}.txt', 'w') as f:
-                f.write(summary)
+            self._save_summary(summary)
             return summary
         except Exception as e:
-            return f"Error generating communication summary: {str(e)}" 
\ No newline at end of file
+            return f"Error generating communication summary: {str(e)}"
+
+    async def arun(self):
+        """Async run(), generating the summary with acomplete"""
+        try:
+            communications = self._get_crm_communications()
+            if available():
+                prompt = self._summary_prompt(communications, self.uploaded_document, self.report_text)
+                summary = await acomplete(prompt, "large", **provider_options(SUMMARY_LLM_OPTIONS), tool="CommunicationSummaryTool")
+            else:
+                summary = self._fallback_summary(communications, self.uploaded_document, self.report_text)
+            self._save_summary(summary)
+            return summary
+        except Exception as e:
+            return f"Error generating communication summary: {str(e)}"
+
+    def run_stream(self):
+        """
+        Like run(), but yields the summary in chunks as the model writes it, for the UI to render live; the summary is
+        saved once complete. Errors are raised rather than returned.
+        """
+        communications = self._get_crm_communications()
+        if not available():
+            chunks = [self._fallback_summary(communications, self.uploaded_document, self.report_text)]
+            yield chunks[0]
+        else:
+            prompt = self._summary_prompt(communications, self.uploaded_document, self.report_text)
+            chunks = []
+            for chunk in stream(prompt, "large", **provider_options(SUMMARY_LLM_OPTIONS), tool="CommunicationSummaryTool"):
+                chunks.append(chunk)
+                yield chunk
+        self._save_summary("".join(chunks))
@@ -1,204 +1,317 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 import os
+import sys
 import json
+import asyncio
 import requests
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
 from pathlib import Path
-from bs4 import BeautifulSoup
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote_plus
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from crm.repository import get_repository
+from llm.compaction import compact_sources
+from llm.gateway import acomplete, available, complete, provider_options
+from web.cache import afetch_json, afetch_text, fetch_json, fetch_text
+from web.parsing import iter_bing_results, parse_homepage, parse_rss_items
+
 load_dotenv()
 
+BROWSER_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+# complete() options per provider; only the OpenAI request carries a system prompt
+SUMMARY_LLM_OPTIONS = {
+    "claude": {"max_tokens": 1000, "temperature": 0.2},
+    "openai": {"max_tokens": 1000, "temperature": 0.2, "system": "You are a helpful sales research assistant."}
+}
+# Seconds to wait for a source's server to accept the connection
+RESEARCH_CONNECT_TIMEOUT = float(os.getenv("RESEARCH_CONNECT_TIMEOUT", "3.05"))
+# Longest gap in seconds between bytes of a source's response, so one hung endpoint cannot stall the research
+SOURCE_READ_TIMEOUTS = {"wikipedia": 8, "newsapi": 8, "google_news": 8, "duckduckgo": 5, "bing": 8, "website": 10}
+# Only the start of the company homepage is downloaded; meta tags, links and about text are rarely further in
+WEBSITE_MAX_BYTES = int(os.getenv("WEBSITE_MAX_BYTES", str(1024 * 1024)))
+# What each source contributes to the summary when it fails, times out or is skipped (in _summary_prompt order;
+# the website stage yields both website_info and web_presence)
+EMPTY_SOURCES = {"wikipedia": {}, "newsapi": [], "google_news": [], "duckduckgo": None,
+                 "bing": {"search_results": [], "company_url": None}, "website": ({}, {})}
+
+
+def _source_timeout(name: str) -> tuple:
+    return RESEARCH_CONNECT_TIMEOUT, SOURCE_READ_TIMEOUTS[name]
+
+
 class CompanyResearchTool(BaseTool):
     """
     Gathers and synthesizes company information from multiple free sources (Wikipedia, NewsAPI, DuckDuckGo, Bing Search, Google News RSS, company website meta tags).
     Uses an LLM (Claude or OpenAI) to generate a 500-word, natural language summary for sales preparation, broken into key areas.
+    The sources are fetched concurrently, each with its own connect/read timeout; arun() is the asyncio variant.
     """
     company_name: str = Field(
         ..., description="Name of the company to research"
     )
+    include_timings: bool = Field(
+        default=False, description="Return JSON with the summary and per-source timings instead of the summary text"
+    )
     
+    def _wikipedia_search_url(self) -> str:
+        return f"https://en.wikipedia.org/w/api.php?action=query&list=search&srsearch={self.company_name}&format=json"
+
+    def _wikipedia_content_url(self, page_id) -> str:
+        return f"https://en.wikipedia.org/w/api.php?action=query&prop=extracts&pageids={page_id}&format=json&exintro=1"
+
+    def _parse_wikipedia_page(self, content_data: Dict, page_id) -> Dict:
+        return {
+            "title": content_data["query"]["pages"][str(page_id)]["title"],
+            "extract": content_data["query"]["pages"][str(page_id)]["extract"]
+        }
+
     def _get_wikipedia_data(self) -> Dict:
         """Fetch company data from Wikipedia API"""
-        search_url = f"https://en.wikipedia.org/w/api.php?action=query&list=search&srsearch={self.company_name}&format=json"
-        response = requests.get(search_url)
-        response.raise_for_status()
-        search_data = response.json()
+        search_data = fetch_json("wikipedia", self._wikipedia_search_url(), timeout=_source_timeout("wikipedia"))
         if not search_data["query"]["search"]:
             return {}
         page_id = search_data["query"]["search"][0]["pageid"]
-        content_url = f"https://en.wikipedia.org/w/api.php?action=query&prop=extracts&pageids={page_id}&format=json&exintro=1"
-        response = requests.get(content_url)
-        response.raise_for_status()
-        content_data = response.json()
-        return {
-            "title": content_data["query"]["pages"][str(page_id)]["title"],
-            "extract": content_data["query"]["pages"][str(page_id)]["extract"]
-        }
+        content_data = fetch_json("wikipedia", self._wikipedia_content_url(page_id), timeout=_source_timeout("wikipedia"))
+        return self._parse_wikipedia_page(content_data, page_id)
 
-    def _get_newsapi_data(self) -> List[Dict]:
-        """Fetch recent news about the company using NewsAPI (if key present)"""
+    async def _aget_wikipedia_data(self) -> Dict:
+        search_data = await afetch_json("wikipedia", self._wikipedia_search_url(), timeout=_source_timeout("wikipedia"))
+        if not search_data["query"]["search"]:
+            return {}
+        page_id = search_data["query"]["search"][0]["pageid"]
+        content_data = await afetch_json("wikipedia", self._wikipedia_content_url(page_id),
+                                         timeout=_source_timeout("wikipedia"))
+        return self._parse_wikipedia_page(content_data, page_id)
+
+    def _newsapi_url(self) -> Optional[str]:
         api_key = os.getenv("NEWS_API_KEY")
         if not api_key:
+            return None
+        return f"https://newsapi.org/v2/everything?q={self.company_name}&apiKey={api_key}&language=en&sortBy=publishedAt&pageSize=5"
+
+    def _get_newsapi_data(self) -> List[Dict]:
+        """Fetch recent news about the company using NewsAPI (if key present)"""
+        news_url = self._newsapi_url()
+        if not news_url:
             return []
-        news_url = f"https://newsapi.org/v2/everything?q={self.company_name}&apiKey={api_key}&language=en&sortBy=publishedAt&pageSize=5"
-        response = requests.get(news_url)
-        response.raise_for_status()
-        news_data = response.json()
+        news_data = fetch_json("newsapi", news_url, timeout=_source_timeout("newsapi"))
         return news_data.get("articles", [])
 
+    async def _aget_newsapi_data(self) -> List[Dict]:
+        news_url = self._newsapi_url()
+        if not news_url:
+            return []
+        news_data = await afetch_json("newsapi", news_url, timeout=_source_timeout("newsapi"))
+        return news_data.get("articles", [])
+
+    def _google_news_url(self) -> str:
+        encoded_query = quote_plus(self.company_name)
+        return f"https://news.google.com/rss/search?q={encoded_query}&hl=en-US&gl=US&ceid=US:en"
+
+    def _parse_google_news_rss(self, text: str) -> List[Dict]:
+        return parse_rss_items(text, 10)
+
     def _get_google_news_rss(self) -> List[Dict]:
         """Fetch recent news using Google News RSS (no API key required)"""
-        try:
-            encoded_query = quote_plus(self.company_name)
-            news_url = f"https://news.google.com/rss/search?q={encoded_query}&hl=en-US&gl=US&ceid=US:en"
-            response = requests.get(news_url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'xml')
-            news_items = []
-            for item in soup.find_all('item')[:10]:
-                news_items.append({
-                    'title': item.title.text if item.title else '',
-                    'link': item.link.text if item.link else '',
-                    'pubDate': item.pubDate.text if item.pubDate else '',
-                    'source': item.source.text if item.source else ''
-                })
-            return news_items
-        except Exception:
-            return []
+        return self._parse_google_news_rss(fetch_text("google_news", self._google_news_url(),
+                                                      timeout=_source_timeout("google_news")))
+
+    async def _aget_google_news_rss(self) -> List[Dict]:
+        return self._parse_google_news_rss(await afetch_text("google_news", self._google_news_url(),
+                                                             timeout=_source_timeout("google_news")))
+
+    def _duckduckgo_url(self) -> str:
+        return f"https://api.duckduckgo.com/?q={self.company_name}&format=json&no_html=1"
+
+    def _parse_duckduckgo(self, data: Dict) -> Optional[str]:
+        return data.get("AbstractText") or data.get("RelatedTopics", [{}])[0].get("Text")
 
     def _get_duckduckgo_instant_answer(self) -> Optional[str]:
         """Fetch a summary from DuckDuckGo Instant Answer API (free)"""
-        url = f"https://api.duckduckgo.com/?q={self.company_name}&format=json&no_html=1"
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("AbstractText") or data.get("RelatedTopics", [{}])[0].get("Text")
-        except Exception:
-            return None
+        return self._parse_duckduckgo(fetch_json("duckduckgo", self._duckduckgo_url(), timeout=_source_timeout("duckduckgo")))
+
+    async def _aget_duckduckgo_instant_answer(self) -> Optional[str]:
+        return self._parse_duckduckgo(await afetch_json("duckduckgo", self._duckduckgo_url(),
+                                                        timeout=_source_timeout("duckduckgo")))
+
+    def _bing_url(self) -> str:
+        return f"https://www.bing.com/search?q={quote_plus(self.company_name + ' company information')}"
 
     def _get_bing_search(self) -> Dict:
         """Get company data using Bing search scraping (free, no API key)"""
-        try:
-            search_url = f"https://www.bing.com/search?q={quote_plus(self.company_name + ' company information')}"
-            headers = {
-                'User-Agent': 'Mozilla/5.0',
-            }
-            response = requests.get(search_url, headers=headers)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            results = []
-            for result in soup.find_all('li', class_='b_algo'):
-                title_elem = result.find('h2')
-                link_elem = result.find('a')
-                snippet_elem = result.find('div', class_='b_caption')
-                if title_elem and link_elem and snippet_elem:
-                    title = title_elem.get_text(strip=True)
-                    link = link_elem.get('href', '')
-                    snippet = snippet_elem.get_text(strip=True)
-                    if title and link and snippet:
-                        results.append({
-                            'title': title,
-                            'link': link,
-                            'snippet': snippet
-                        })
+        return self._parse_bing_search(fetch_text("bing", self._bing_url(), headers=BROWSER_HEADERS,
+                                                  timeout=_source_timeout("bing")))
+
+    async def _aget_bing_search(self) -> Dict:
+        return self._parse_bing_search(await afetch_text("bing", self._bing_url(), headers=BROWSER_HEADERS,
+                                                         timeout=_source_timeout("bing")))
+
+    def _parse_bing_search(self, text: str) -> Dict:
+        results = []
+        company_url = None
+        # Stop parsing once there are 5 results and the company website is among the results so far
+        for result in iter_bing_results(text):
+            results.append(result)
             # Extract company website
-            company_url = None
-            for result in results:
-                if any(domain in result['link'].lower() for domain in ['.com', '.org', '.net']):
-                    if self.company_name.lower() in result['title'].lower():
-                        company_url = result['link']
-                        break
-            return {
-                "search_results": results[:5],
-                "company_url": company_url
-            }
-        except Exception:
-            return {"search_results": [], "company_url": None}
-
-    def _get_company_website_info(self, crm_data_path: Optional[str] = None, fallback_url: Optional[str] = None) -> Dict:
-        """Fetch and parse meta tags and OpenGraph data from the company website (from crm_data.json or Bing fallback)"""
-        # Find company website from crm_data.json or fallback
-        website = None
-        if not crm_data_path:
-            crm_data_path = str(Path(__file__).parent.parent.parent / 'data' / 'crm_data.json')
+            if company_url is None and any(domain in result['link'].lower() for domain in ['.com', '.org', '.net']):
+                if self.company_name.lower() in result['title'].lower():
+                    company_url = result['link']
+            if len(results) >= 5 and company_url:
+                break
+        return {
+            "search_results": results[:5],
+            "company_url": company_url
+        }
+
+    def _crm_website(self, crm_data_path: Optional[str] = None) -> Optional[str]:
+        # Company website from crm_data.json, known before any source is fetched
         try:
-            with open(crm_data_path, "r") as f:
-                crm_data = json.load(f)
-            for lead in crm_data.get("crm_leads", []):
-                if lead.get("company_name", "").lower() == self.company_name.lower():
-                    website = lead.get("company_website")
-                    break
+            lead = get_repository(crm_data_path).find_lead_by_company(self.company_name)
+            if lead:
+                return lead.get("company_website")
         except Exception:
             pass
-        if not website and fallback_url:
-            website = fallback_url
-        if not website:
-            return {}
+        return None
+
+    def _get_website_analysis(self, website: str) -> tuple:
+        """Download the company homepage once (up to WEBSITE_MAX_BYTES) and return (website_info, web_presence)"""
+        return self._parse_website(fetch_text("website", website, headers=BROWSER_HEADERS, timeout=_source_timeout("website"),
+                                              raise_for_status=False, max_bytes=WEBSITE_MAX_BYTES))
+
+    async def _aget_website_analysis(self, website: str) -> tuple:
+        return self._parse_website(await afetch_text("website", website, headers=BROWSER_HEADERS,
+                                                     timeout=_source_timeout("website"), raise_for_status=False,
+                                                     max_bytes=WEBSITE_MAX_BYTES))
+
+    def _parse_website(self, text: str) -> tuple:
+        """
+        Meta tags, OpenGraph data, social links and about text from one parse and one walk of the page:
+        website_info (description, title, site name, mission, products, team, values) and web_presence
+        (meta_data, social_links, company_info).
+        """
+        page = parse_homepage(text)
+        meta = page["meta"]
+        info = {
+            "description": meta.get("description") or meta.get("og:description"),
+            "title": meta.get("title") or meta.get("og:title"),
+            "site_name": meta.get("og:site_name"),
+            "mission": meta.get("mission"),
+            "products": meta.get("products"),
+            "team": meta.get("team"),
+            "values": meta.get("values"),
+        }
+        web_presence = {
+            "meta_data": {"title": page["title"], "description": meta.get("description"), "keywords": meta.get("keywords")},
+            "social_links": page["social_links"],
+            "company_info": {"about": page["about"]} if page["about"] else {}
+        }
+        return {k: v for k, v in info.items() if v}, web_presence
+
+    def _timed(self, timings: Dict, name: str, fetch, *args):
+        """Run one source's fetch, recording its seconds and status; a failed or timed-out source yields its empty value"""
+        start = time.perf_counter()
         try:
-            resp = requests.get(website, timeout=10)
-            soup = BeautifulSoup(resp.text, "html.parser")
-            meta = {tag.get("name", tag.get("property", "")).lower(): tag.get("content", "") for tag in soup.find_all("meta")}
-            og = {tag.get("property", "").lower(): tag.get("content", "") for tag in soup.find_all("meta") if tag.get("property", "").startswith("og:")}
-            info = {
-                "description": meta.get("description") or og.get("og:description"),
-                "title": meta.get("title") or og.get("og:title"),
-                "site_name": og.get("og:site_name"),
-                "mission": meta.get("mission"),
-                "products": meta.get("products"),
-                "team": meta.get("team"),
-                "values": meta.get("values"),
-            }
-            return {k: v for k, v in info.items() if v}
-        except Exception:
-            return {}
+            result, status = fetch(*args), "ok"
+        except requests.Timeout:
+            result, status = EMPTY_SOURCES[name], "timeout"
+        except Exception as e:
+            result, status = EMPTY_SOURCES[name], f"error: {e}"
+        timings[name] = {"seconds": round(time.perf_counter() - start, 3), "status": status}
+        return result
 
-    def _analyze_web_presence(self, website: str) -> Dict:
-        """Analyze company's web presence: meta tags, social links, about text."""
+    async def _atimed(self, timings: Dict, name: str, fetch):
+        start = time.perf_counter()
         try:
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            resp = requests.get(website, headers=headers, timeout=10)
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            meta_data = {
-                "title": soup.title.string if soup.title else None,
-                "description": soup.find("meta", {"name": "description"})["content"] if soup.find("meta", {"name": "description"}) else None,
-                "keywords": soup.find("meta", {"name": "keywords"})["content"] if soup.find("meta", {"name": "keywords"}) else None
-            }
-            social_links = {}
-            for link in soup.find_all("a", href=True):
-                href = link["href"]
-                if "linkedin.com" in href:
-                    social_links["linkedin"] = href
-                elif "twitter.com" in href:
-                    social_links["twitter"] = href
-                elif "facebook.com" in href:
-                    social_links["facebook"] = href
-                elif "instagram.com" in href:
-                    social_links["instagram"] = href
-            company_info = {}
-            for p in soup.find_all('p'):
-                text = p.get_text(strip=True)
-                if 'about' in text.lower() or 'company' in text.lower():
-                    company_info['about'] = text
-                    break
-            return {
-                "meta_data": meta_data,
-                "social_links": social_links,
-                "company_info": company_info
-            }
-        except Exception:
-            return {}
+            result, status = await fetch, "ok"
+        except asyncio.TimeoutError:
+            result, status = EMPTY_SOURCES[name], "timeout"
+        except Exception as e:
+            result, status = EMPTY_SOURCES[name], f"error: {e}"
+        timings[name] = {"seconds": round(time.perf_counter() - start, 3), "status": status}
+        return result
 
-    def _llm_generate_summary(self, wiki_data, newsapi, google_news, duckduckgo, bing, website_info, web_presence) -> str:
-        """Use Claude or OpenAI to generate a 500-word, natural language summary broken into key areas."""
-        import openai
-        import anthropic
-        import os
-        prompt = f"""
+    def _collect(self, timings: Dict, results: Dict) -> tuple:
+        # Sources that never started (no NewsAPI key, no website URL) are reported as skipped
+        for name in EMPTY_SOURCES:
+            if name not in results:
+                results[name] = EMPTY_SOURCES[name]
+                timings[name] = {"seconds": 0.0, "status": "skipped"}
+        ordered = {name: timings[name] for name in EMPTY_SOURCES}
+        timings.clear()
+        timings.update(ordered)
+        website_info, web_presence = results["website"]
+        return (*(results[name] for name in EMPTY_SOURCES if name != "website"), website_info, web_presence)
+
+    def _gather_sources(self, timings: Dict) -> tuple:
+        """
+        Fetch the independent sources concurrently. The website stage starts as soon as a URL is known: right away
+        when the CRM has the company's website, otherwise once Bing has found it.
+        """
+        website = self._crm_website()
+        futures = {}
+        with ThreadPoolExecutor(max_workers=len(EMPTY_SOURCES)) as pool:
+            def submit(name, fetch, *args):
+                futures[name] = pool.submit(self._timed, timings, name, fetch, *args)
+
+            submit("wikipedia", self._get_wikipedia_data)
+            if self._newsapi_url():
+                submit("newsapi", self._get_newsapi_data)
+            submit("google_news", self._get_google_news_rss)
+            submit("duckduckgo", self._get_duckduckgo_instant_answer)
+            submit("bing", self._get_bing_search)
+            if website:
+                submit("website", self._get_website_analysis, website)
+            else:
+                company_url = futures["bing"].result().get("company_url")
+                if company_url:
+                    submit("website", self._get_website_analysis, company_url)
+            results = {name: future.result() for name, future in futures.items()}
+        return self._collect(timings, results)
+
+    async def _agather_sources(self, timings: Dict) -> tuple:
+        website = self._crm_website()
+        tasks = {}
+
+        def submit(name, fetch):
+            tasks[name] = asyncio.ensure_future(self._atimed(timings, name, fetch))
+
+        submit("wikipedia", self._aget_wikipedia_data())
+        if self._newsapi_url():
+            submit("newsapi", self._aget_newsapi_data())
+        submit("google_news", self._aget_google_news_rss())
+        submit("duckduckgo", self._aget_duckduckgo_instant_answer())
+        submit("bing", self._aget_bing_search())
+        if website:
+            submit("website", self._aget_website_analysis(website))
+        else:
+            company_url = (await tasks["bing"]).get("company_url")
+            if company_url:
+                submit("website", self._aget_website_analysis(company_url))
+        results = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+        return self._collect(timings, results)
+
+    def _result(self, summary: str, timings: Dict, start: float) -> str:
+        if not self.include_timings:
+            return summary
+        return json.dumps({"summary": summary, "timings": timings,
+                           "total_seconds": round(time.perf_counter() - start, 3)}, indent=2)
+
+    def _summary_prompt(self, wiki_data, newsapi, google_news, duckduckgo, bing, website_info, web_presence) -> str:
+        # Only the text the model needs from each source, within a token budget, instead of raw API responses
+        sources = compact_sources("CompanyResearchTool", {
+            "wikipedia": {"value": wiki_data, "budget": 500, "fields": ("title", "extract"), "max_field_chars": 2000},
+            "newsapi": {"value": newsapi, "budget": 300, "fields": ("title", "publishedAt", "description")},
+            "google_news": {"value": google_news, "budget": 250, "fields": ("title", "pubDate", "source")},
+            "duckduckgo": {"value": duckduckgo, "budget": 150},
+            "bing": {"value": bing, "budget": 350},
+            "website": {"value": website_info, "budget": 200},
+            "web_presence": {"value": web_presence, "budget": 250},
+        })
+        return f"""
 Can you please use the outputs from Wikipedia, NewsAPI, Google News RSS, DuckDuckGo, Bing Search, and company website meta tags below and summarize this into a 500 word, natural language summary which clearly outlines what the company does, why they do it, where they are based, their values etc. Anything that would be helpful to know for a sales rep to interact with someone from this company.
 
 Break it into key areas like:
@@ -213,48 +326,28 @@ Write your response as a natural language summary that will be read by a sales r
 
 ----
 WIKIPEDIA:
-{wiki_data}
+{sources['wikipedia']}
 
 NEWSAPI:
-{newsapi}
+{sources['newsapi']}
 
 GOOGLE NEWS RSS:
-{google_news}
+{sources['google_news']}
 
 DUCKDUCKGO:
-{duckduckgo}
+{sources['duckduckgo']}
 
 BING SEARCH:
-{bing}
+{sources['bing']}
 
 WEBSITE META TAGS:
-{website_info}
+{sources['website']}
 
 WEB PRESENCE:
-{web_presence}
+{sources['web_presence']}
 """
-        claude_key = os.getenv("CLAUDE_API_KEY")
-        if claude_key:
-            client = anthropic.Anthropic(api_key=claude_key)
-            response = client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=1000,
-                temperature=0.2,
-                system="You are a helpful sales research assistant.",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text.strip()
-        openai_key = os.getenv("OPENAI_API_KEY")
-        if openai_key:
-            client = openai.OpenAI(api_key=openai_key)
-            completion = client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "system", "content": "You are a helpful sales research assistant."},
-                          {"role": "user", "content": prompt}],
-                max_tokens=1000,
-                temperature=0.2
-            )
-            return completion.choices[0].message.content.strip()
+
+    def _fallback_summary(self, wiki_data, newsapi, google_news, duckduckgo, bing, website_info, web_presence) -> str:
         return "\n\n".join([
             f"Overview: {wiki_data.get('extract', '')}",
             f"DuckDuckGo: {duckduckgo}",
@@ -265,25 +358,56 @@ WEB PRESENCE:
             f"Google News: {[a.get('title') for a in google_news] if google_news else ''}"
         ])
 
+    def _llm_generate_summary(self, *sources) -> str:
+        """Use Claude or OpenAI to generate a 500-word, natural language summary broken into key areas."""
+        if available():
+            return complete(self._summary_prompt(*sources), "large", **provider_options(SUMMARY_LLM_OPTIONS), tool="CompanyResearchTool")
+        return self._fallback_summary(*sources)
+
+    async def _allm_generate_summary(self, *sources) -> str:
+        if available():
+            return await acomplete(self._summary_prompt(*sources), "large", **provider_options(SUMMARY_LLM_OPTIONS),
+                                   tool="CompanyResearchTool")
+        return self._fallback_summary(*sources)
+
+    def _save_summary(self, summary: str):
+        outputs_dir = Path(__file__).parent.parent.parent / 'data' / 'outputs'
+        outputs_dir.mkdir(parents=True, exist_ok=True)
+        safe_company = self.company_name.replace(' ', '_').lower()
+        with open(outputs_dir / f'company_{safe_company}.txt', 'w') as f:
+            f.write(summary)
+
     def run(self):
         """
         Gathers company data from Wikipedia, NewsAPI, Google News RSS, DuckDuckGo, Bing Search, and company website meta tags, then uses an LLM to generate a 500-word, natural language summary for sales preparation. Also saves the output to data/outputs/company_{company_name}.txt.
+        The sources are fetched concurrently; a source that fails or times out is left out of the summary. With include_timings, returns JSON with the summary and each source's seconds and status.
         """
         try:
-            wiki_data = self._get_wikipedia_data()
-            newsapi = self._get_newsapi_data()
-            google_news = self._get_google_news_rss()
-            duckduckgo = self._get_duckduckgo_instant_answer()
-            bing = self._get_bing_search()
-            website_info = self._get_company_website_info(fallback_url=bing.get("company_url"))
-            web_presence = self._analyze_web_presence(bing.get("company_url")) if bing.get("company_url") else {}
-            summary = self._llm_generate_summary(wiki_data, newsapi, google_news, duckduckgo, bing, website_info, web_presence)
+            start = time.perf_counter()
+            timings = {}
+            sources = self._gather_sources(timings)
+            summary_start = time.perf_counter()
+            summary = self._llm_generate_summary(*sources)
+            timings["summary"] = {"seconds": round(time.perf_counter() - summary_start, 3), "status": "ok"}
             # Save output
-            outputs_dir = Path(__file__).parent.parent.parent / 'data' / 'outputs'
-            outputs_dir.mkdir(parents=True, exist_ok=True)
-            safe_company = self.company_name.replace(' ', '_').lower()
-            with open(outputs_dir / f'company_{safe_company}.txt', 'w') as f:
-                f.write(summary)
-            return summary
+            self._save_summary(summary)
+            return self._result(summary, timings, start)
+        except Exception as e:
+            return f"Error researching company: {str(e)}"
+
+    async def arun(self):
+        """
+        Async run(): the sources are fetched concurrently on the shared aiohttp session (the website as soon as the
+        CRM or Bing yields its URL) and the summary is generated with acomplete. Same output, file and error messages as run().
+        """
+        try:
+            start = time.perf_counter()
+            timings = {}
+            sources = await self._agather_sources(timings)
+            summary_start = time.perf_counter()
+            summary = await self._allm_generate_summary(*sources)
+            timings["summary"] = {"seconds": round(time.perf_counter() - summary_start, 3), "status": "ok"}
+            self._save_summary(summary)
+            return self._result(summary, timings, start)
         except Exception as e:
-            return f"Error researching company: {str(e)}" 
\ No newline at end of file
+            return f"Error researching company: {str(e)}"
@@ -1,14 +1,47 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 import os
+import sys
+import json
+import asyncio
+import aiohttp
 import requests
 from typing import Optional, Dict, List
 from dotenv import load_dotenv
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from llm.compaction import compact_sources
+from llm.gateway import acomplete, available, complete, provider_options
+from web.cache import afetch_json, afetch_text, fetch_json, fetch_text
+from web.parsing import parse_bing_results, parse_rss_items
+
 load_dotenv()
 
+GOOGLE_CUSTOM_SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+BROWSER_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+# The options each provider was called with before the gateway
+SUMMARY_LLM_OPTIONS = {
+    "claude": {"max_tokens": 600, "temperature": 0.2},
+    "openai": {"max_tokens": 600, "temperature": 0.2, "system": "You are a helpful sales research assistant."}
+}
+# Seconds to wait for a search's server to accept the connection
+RESEARCH_CONNECT_TIMEOUT = float(os.getenv("RESEARCH_CONNECT_TIMEOUT", "3.05"))
+# Longest gap in seconds between bytes of a search's response
+SOURCE_READ_TIMEOUTS = {"google_custom_search": 8, "bing_search": 8, "duckduckgo": 5, "google_news": 8}
+# Seconds after which the summary is built from the searches that have returned; the rest are abandoned
+LINKEDIN_RESEARCH_DEADLINE = float(os.getenv("LINKEDIN_RESEARCH_DEADLINE", "10"))
+# What each search contributes to the summary when it fails, misses the deadline or is skipped
+EMPTY_SOURCES = {"google_custom_search": {}, "bing_search": [], "duckduckgo": None, "google_news": []}
+
+
+def _source_timeout(name: str) -> tuple:
+    return RESEARCH_CONNECT_TIMEOUT, SOURCE_READ_TIMEOUTS[name]
+
+
 class LinkedInResearchTool(BaseTool):
     """
     Researches prospects using publicly available data from Google Custom Search, Bing, DuckDuckGo, and Google News RSS.
@@ -20,6 +53,8 @@ class LinkedInResearchTool(BaseTool):
     - Recent news articles or posts
     - All details relevant for a sales rep to prepare for sales communication
     The person's name and company are provided as explicit inputs, not extracted from the LinkedIn URL.
+    The searches run concurrently; whatever returns before LINKEDIN_RESEARCH_DEADLINE goes into the summary.
+    arun() is the asyncio variant.
     """
     linkedin_url: str = Field(
         ..., description="LinkedIn profile URL to research"
@@ -34,6 +69,9 @@ class LinkedInResearchTool(BaseTool):
         default=None,
         description="Google Custom Search API key (if not provided, will use environment variable)"
     )
+    include_timings: bool = Field(
+        default=False, description="Return JSON with the summary and per-source timings instead of the summary text"
+    )
 
     def _get_api_key(self) -> str:
         api_key = self.api_key or os.getenv("GOOGLE_API_KEY")
@@ -41,6 +79,9 @@ class LinkedInResearchTool(BaseTool):
             raise ValueError("Google API key not found in environment variables")
         return api_key
 
+    def _google_configured(self) -> bool:
+        return bool((self.api_key or os.getenv("GOOGLE_API_KEY")) and os.getenv("GOOGLE_SEARCH_ENGINE_ID"))
+
     def _get_search_engine_id(self) -> str:
         search_engine_id = os.getenv("GOOGLE_SEARCH_ENGINE_ID")
         if not search_engine_id:
@@ -54,19 +95,25 @@ class LinkedInResearchTool(BaseTool):
             return profile_id
         raise ValueError("Invalid LinkedIn profile URL format")
 
-    def _get_google_custom_search(self, name: str, company: str) -> Dict:
+    def _google_custom_search_params(self, name: str, company: str) -> Dict:
         api_key = self._get_api_key()
         search_engine_id = self._get_search_engine_id()
         query = f'site:linkedin.com/in/ "{name}" "{company}"'
-        search_url = f"https://www.googleapis.com/customsearch/v1"
-        params = {
+        return {
             "key": api_key,
             "cx": search_engine_id,
             "q": query
         }
-        response = requests.get(search_url, params=params)
-        response.raise_for_status()
-        return response.json()
+
+    def _get_google_custom_search(self, name: str, company: str) -> Dict:
+        return fetch_json("google_custom_search", GOOGLE_CUSTOM_SEARCH_URL,
+                          params=self._google_custom_search_params(name, company),
+                          timeout=_source_timeout("google_custom_search"))
+
+    async def _aget_google_custom_search(self, name: str, company: str) -> Dict:
+        return await afetch_json("google_custom_search", GOOGLE_CUSTOM_SEARCH_URL,
+                                 params=self._google_custom_search_params(name, company),
+                                 timeout=_source_timeout("google_custom_search"))
 
     def _extract_company_from_google(self, google_data: dict) -> str:
         """Try to extract company name from Google Custom Search results."""
@@ -84,146 +131,220 @@ class LinkedInResearchTool(BaseTool):
                     return match.group(1).strip()
         return ''
 
+    def _bing_url(self, name: str, company: str) -> str:
+        query = f"{name} {company} LinkedIn" if company else f"{name} LinkedIn"
+        return f"https://www.bing.com/search?q={query.replace(' ', '+')}"
+
+    def _parse_bing_search(self, text: str) -> List[Dict]:
+        return parse_bing_results(text, 5)
+
     def _get_bing_search(self, name: str, company: str) -> List[Dict]:
         """Search Bing for the person's name and company to avoid mismatches with common names."""
-        try:
-            query = f"{name} {company} LinkedIn" if company else f"{name} LinkedIn"
-            search_url = f"https://www.bing.com/search?q={query.replace(' ', '+')}"
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(search_url, headers=headers)
-            response.raise_for_status()
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(response.text, 'html.parser')
-            results = []
-            for result in soup.find_all('li', class_='b_algo'):
-                title_elem = result.find('h2')
-                link_elem = result.find('a')
-                snippet_elem = result.find('div', class_='b_caption')
-                if title_elem and link_elem and snippet_elem:
-                    title = title_elem.get_text(strip=True)
-                    link = link_elem.get('href', '')
-                    snippet = snippet_elem.get_text(strip=True)
-                    if title and link and snippet:
-                        results.append({
-                            'title': title,
-                            'link': link,
-                            'snippet': snippet
-                        })
-            return results[:5]
-        except Exception:
-            return []
+        return self._parse_bing_search(fetch_text("bing_search", self._bing_url(name, company), headers=BROWSER_HEADERS,
+                                                  timeout=_source_timeout("bing_search")))
+
+    async def _aget_bing_search(self, name: str, company: str) -> List[Dict]:
+        return self._parse_bing_search(await afetch_text("bing_search", self._bing_url(name, company),
+                                                         headers=BROWSER_HEADERS, timeout=_source_timeout("bing_search")))
+
+    def _duckduckgo_url(self, name: str, company: str) -> str:
+        query = f"{name} {company} LinkedIn" if company else f"{name} LinkedIn"
+        return f"https://api.duckduckgo.com/?q={query.replace(' ', '+')}&format=json&no_html=1"
+
+    def _parse_duckduckgo(self, data: Dict) -> Optional[str]:
+        return data.get("AbstractText") or data.get("RelatedTopics", [{}])[0].get("Text")
 
     def _get_duckduckgo_search(self, name: str, company: str) -> Optional[str]:
         """Search DuckDuckGo for the person's name and company to avoid mismatches with common names."""
-        query = f"{name} {company} LinkedIn" if company else f"{name} LinkedIn"
-        url = f"https://api.duckduckgo.com/?q={query.replace(' ', '+')}&format=json&no_html=1"
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("AbstractText") or data.get("RelatedTopics", [{}])[0].get("Text")
-        except Exception:
-            return None
+        return self._parse_duckduckgo(fetch_json("duckduckgo", self._duckduckgo_url(name, company),
+                                                 timeout=_source_timeout("duckduckgo")))
+
+    async def _aget_duckduckgo_search(self, name: str, company: str) -> Optional[str]:
+        return self._parse_duckduckgo(await afetch_json("duckduckgo", self._duckduckgo_url(name, company),
+                                                        timeout=_source_timeout("duckduckgo")))
+
+    def _google_news_url(self, name: str, company: str) -> str:
+        from urllib.parse import quote_plus
+        query = f"{name} {company}" if company else name
+        encoded_query = quote_plus(query)
+        return f"https://news.google.com/rss/search?q={encoded_query}&hl=en-US&gl=US&ceid=US:en"
+
+    def _parse_google_news_rss(self, text: str) -> List[Dict]:
+        return parse_rss_items(text, 10)
 
     def _get_google_news_rss(self, name: str, company: str) -> List[Dict]:
         """Search Google News RSS for the person's name and company to avoid mismatches with common names."""
+        return self._parse_google_news_rss(fetch_text("google_news", self._google_news_url(name, company),
+                                                      timeout=_source_timeout("google_news")))
+
+    async def _aget_google_news_rss(self, name: str, company: str) -> List[Dict]:
+        return self._parse_google_news_rss(await afetch_text("google_news", self._google_news_url(name, company),
+                                                             timeout=_source_timeout("google_news")))
+
+    def _timed(self, timings: Dict, name: str, fetch, *args):
+        """Run one search, recording its seconds and status; a failed or timed-out search yields its empty value"""
+        start = time.perf_counter()
+        try:
+            result, status = fetch(*args), "ok"
+        except requests.Timeout:
+            result, status = EMPTY_SOURCES[name], "timeout"
+        except Exception as e:
+            result, status = EMPTY_SOURCES[name], f"error: {e}"
+        timings[name] = {"seconds": round(time.perf_counter() - start, 3), "status": status}
+        return result
+
+    async def _atimed(self, timings: Dict, name: str, fetch):
+        start = time.perf_counter()
         try:
-            from bs4 import BeautifulSoup
-            from urllib.parse import quote_plus
-            query = f"{name} {company}" if company else name
-            encoded_query = quote_plus(query)
-            news_url = f"https://news.google.com/rss/search?q={encoded_query}&hl=en-US&gl=US&ceid=US:en"
-            response = requests.get(news_url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'xml')
-            news_items = []
-            for item in soup.find_all('item')[:10]:
-                news_items.append({
-                    'title': item.title.text if item.title else '',
-                    'link': item.link.text if item.link else '',
-                    'pubDate': item.pubDate.text if item.pubDate else '',
-                    'source': item.source.text if item.source else ''
-                })
-            return news_items
-        except Exception:
-            return []
-
-    def _gather_profile_data(self) -> Dict:
-        # Use explicit name and company provided by the user for all searches
-        google_data = self._get_google_custom_search(self.name, self.company)
-        bing_data = self._get_bing_search(self.name, self.company)
-        duckduckgo_data = self._get_duckduckgo_search(self.name, self.company)
-        news_data = self._get_google_news_rss(self.name, self.company)
+            result, status = await fetch, "ok"
+        except asyncio.TimeoutError:
+            result, status = EMPTY_SOURCES[name], "timeout"
+        except Exception as e:
+            result, status = EMPTY_SOURCES[name], f"error: {e}"
+        timings[name] = {"seconds": round(time.perf_counter() - start, 3), "status": status}
+        return result
+
+    def _searches(self, asynchronous: bool = False) -> Dict:
+        # Use explicit name and company provided by the user for all searches; Google only with a key and engine ID
+        prefix = "_aget_" if asynchronous else "_get_"
+        names = {"google_custom_search": "google_custom_search", "bing_search": "bing_search",
+                 "duckduckgo": "duckduckgo_search", "google_news": "google_news_rss"}
+        return {name: getattr(self, prefix + method) for name, method in names.items()
+                if name != "google_custom_search" or self._google_configured()}
+
+    def _partial_results(self, started: Dict, results: Dict, search_timings: Dict, start: float) -> tuple:
+        """Profile data and per-search timings: searches still running at the deadline are reported as such,
+        unconfigured ones as skipped"""
+        timings = {}
+        for name in EMPTY_SOURCES:
+            if name in results:
+                timings[name] = search_timings[name]
+            elif name in started:
+                timings[name] = {"seconds": round(time.perf_counter() - start, 3), "status": "deadline exceeded"}
+            else:
+                timings[name] = {"seconds": 0.0, "status": "skipped"}
+        profile_data = self._profile_data(**{name: results.get(name, EMPTY_SOURCES[name]) for name in EMPTY_SOURCES})
+        return profile_data, timings
+
+    def _gather_profile_data(self) -> tuple:
+        """Run the searches concurrently and keep whatever has returned by LINKEDIN_RESEARCH_DEADLINE"""
+        start = time.perf_counter()
+        # Written by the searches; stragglers may still write to it after the deadline
+        search_timings = {}
+        pool = ThreadPoolExecutor(max_workers=len(EMPTY_SOURCES))
+        futures = {name: pool.submit(self._timed, search_timings, name, fetch, self.name, self.company)
+                   for name, fetch in self._searches().items()}
+        wait(futures.values(), timeout=LINKEDIN_RESEARCH_DEADLINE)
+        # Don't wait for stragglers; their threads end at their own read timeout
+        pool.shutdown(wait=False)
+        results = {name: future.result() for name, future in futures.items() if future.done()}
+        return self._partial_results(futures, results, search_timings, start)
+
+    async def _agather_profile_data(self) -> tuple:
+        start = time.perf_counter()
+        search_timings = {}
+        tasks = {name: asyncio.ensure_future(self._atimed(search_timings, name, fetch(self.name, self.company)))
+                 for name, fetch in self._searches(asynchronous=True).items()}
+        _, pending = await asyncio.wait(tasks.values(), timeout=LINKEDIN_RESEARCH_DEADLINE)
+        for task in pending:
+            task.cancel()
+        results = {name: task.result() for name, task in tasks.items() if task not in pending}
+        return self._partial_results(tasks, results, search_timings, start)
+
+    def _profile_data(self, google_custom_search, bing_search, duckduckgo, google_news) -> Dict:
         return {
             "name": self.name,
             "company": self.company,
-            "google_custom_search": google_data,
-            "bing_search": bing_data,
-            "duckduckgo": duckduckgo_data,
-            "google_news": news_data
+            "google_custom_search": google_custom_search,
+            "bing_search": bing_search,
+            "duckduckgo": duckduckgo,
+            "google_news": google_news
         }
 
-    def _llm_generate_summary(self, profile_data: Dict) -> str:
-        import openai
-        import anthropic
-        import os
-        prompt = f"""
+    def _result(self, summary: str, timings: Dict, start: float) -> str:
+        if not self.include_timings:
+            return summary
+        return json.dumps({"summary": summary, "timings": timings,
+                           "total_seconds": round(time.perf_counter() - start, 3)}, indent=2)
+
+    def _summary_prompt(self, profile_data: Dict) -> str:
+        # Only the text the model needs from each source, within a token budget, instead of raw API responses
+        sources = compact_sources("LinkedInResearchTool", {
+            "google_custom_search": {"value": (profile_data['google_custom_search'] or {}).get("items", []),
+                                     "budget": 500, "fields": ("title", "snippet", "link")},
+            "bing": {"value": profile_data['bing_search'], "budget": 300},
+            "duckduckgo": {"value": profile_data['duckduckgo'], "budget": 150},
+            "google_news": {"value": profile_data['google_news'], "budget": 250, "fields": ("title", "pubDate", "source")},
+        })
+        return f"""
 Can you please take this LinkedIn profile information and summarize this into a 300 word summary with details on the user's background, key career experience, current role and duration in role. This is a summary for a sales rep to prepare for a sales communication, so make sure all the relevant details are there for this purpose, it should be an overview that will rapidly bring someone up to speed on a prospect they are about to have a meeting with.
 Make it read like a resume, with Name, location, follower count, current company and position all listed one after the other at the top, before you break into an overview section and then experience, news/posts etc.
 
 Here is the data:
 GOOGLE CUSTOM SEARCH:
-{profile_data['google_custom_search']}
+{sources['google_custom_search']}
 
 BING SEARCH:
-{profile_data['bing_search']}
+{sources['bing']}
 
 DUCKDUCKGO:
-{profile_data['duckduckgo']}
+{sources['duckduckgo']}
 
 GOOGLE NEWS RSS:
-{profile_data['google_news']}
+{sources['google_news']}
 """
-        claude_key = os.getenv("CLAUDE_API_KEY")
-        if claude_key:
-            client = anthropic.Anthropic(api_key=claude_key)
-            response = client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=600,
-                temperature=0.2,
-                system="You are a helpful sales research assistant.",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text.strip()
-        openai_key = os.getenv("OPENAI_API_KEY")
-        if openai_key:
-            client = openai.OpenAI(api_key=openai_key)
-            completion = client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "system", "content": "You are a helpful sales research assistant."},
-                          {"role": "user", "content": prompt}],
-                max_tokens=600,
-                temperature=0.2
-            )
-            return completion.choices[0].message.content.strip()
+
+    def _llm_generate_summary(self, profile_data: Dict) -> str:
+        if available():
+            return complete(self._summary_prompt(profile_data), "large", **provider_options(SUMMARY_LLM_OPTIONS), tool="LinkedInResearchTool")
+        return self._fallback_summary(profile_data)
+
+    async def _allm_generate_summary(self, profile_data: Dict) -> str:
+        if available():
+            return await acomplete(self._summary_prompt(profile_data), "large", **provider_options(SUMMARY_LLM_OPTIONS),
+                                   tool="LinkedInResearchTool")
+        return self._fallback_summary(profile_data)
+
+    def _fallback_summary(self, profile_data: Dict) -> str:
         # Fallback: concatenate text
         return f"GOOGLE CUSTOM SEARCH: {profile_data['google_custom_search']}\nBING: {profile_data['bing_search']}\nDUCKDUCKGO: {profile_data['duckduckgo']}\nGOOGLE NEWS: {profile_data['google_news']}"
 
     def run(self):
         """
         Performs LinkedIn profile research using publicly available data and generates a 300-word, resume-style summary for sales preparation using an LLM. Returns a natural language summary (not JSON), formatted as specified in the prompt. Also saves the output to data/outputs/linkedin_{name}.txt.
+        A search that fails, times out or misses the deadline is left out of the summary. With include_timings, returns JSON with the summary and each search's seconds and status.
         """
         try:
-            profile_data = self._gather_profile_data()
+            start = time.perf_counter()
+            profile_data, timings = self._gather_profile_data()
             summary = self._llm_generate_summary(profile_data)
             # Save output
-            outputs_dir = Path(__file__).parent.parent.parent / 'data' / 'outputs'
-            outputs_dir.mkdir(parents=True, exist_ok=True)
-            safe_name = self.name.replace(' ', '_').lower()
-            with open(outputs_dir / f'linkedin_{safe_name}.txt', 'w') as f:
-                f.write(summary)
-            return summary
+            self._save_summary(summary)
+            return self._result(summary, timings, start)
         except requests.exceptions.RequestException as e:
             return f"API request failed: {str(e)}"
         except Exception as e:
-            return f"Error researching profile: {str(e)}" 
\ No newline at end of file
+            return f"Error researching profile: {str(e)}"
+
+    async def arun(self):
+        """
+        Async run(): the searches run concurrently on the shared aiohttp session and the summary is generated with
+        acomplete. Same output, file and error messages as run().
+        """
+        try:
+            start = time.perf_counter()
+            profile_data, timings = await self._agather_profile_data()
+            summary = await self._allm_generate_summary(profile_data)
+            self._save_summary(summary)
+            return self._result(summary, timings, start)
+        except aiohttp.ClientError as e:
+            return f"API request failed: {str(e)}"
+        except Exception as e:
+            return f"Error researching profile: {str(e)}"
+
+    def _save_summary(self, summary: str):
+        outputs_dir = Path(__file__).parent.parent.parent / 'data' / 'outputs'
+        outputs_dir.mkdir(parents=True, exist_ok=True)
+        safe_name = self.name.replace(' ', '_').lower()
+        with open(outputs_dir / f'linkedin_{safe_name}.txt', 'w') as f:
+            f.write(summary) 
\ No newline at end of file
@@ -1,11 +1,21 @@
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 import os
+import sys
 from dotenv import load_dotenv
 from pathlib import Path
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from llm.gateway import acomplete, complete, provider_options, stream
+
 load_dotenv()
 
+# Per provider: Claude is called without a system prompt, as before the gateway
+REPORT_LLM_OPTIONS = {
+    "claude": {"max_tokens": 2000, "temperature": 0.6},
+    "openai": {"max_tokens": 2000, "temperature": 0.6, "system": "You are a helpful sales assistant."}
+}
+
 class ReportGenerationTool(BaseTool):
     """
     Uses Claude or OpenAI GPT to generate a concise, actionable sales call/meeting prep guide (<500 words) for a sales rep.
@@ -28,12 +38,6 @@ class ReportGenerationTool(BaseTool):
         except Exception as e:
             return f"Error reading {filename}: {str(e)}"
 
-    def _get_claude_api_key(self):
-        return os.getenv("CLAUDE_API_KEY")
-
-    def _get_openai_api_key(self):
-        return os.getenv("OPENAI_API_KEY")
-
     def _build_prompt(self, company_summary: str, prospect_summary: str) -> str:
         prompt = f"""
 # Role
@@ -87,51 +91,22 @@ Please generate a detailed, actionable, and consultative sales call/meeting prep
 """
         return prompt
 
-    def _call_claude(self, prompt: str) -> str:
-        import requests
-        api_key = self._get_claude_api_key()
-        if not api_key:
-            raise ValueError("CLAUDE_API_KEY not found in environment variables.")
-        headers = {
-            "x-api-key": api_key,
-            "anthropic-version": "2023-06-01",
-            "content-type": "application/json"
-        }
-        data = {
-            "model": "claude-3-opus-20240229",
-            "max_tokens": 2000,
-            "temperature": 0.6,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ]
-        }
-        response = requests.post("https://api.anthropic.com/v1/messages", headers=headers, json=data)
-        response.raise_for_status()
-        result = response.json()
-        return result["content"][0]["text"].strip()
-
-    def _call_openai(self, prompt: str) -> str:
-        import requests
-        api_key = self._get_openai_api_key()
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables.")
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        data = {
-            "model": "gpt-4",
-            "messages": [
-                {"role": "system", "content": "You are a helpful sales assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": 2000,
-            "temperature": 0.6
-        }
-        response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=data)
-        response.raise_for_status()
-        result = response.json()
-        return result["choices"][0]["message"]["content"].strip()
+    def _report_prompt(self) -> str:
+        # Read input files
+        safe_company, safe_name = self._safe_names()
+        company_summary = self._read_input_file(f'company_{safe_company}.txt')
+        prospect_summary = self._read_input_file(f'linkedin_{safe_name}.txt')
+        return self._build_prompt(company_summary, prospect_summary)
+
+    def _safe_names(self):
+        return self.company_name.replace(' ', '_').lower(), self.prospect_name.replace(' ', '_').lower()
+
+    def _save_report(self, summary: str):
+        safe_company, safe_name = self._safe_names()
+        outputs_dir = Path(__file__).parent.parent.parent / 'data' / 'outputs'
+        outputs_dir.mkdir(parents=True, exist_ok=True)
+        with open(outputs_dir / f'report_{safe_company}_{safe_name}.txt', 'w') as f:
+            f.write(summary)
 
     def run(self):
         """
@@ -140,27 +115,32 @@ Please generate a detailed, actionable, and consultative sales call/meeting prep
         Saves output as a text file in the data/outputs directory.
         """
         try:
-            # Read input files
-            safe_company = self.company_name.replace(' ', '_').lower()
-            safe_name = self.prospect_name.replace(' ', '_').lower()
-            
-            company_summary = self._read_input_file(f'company_{safe_company}.txt')
-            prospect_summary = self._read_input_file(f'linkedin_{safe_name}.txt')
-            
             # Generate report
-            prompt = self._build_prompt(company_summary, prospect_summary)
-            if self._get_claude_api_key():
-                summary = self._call_claude(prompt)
-            else:
-                summary = self._call_openai(prompt)
+            summary = complete(self._report_prompt(), "large", **provider_options(REPORT_LLM_OPTIONS), tool="ReportGenerationTool")
             
             # Save output
-            outputs_dir = Path(__file__).parent.parent.parent / 'data' / 'outputs'
-            outputs_dir.mkdir(parents=True, exist_ok=True)
-            output_file = outputs_dir / f'report_{safe_company}_{safe_name}.txt'
-            with open(output_file, 'w') as f:
-                f.write(summary)
+            self._save_report(summary)
             
             return summary
         except Exception as e:
-            return f"Error generating report: {str(e)}" 
\ No newline at end of file
+            return f"Error generating report: {str(e)}"
+
+    async def arun(self):
+        """Async run(), generating the guide with acomplete"""
+        try:
+            summary = await acomplete(self._report_prompt(), "large", **provider_options(REPORT_LLM_OPTIONS), tool="ReportGenerationTool")
+            self._save_report(summary)
+            return summary
+        except Exception as e:
+            return f"Error generating report: {str(e)}"
+
+    def run_stream(self):
+        """
+        Like run(), but yields the guide in chunks as the model writes it, for the UI to render live; the guide is
+        saved once complete. Errors are raised rather than returned.
+        """
+        chunks = []
+        for chunk in stream(self._report_prompt(), "large", **provider_options(REPORT_LLM_OPTIONS), tool="ReportGenerationTool"):
+            chunks.append(chunk)
+            yield chunk
+        self._save_report("".join(chunks))
@@ -0,0 +1,68 @@
+"""
+Benchmark: logging N sends with N single CRM updates vs one batch update.
+
+Usage (from palona_ai_sales_system/):
+    python -m benchmarks.bench_crm_batch_update --sends 500
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from crm.interactions import build_interaction_update
+from crm.repository import CRM_DATA_PATH, CRMRepository
+
+
+def _sends(repo, n):
+    lead_ids = [lead["record_id"] for lead in repo.iter_leads()]
+    return [(lead_ids[i % len(lead_ids)], f"Campaign message {i}", "2025-05-01") for i in range(n)]
+
+
+def bench(data_file, n):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        results = {}
+        # N single calls, the way CRMUpdateTool is invoked once per send
+        single_file = os.path.join(tmp_dir, "single.json")
+        shutil.copy(data_file, single_file)
+        repo = CRMRepository(single_file)
+        # Migrate any embedded message logs up front so it is not part of the timing
+        repo.compact()
+        sends = _sends(repo, n)
+        start = time.perf_counter()
+        for record_id, body, sent_date in sends:
+            lead = repo.get_lead(record_id)
+            fields, message = build_interaction_update(lead, body, sent_date)
+            repo.update_lead(record_id, fields, message, expected_version=lead.get("version", 0))
+        results["single"] = time.perf_counter() - start
+        repo.wait_for_compaction()
+
+        # One batch call
+        batch_file = os.path.join(tmp_dir, "batch.json")
+        shutil.copy(data_file, batch_file)
+        repo = CRMRepository(batch_file)
+        repo.compact()
+        start = time.perf_counter()
+        repo.update_leads([
+            (record_id, lambda lead, body=body, sent_date=sent_date: build_interaction_update(lead, body, sent_date))
+            for record_id, body, sent_date in sends
+        ])
+        results["batch"] = time.perf_counter() - start
+        repo.wait_for_compaction()
+        return results
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sends", type=int, default=500)
+    parser.add_argument("--data-file", default=str(CRM_DATA_PATH))
+    args = parser.parse_args()
+    results = bench(args.data_file, args.sends)
+    print(f"{args.sends} single updates: {results['single'] * 1000:.1f} ms")
+    print(f"1 batch update:      {results['batch'] * 1000:.1f} ms")
+    print(f"speedup:             {results['single'] / results['batch']:.1f}x")
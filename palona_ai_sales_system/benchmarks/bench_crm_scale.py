@@ -0,0 +1,177 @@
+"""
+Scale benchmark: times and memory-profiles every CRM-touching tool and UI data path on synthetic CRMs of 1k/100k/1M leads.
+
+Usage (from palona_ai_sales_system/):
+    python -m benchmarks.bench_crm_scale --scales 1000,100000 --backends json,stream,sqlite --output baseline.json
+    python -m benchmarks.bench_crm_scale --scales 1000,100000 --baseline baseline.json
+
+Each (scale, backend) runs in a fresh process against its own synthetic CRM (see benchmarks/synthetic_crm.py).
+Per case it reports the median wall time over --repeat runs and the peak Python allocation (tracemalloc) of one
+more run; per process it reports the time of the first CRM access (load or import) and the peak RSS.
+Tools whose dependencies are not installed are reported as skipped.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.synthetic_crm import generate_crm
+
+BACKENDS = ("json", "stream", "sqlite")
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _cases(repo, sample):
+    """(name, callable) for every CRM-touching tool and UI data path; callables raise ImportError if a tool is unavailable"""
+    record_id = sample["record_id"]
+    selected_lead = f"{sample['first_name']} {sample['last_name']} - {sample['company_name']}"
+    total = repo.count_leads()
+
+    def lead_profile(**kwargs):
+        from CRMSyncAgent.tools.LeadProfileIngestionTool import LeadProfileIngestionTool
+        return lambda: LeadProfileIngestionTool(**kwargs).run()
+
+    def tool(module, name, method=None, *args, **kwargs):
+        def run():
+            tool_class = getattr(__import__(module, fromlist=[name]), name)
+            instance = tool_class(**kwargs)
+            return getattr(instance, method)(*args) if method else instance.run()
+        return run
+
+    return [
+        # UI data paths
+        ("ui.lead_selection (rep's leads, projected + sorted)", lambda: lead_profile(
+            fields=["first_name", "last_name", "company_name", "job_title", "became_a_lead_date", "lead_score", "customer_segment"],
+            filters={"sales_rep": sample["sales_rep"]}, sort="-became_a_lead_date", include_deals=False)()),
+        ("ui.lead_selection linkedin lookup", lambda: repo.find_lead(sample["first_name"], sample["last_name"], sample["company_name"])),
+        ("ui.hubspot_db (page of 100 + deals)", lambda: lead_profile(limit=100, offset=total // 2)()),
+        ("ui.communication_summary lead lookup", lambda: repo.find_lead(sample["first_name"], sample["last_name"], sample["company_name"])),
+        ("ui.email_draft lead profile", lambda: lead_profile(selected_lead=selected_lead)()),
+        # Tools
+        ("LeadProfileIngestionTool (all leads + deals)", lambda: lead_profile()()),
+        ("CommunicationHistoryTool", lambda: tool("CRMSyncAgent.tools.CommunicationHistoryTool", "CommunicationHistoryTool",
+                                                  lead_id=record_id)()),
+        ("SimilarDealsTool", lambda: tool("CRMSyncAgent.tools.SimilarDealsTool", "SimilarDealsTool",
+                                          industry=sample["industry"], criteria={"deal_size": 250000})()),
+        ("MessageDraftingTool._get_lead_info", lambda: tool("MessageGenerationAgent.tools.MessageDraftingTool", "MessageDraftingTool",
+                                                            "_get_lead_info", record_id, company_name=sample["company_name"],
+                                                            prospect_name=sample["first_name"], lead_id=record_id)()),
+        ("MessageActionTool._get_recipient_info", lambda: tool("ApprovalActionAgent.tools.MessageActionTool", "MessageActionTool",
+                                                               "_get_recipient_info", record_id, message_file="draft.txt",
+                                                               lead_id=record_id)()),
+        # The CRM reads of the LLM/network tools, which cannot run offline as a whole
+        ("CommunicationSummaryTool message read", lambda: repo.get_messages(record_id, limit=20)),
+        ("CompanyResearchTool website lookup", lambda: repo.find_lead_by_company(sample["company_name"])),
+        # Writes last, so reads see the generated data
+        ("CRMUpdateTool", lambda: tool("CRMSyncAgent.tools.CRMUpdateTool", "CRMUpdateTool", record_id=record_id,
+                                       email_message="Benchmark message", email_sent_date="2025-05-01")()),
+        ("CRMBatchUpdateTool (100 sends)", lambda: tool("CRMSyncAgent.tools.CRMBatchUpdateTool", "CRMBatchUpdateTool", updates=[
+            {"record_id": str(1 + (i * 7919) % total), "email_message": f"Campaign message {i}", "email_sent_date": "2025-05-01"}
+            for i in range(100)
+        ])()),
+    ]
+
+
+def _worker(repeat):
+    """Run every case against get_repository() in this process and print the results as JSON"""
+    from crm.repository import get_repository
+    start = time.perf_counter()
+    repo = get_repository()
+    repo.count_leads()
+    result = {"first_access_ms": (time.perf_counter() - start) * 1000,
+              "rss_after_first_access_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+              "cases": {}}
+    sample = repo.list_leads(limit=1, offset=repo.count_leads() // 2)[0]
+    for name, case in _cases(repo, sample):
+        try:
+            times = []
+            for _ in range(repeat):
+                case_start = time.perf_counter()
+                case()
+                times.append((time.perf_counter() - case_start) * 1000)
+            tracemalloc.start()
+            case()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result["cases"][name] = {"ms": statistics.median(times), "peak_alloc_mb": peak / 1024 / 1024}
+        except ImportError as e:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            result["cases"][name] = {"skipped": f"{type(e).__name__}: {e}"}
+    if hasattr(repo, "wait_for_compaction"):
+        repo.wait_for_compaction()
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps(result))
+
+
+def bench(scales, backends, data_dir, repeat):
+    results = {}
+    for scale in scales:
+        for backend in backends:
+            # A fresh CRM per backend, since the write cases change it
+            crm_dir = os.path.join(data_dir, f"{scale}_{backend}")
+            data_file = os.path.join(crm_dir, "crm_data.json")
+            shutil.rmtree(crm_dir, ignore_errors=True)
+            generate_crm(data_file, scale)
+            env = dict(os.environ, CRM_BACKEND=backend, CRM_DATA_PATH=data_file,
+                       CRM_SQLITE_PATH=os.path.join(crm_dir, "crm.sqlite3"))
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_crm_scale", "--worker", "--repeat", str(repeat)],
+                cwd=ROOT, env=env, check=True, capture_output=True, text=True
+            ).stdout
+            results[f"{scale}/{backend}"] = json.loads(output.strip().splitlines()[-1])
+            shutil.rmtree(crm_dir, ignore_errors=True)
+    return results
+
+
+def _report(results, baseline=None):
+    baseline = baseline or {}
+    for key, result in results.items():
+        print(f"\n{key} leads: first access {result['first_access_ms']:.1f} ms, peak RSS {result['peak_rss_mb']:.1f} MB")
+        for name, case in result["cases"].items():
+            if "skipped" in case:
+                print(f"  {name:<52} skipped ({case['skipped']})")
+                continue
+            line = f"  {name:<52} {case['ms']:>10.2f} ms {case['peak_alloc_mb']:>9.2f} MB"
+            before = baseline.get(key, {}).get("cases", {}).get(name, {})
+            if "ms" in before and before["ms"] > 0:
+                line += f"   ({(case['ms'] / before['ms'] - 1) * 100:+.0f}% vs baseline)"
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default="1000,100000,1000000", help="Comma-separated lead counts")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated CRM backends")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (median is reported)")
+    parser.add_argument("--data-dir", help="Where to write the synthetic CRMs (a temporary directory by default)")
+    parser.add_argument("--output", help="Write the results as JSON, e.g. to use as a baseline")
+    parser.add_argument("--baseline", help="Results JSON from an earlier run to compare against")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        _worker(args.repeat)
+        sys.exit(0)
+
+    data_dir = args.data_dir or tempfile.mkdtemp()
+    try:
+        results = bench([int(s) for s in args.scales.split(",")], args.backends.split(","), data_dir, args.repeat)
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    _report(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
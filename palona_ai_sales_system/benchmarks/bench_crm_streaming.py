@@ -0,0 +1,105 @@
+"""
+Benchmark: peak memory and scan time of the in-memory JSON backend vs the streaming backend on a large CRM file.
+
+Usage (from palona_ai_sales_system/):
+    python -m benchmarks.bench_crm_streaming --leads 200000 --deals 20000
+    python -m benchmarks.bench_crm_streaming --data-file /path/to/export.json
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from crm.repository import CRM_DATA_PATH, CRMRepository
+from crm.streaming import StreamingCRMRepository
+
+
+def _scaled_copy(source, target, leads, deals):
+    """Write a CRM file with `leads` leads and `deals` deals by repeating the records of `source`"""
+    with open(source, 'r') as f:
+        crm_data = json.load(f)
+    with open(target, 'w') as f:
+        f.write('{\n    "crm_leads": [')
+        for i in range(leads):
+            lead = dict(crm_data["crm_leads"][i % len(crm_data["crm_leads"])], record_id=str(i + 1))
+            # Benchmark a migrated CRM: message logs live in the message store, not in the leads
+            lead.pop("message_log", None)
+            f.write(("" if i == 0 else ",") + "\n        " + json.dumps(lead))
+        f.write('\n    ],\n    "deals": [')
+        for i in range(deals):
+            deal = dict(crm_data["deals"][i % len(crm_data["deals"])], id=f"deal_{i + 1:07d}")
+            f.write(("" if i == 0 else ",") + "\n        " + json.dumps(deal))
+        f.write('\n    ]\n}\n')
+
+
+def _worker(backend, data_file):
+    """Run the scans in this (fresh) process and print timings plus peak RSS as JSON"""
+    repo = StreamingCRMRepository(data_file) if backend == "stream" else CRMRepository(data_file)
+    timings = {}
+    start = time.perf_counter()
+    total = repo.count_leads()
+    timings["count_leads"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    repo.get_lead(str(total))
+    timings["get_lead (last record_id)"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    repo.query_leads(fields=["record_id", "became_a_lead_date"], filters={"sales_rep": "Sue"}, sort="-became_a_lead_date", limit=50)
+    timings["query_leads (rep, sorted page)"] = time.perf_counter() - start
+
+    # The SimilarDealsTool scan: successful deals matching an industry
+    start = time.perf_counter()
+    sum(1 for deal in repo.iter_deals() if deal.get("status") == "successful" and "retail" in deal.get("industry", "").lower())
+    timings["similar deals scan"] = time.perf_counter() - start
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"timings": timings, "peak_rss_mb": peak_kb / 1024}))
+
+
+def bench(data_file):
+    results = {}
+    for backend in ("json", "stream"):
+        # Peak RSS is per process, so each backend runs in its own interpreter
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_crm_streaming", "--worker", backend, "--data-file", data_file],
+            cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+            check=True, capture_output=True, text=True
+        ).stdout
+        results[backend] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--leads", type=int, default=200000)
+    parser.add_argument("--deals", type=int, default=20000)
+    parser.add_argument("--data-file", help="Existing CRM file to benchmark (a scaled copy of crm_data.json by default)")
+    parser.add_argument("--worker", choices=["json", "stream"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        _worker(args.worker, args.data_file)
+        sys.exit(0)
+
+    tmp_dir = None
+    data_file = args.data_file
+    if not data_file:
+        tmp_dir = tempfile.mkdtemp()
+        data_file = os.path.join(tmp_dir, "crm_data.json")
+        _scaled_copy(CRM_DATA_PATH, data_file, args.leads, args.deals)
+    try:
+        print(f"{data_file}: {os.path.getsize(data_file) / 1024 / 1024:.1f} MB")
+        results = bench(data_file)
+        for backend, result in results.items():
+            print(f"\n{backend} backend (peak RSS {result['peak_rss_mb']:.1f} MB)")
+            for name, seconds in result["timings"].items():
+                print(f"  {name:<32} {seconds * 1000:>10.1f} ms")
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir)
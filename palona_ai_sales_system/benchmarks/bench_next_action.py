@@ -0,0 +1,98 @@
+"""
+Benchmark: next-action classification latency (rules, linear model, cache), the share of emails that would fall back
+to the LLM, and accuracy on calls to action phrased differently from the model's seed corpus.
+
+Usage (from palona_ai_sales_system/):
+    python -m benchmarks.bench_next_action --emails 2000
+
+Runs without API keys, so low-confidence emails get the default label (send_email) and are counted as would-be LLM
+fallbacks; accuracy is reported for the model's own labels too.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from llm.next_action import NEXT_ACTION_MIN_CONFIDENCE, classify_next_action, get_model, get_next_action_stats
+
+HELD_OUT = {
+    "schedule_meeting": [
+        "Would you have half an hour on Friday to go through a tailored demo?",
+        "Open to a brief intro call?",
+        "Happy to come by your office to walk the team through it.",
+        "Let's pencil in a session with your e-commerce team.",
+        "What does your availability look like later this month?",
+    ],
+    "follow_up": [
+        "Following up in case this slipped through the cracks.",
+        "I'll circle back next quarter.",
+        "Have you had a chance to review the proposal?",
+        "Resurfacing this in case it's useful now.",
+        "I'll wait to hear from you after your board meeting.",
+    ],
+    "send_email": [
+        "Attached is the pricing overview.",
+        "I've linked our customer stories below.",
+        "Here's the recap from today's session.",
+        "Enclosed are the references you requested.",
+        "Sharing the report our analytics team put together.",
+    ],
+}
+CONTEXT = [
+    "Your team's push into conversational commerce caught my eye.",
+    "Our agents already handle product questions for several beauty brands.",
+    "Palona's agents keep every conversation on-brand, at any hour.",
+]
+
+
+def _emails(n, rng):
+    emails = []
+    for _ in range(n):
+        label = rng.choice(list(HELD_OUT))
+        text = f"Hi {rng.choice(['Dana', 'Luis', 'Mei'])},\n\n{rng.choice(CONTEXT)} {rng.randrange(1000)}\n\n" \
+               f"{rng.choice(HELD_OUT[label])}\n\nBest,\nAlex"
+        emails.append((text, label))
+    return emails
+
+
+def _ms(values):
+    values = sorted(values)
+    return f"p50 {statistics.median(values) * 1000:.3f} ms, p99 {values[int(len(values) * 0.99)] * 1000:.3f} ms"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--emails", type=int, default=2000)
+    args = parser.parse_args()
+    os.environ.pop("CLAUDE_API_KEY", None)
+    os.environ.pop("OPENAI_API_KEY", None)
+    start = time.perf_counter()
+    get_model()
+    print(f"model training (first use)     {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    emails = _emails(args.emails, random.Random(0))
+    latencies = {"rules": [], "model": [], "default": [], "cache": []}
+    correct = model_correct = fallbacks = 0
+    for text, label in emails:
+        start = time.perf_counter()
+        result = classify_next_action(text)
+        latencies[result["source"]].append(time.perf_counter() - start)
+        correct += result["label"] == label
+        model_correct += (get_model().predict(text)[0] if result["source"] == "default" else result["label"]) == label
+        fallbacks += result["source"] == "default"
+    # Defaults are not cached, so only emails the rules or the model decided are looked up again
+    for text in [text for text, _ in emails if classify_next_action(text)["source"] == "cache"][:500]:
+        start = time.perf_counter()
+        classify_next_action(text)
+        latencies["cache"].append(time.perf_counter() - start)
+
+    for source, values in latencies.items():
+        if values:
+            print(f"{source:<10} {len(values):>6} emails    {_ms(values)}")
+    print(f"accuracy on held-out phrasing   {correct / len(emails):.1%} "
+          f"({model_correct / len(emails):.1%} with the model's label for unsure emails)")
+    print(f"would fall back to the LLM      {fallbacks / len(emails):.1%} (confidence < {NEXT_ACTION_MIN_CONFIDENCE})")
+    print(get_next_action_stats())
@@ -0,0 +1,117 @@
+"""
+Benchmark: estimated prompt tokens per research source before (raw API responses) and after compaction, and the time
+compaction adds, for CompanyResearchTool and LinkedInResearchTool prompts built from realistic synthetic responses.
+
+Usage (from palona_ai_sales_system/):
+    python -m benchmarks.bench_prompt_compaction
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from llm.compaction import get_compaction_stats
+from ResearchAgent.tools.CompanyResearchTool import CompanyResearchTool
+from ResearchAgent.tools.LinkedInResearchTool import LinkedInResearchTool
+
+WORDS = ("brand customer retail growth beauty platform loyalty digital store product launch omnichannel experience "
+         "partnership revenue quarter market consumer skincare fragrance membership").split()
+
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def _paragraphs(rng, n):
+    return "".join(f"<p><b>{_sentence(rng, 4)}</b> {' '.join(_sentence(rng, 18) for _ in range(4))}</p>\n" for _ in range(n))
+
+
+def _google_item(rng, i):
+    snippet = _sentence(rng, 30)
+    return {
+        "kind": "customsearch#result", "title": f"Jane Doe - VP Marketing - Acme | LinkedIn {i}",
+        "htmlTitle": f"<b>Jane Doe</b> - VP Marketing - <b>Acme</b> | LinkedIn {i}",
+        "link": f"https://www.linkedin.com/in/jane-doe-{i}", "displayLink": "www.linkedin.com",
+        "snippet": snippet, "htmlSnippet": f"<b>{snippet}</b>", "cacheId": f"abc{i}",
+        "formattedUrl": f"https://www.linkedin.com/in/jane-doe-{i}", "htmlFormattedUrl": f"https://www.linkedin.com/in/jane-doe-{i}",
+        "pagemap": {
+            "cse_thumbnail": [{"src": "https://encrypted-tbn0.gstatic.com/images?q=tbn:" + "x" * 60, "width": "225", "height": "225"}],
+            "metatags": [{key: _sentence(rng, 12) for key in (
+                "og:image", "og:type", "og:title", "og:description", "og:url", "twitter:card", "twitter:title",
+                "twitter:description", "profile:first_name", "profile:last_name", "viewport", "al:android:url",
+                "al:ios:url", "locale", "referrer")}],
+            "cse_image": [{"src": "https://media.licdn.com/dms/image/" + "y" * 80}],
+        },
+    }
+
+
+def company_sources(rng):
+    return (
+        {"title": "Acme", "extract": _paragraphs(rng, 8)},
+        [{"source": {"id": None, "name": "Retail Dive"}, "author": "Staff", "title": _sentence(rng, 10),
+          "description": _sentence(rng, 30), "url": "https://example.com/" + "z" * 60,
+          "urlToImage": "https://example.com/img/" + "w" * 60, "publishedAt": "2024-05-01T10:00:00Z",
+          "content": _sentence(rng, 40) + " [+2500 chars]"} for _ in range(5)],
+        [{"title": _sentence(rng, 12), "link": "https://news.google.com/rss/articles/" + "q" * 180,
+          "pubDate": "Wed, 01 May 2024 10:00:00 GMT", "source": "Business Wire"} for _ in range(10)],
+        _sentence(rng, 40),
+        {"search_results": [{"title": _sentence(rng, 8), "link": "https://acme.com/about", "snippet": _sentence(rng, 35)}
+                            for _ in range(5)], "company_url": "https://acme.com"},
+        {"description": _sentence(rng, 25), "title": "Acme | Official Site", "site_name": "Acme"},
+        {"meta_data": {"title": "Acme", "description": _sentence(rng, 25), "keywords": ", ".join(WORDS)},
+         "social_links": {"linkedin": "https://linkedin.com/company/acme", "instagram": "https://instagram.com/acme"},
+         "company_info": {"about": _sentence(rng, 60)}},
+    )
+
+
+def profile_data(rng):
+    return {
+        "name": "Jane Doe", "company": "Acme",
+        "google_custom_search": {
+            "kind": "customsearch#search",
+            "url": {"type": "application/json", "template": "https://www.googleapis.com/customsearch/v1?q={searchTerms}" + "&x={x?}" * 20},
+            "queries": {"request": [{"title": "Google Custom Search", "totalResults": "10", "searchTerms": "x", "count": 10}]},
+            "context": {"title": "LinkedIn"}, "searchInformation": {"searchTime": 0.3, "totalResults": "10"},
+            "items": [_google_item(rng, i) for i in range(10)],
+        },
+        "bing_search": [{"title": _sentence(rng, 8), "link": "https://www.linkedin.com/in/jane-doe",
+                         "snippet": _sentence(rng, 35)} for _ in range(5)],
+        "duckduckgo": _sentence(rng, 40),
+        "google_news": [{"title": _sentence(rng, 12), "link": "https://news.google.com/rss/articles/" + "q" * 180,
+                         "pubDate": "Wed, 01 May 2024 10:00:00 GMT", "source": "Forbes"} for _ in range(10)],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    company_tool = CompanyResearchTool(company_name="Acme")
+    linkedin_tool = LinkedInResearchTool(linkedin_url="https://www.linkedin.com/in/jane-doe", name="Jane Doe", company="Acme")
+    timings = {"CompanyResearchTool": [], "LinkedInResearchTool": []}
+    for _ in range(args.runs):
+        sources = company_sources(rng)
+        start = time.perf_counter()
+        company_tool._summary_prompt(*sources)
+        timings["CompanyResearchTool"].append(time.perf_counter() - start)
+        data = profile_data(rng)
+        start = time.perf_counter()
+        linkedin_tool._summary_prompt(data)
+        timings["LinkedInResearchTool"].append(time.perf_counter() - start)
+
+    stats = get_compaction_stats()
+    print(f"{'source':<45}{'tokens before':>15}{'tokens after':>15}{'reduction':>12}")
+    for tool in timings:
+        total_before = total_after = 0
+        for key, source in stats.items():
+            if key.startswith(tool + ":"):
+                before, after = source["tokens_before"] / source["calls"], source["tokens_after"] / source["calls"]
+                total_before += before
+                total_after += after
+                print(f"{key:<45}{before:>15.0f}{after:>15.0f}{1 - after / max(before, 1):>12.0%}")
+        print(f"{tool + ' (all sources)':<45}{total_before:>15.0f}{total_after:>15.0f}{1 - total_after / total_before:>12.0%}")
+        print(f"{tool + ' compaction p50':<45}{statistics.median(timings[tool]) * 1000:>27.2f} ms\n")
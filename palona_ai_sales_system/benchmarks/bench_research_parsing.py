@@ -0,0 +1,150 @@
+"""
+Benchmark: parse time of Bing result pages, Google News RSS feeds and company homepages with the lxml parsing layer
+(web/parsing.py) against the BeautifulSoup code the research tools used before, and whether both extract the same data.
+
+Usage (from palona_ai_sales_system/):
+    python -m benchmarks.bench_research_parsing
+    python -m benchmarks.bench_research_parsing --pages <dir>
+
+<dir> holds recorded pages, saved from a browser or curl: bing.html, google_news.xml and homepage.html (any missing
+one is generated). Without --pages, pages of typical size and structure are generated.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from web.parsing import parse_bing_results, parse_homepage, parse_rss_items
+
+WORDS = ("brand customer retail growth beauty platform loyalty digital store product launch omnichannel experience "
+         "partnership revenue quarter market consumer skincare fragrance membership").split()
+
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def bing_page(rng):
+    # Bing pages carry far more script, navigation and sidebar than the ten organic results
+    script = "<script>" + "var _w=window,_d=document;function a(b){return b}" * 400 + "</script>"
+    nav = "<ul>" + "".join(f"<li class='b_scopebar'><a href='/s{i}'>{_sentence(rng, 1)}</a></li>" for i in range(12)) + "</ul>"
+    results = "".join(
+        f"<li class='b_algo'><div class='b_tpcn'><a class='tilk' href='https://acme{i}.com'><div class='tpic'></div>"
+        f"<div class='tptxt'>acme{i}.com</div></a></div><h2><a href='https://acme{i}.com/about'>Acme {_sentence(rng, 6)}</a></h2>"
+        f"<div class='b_caption'><p class='b_lineclamp2'><span class='news_dt'>May 1, 2024</span>&nbsp;&#0183;&#32;"
+        f"{_sentence(rng, 30)}</p><ul class='b_vList'>" + "".join(f"<li><a href='/d{j}'>{_sentence(rng, 2)}</a></li>" for j in range(4))
+        + "</ul></div></li>" for i in range(10))
+    sidebar = "".join(f"<div class='b_entityTP'><p>{_sentence(rng, 40)}</p></div>" for _ in range(30))
+    return (f"<!DOCTYPE html><html><head><title>Acme - Search</title>{script}<style>{'.b_algo{margin:0}' * 300}</style>"
+            f"</head><body>{nav}<ol id='b_results'>{results}</ol><aside>{sidebar}</aside>{script}</body></html>")
+
+
+def google_news_feed(rng):
+    items = "".join(
+        f"<item><title>{_sentence(rng, 12)} - Business Wire</title><link>https://news.google.com/rss/articles/{'q' * 180}</link>"
+        f"<guid isPermaLink='false'>{'g' * 60}</guid><pubDate>Wed, 01 May 2024 10:00:00 GMT</pubDate>"
+        f"<description>&lt;ol&gt;&lt;li&gt;&lt;a href=\"x\"&gt;{_sentence(rng, 20)}&lt;/a&gt;&lt;/li&gt;&lt;/ol&gt;</description>"
+        f"<source url='https://www.businesswire.com'>Business Wire</source></item>" for _ in range(100))
+    return (f"<?xml version='1.0' encoding='UTF-8' standalone='yes'?><rss xmlns:media='http://search.yahoo.com/mrss/' "
+            f"version='2.0'><channel><generator>NFE/5.0</generator><title>Acme - Google News</title>{items}</channel></rss>")
+
+
+def homepage(rng):
+    meta = ("<meta name='description' content='Acme makes beauty products'><meta name='keywords' content='beauty,retail'>"
+            "<meta property='og:title' content='Acme'><meta property='og:site_name' content='Acme'>"
+            "<meta property='og:description' content='Acme makes beauty products'>")
+    script = "<script>" + "window.__STATE__={\"products\":[1,2,3]};" * 3000 + "</script>"
+    products = "".join(f"<div class='product'><a href='/p/{i}'><img src='/i/{i}.jpg'><span>{_sentence(rng, 4)}</span></a>"
+                       f"<p>{_sentence(rng, 15)}</p></div>" for i in range(300))
+    footer = ("<footer><p>About Acme: the company behind your favourite products.</p>"
+              "<a href='https://www.linkedin.com/company/acme'>LinkedIn</a><a href='https://twitter.com/acme'>X</a>"
+              "<a href='https://www.instagram.com/acme'>Instagram</a></footer>")
+    return f"<html><head><title>Acme | Official Site</title>{meta}{script}</head><body>{products}{footer}</body></html>"
+
+
+# The research tools' BeautifulSoup parsing before web/parsing.py
+
+def bs4_bing(text):
+    soup = BeautifulSoup(text, 'html.parser')
+    results = []
+    for result in soup.find_all('li', class_='b_algo'):
+        title_elem = result.find('h2')
+        link_elem = result.find('a')
+        snippet_elem = result.find('div', class_='b_caption')
+        if title_elem and link_elem and snippet_elem:
+            title = title_elem.get_text(strip=True)
+            link = link_elem.get('href', '')
+            snippet = snippet_elem.get_text(strip=True)
+            if title and link and snippet:
+                results.append({'title': title, 'link': link, 'snippet': snippet})
+    return results[:5]
+
+
+def bs4_rss(text):
+    soup = BeautifulSoup(text, 'xml')
+    return [{
+        'title': item.title.text if item.title else '',
+        'link': item.link.text if item.link else '',
+        'pubDate': item.pubDate.text if item.pubDate else '',
+        'source': item.source.text if item.source else ''
+    } for item in soup.find_all('item')[:10]]
+
+
+def bs4_homepage(text):
+    soup = BeautifulSoup(text, "html.parser")
+    meta, social_links, about, title = {}, {}, None, None
+    for tag in soup.find_all(["title", "meta", "a", "p"]):
+        if tag.name == "meta":
+            for key in (tag.get("name"), tag.get("property")):
+                if key:
+                    meta.setdefault(key.lower(), tag.get("content", ""))
+        elif tag.name == "a":
+            href = tag.get("href", "")
+            for network in ("linkedin", "twitter", "facebook", "instagram"):
+                if f"{network}.com" in href:
+                    social_links[network] = href
+                    break
+        elif tag.name == "p":
+            if about is None:
+                p_text = tag.get_text(strip=True)
+                if 'about' in p_text.lower() or 'company' in p_text.lower():
+                    about = p_text
+        elif title is None:
+            title = tag.string
+    return {"title": title, "meta": meta, "social_links": social_links, "about": about}
+
+
+def _time(parse, text, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = parse(text)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", help="Directory with recorded bing.html, google_news.xml and homepage.html")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    cases = [
+        ("bing.html", bing_page, bs4_bing, lambda text: parse_bing_results(text, 5)),
+        ("google_news.xml", google_news_feed, bs4_rss, lambda text: parse_rss_items(text, 10)),
+        ("homepage.html", homepage, bs4_homepage, parse_homepage),
+    ]
+    print(f"{'page':<18}{'KB':>8}{'BeautifulSoup':>16}{'lxml':>12}{'speedup':>10}  same output")
+    for name, generate, old, new in cases:
+        path = Path(args.pages) / name if args.pages else None
+        text = path.read_text(errors="replace") if path and path.exists() else generate(rng)
+        old_seconds, old_result = _time(old, text, args.runs)
+        new_seconds, new_result = _time(new, text, args.runs)
+        print(f"{name:<18}{len(text.encode()) / 1024:>8.0f}{old_seconds * 1000:>13.2f} ms{new_seconds * 1000:>9.2f} ms"
+              f"{old_seconds / new_seconds:>9.1f}x  {'yes' if old_result == new_result else 'no'}")
@@ -0,0 +1,78 @@
+"""
+Benchmark: build time, index size and k-NN query latency of the semantic similar-deal index.
+
+Usage (from palona_ai_sales_system/):
+    python -m benchmarks.bench_semantic_deals --deals 500000
+
+Runs twice: on synthetic CRM deals (few distinct feature vectors, exact scan) and on deals with free-text industries
+(many distinct vectors, IVF index), where recall@5 against an exact scan is reported too.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.synthetic_crm import _deal
+from crm.semantic_deals import SemanticDealIndex
+
+QUERIES = ["Personal Care", "Beauty & Cosmetics", "Fashion & Retail", "Coffee Shop", "Fitness Studio", "Grocery",
+           "Boutique Hotel", "Consumer Electronics"]
+WORDS = ["artisan", "organic", "urban", "luxury", "vegan", "craft", "boutique", "premium", "family", "global", "local",
+         "beauty", "skincare", "apparel", "footwear", "cafe", "bakery", "fitness", "wellness", "hotel", "grocery",
+         "pet", "toys", "jewelry", "furniture", "outdoor", "sports", "kids", "home", "garden", "wine", "coffee", "tea"]
+
+
+def _free_text_deals(n, rng):
+    deals = []
+    for i in range(n):
+        deal = _deal(rng, i)
+        deal["industry"] = " ".join(rng.sample(WORDS, 3)).title() + f" {rng.randrange(5000)}"
+        deals.append(deal)
+    return deals
+
+
+def _run(name, deals, k=5):
+    start = time.perf_counter()
+    index = SemanticDealIndex.build(deals)
+    build = time.perf_counter() - start
+    path = os.path.join(tempfile.mkdtemp(), "crm_data_deals.ann.npz")
+    index.save(path)
+    start = time.perf_counter()
+    index = SemanticDealIndex.load(path)
+    load = time.perf_counter() - start
+
+    latencies, recalls = [], []
+    for query in QUERIES * 5:
+        criteria = {"deal_size": 250000}
+        start = time.perf_counter()
+        results = index.search(query, criteria, k)
+        latencies.append(time.perf_counter() - start)
+        if index.centroids is not None:
+            # Exact scores of the returned deals vs the exact k best scores
+            exact = np.sort(index.vectors @ index.query_vector(query, criteria))[::-1][:k]
+            recalls.append(np.mean([score >= exact[-1] - 1e-6 for _, score in results]))
+    print(f"\n{name}: {len(deals)} deals, {len(index.vectors)} distinct vectors, "
+          f"{'IVF' if index.centroids is not None else 'exact scan'}")
+    print(f"  build                     {build * 1000:>10.1f} ms")
+    print(f"  index file                {os.path.getsize(path) / 1024 / 1024:>10.1f} MB")
+    print(f"  load                      {load * 1000:>10.1f} ms")
+    print(f"  query p50                 {statistics.median(latencies) * 1000:>10.2f} ms")
+    print(f"  query max                 {max(latencies) * 1000:>10.2f} ms")
+    if recalls:
+        print(f"  recall@{k} vs exact         {np.mean(recalls):>10.2f}")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--deals", type=int, default=500000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    _run("synthetic CRM deals", [_deal(rng, i) for i in range(args.deals)])
+    _run("free-text industries", _free_text_deals(args.deals, rng))
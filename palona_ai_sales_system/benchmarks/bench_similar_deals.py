@@ -0,0 +1,124 @@
+"""
+Benchmark: SimilarDealsTool scoring with the original per-deal Python loop vs the vectorized DealMatrix
+(full scan, and candidates from the industry index), and a rep queue of --queue leads queried one by one
+vs in one batch (keyword and semantic search).
+
+Usage (from palona_ai_sales_system/):
+    python -m benchmarks.bench_similar_deals --deals 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.synthetic_crm import _deal
+from crm.deals import DealMatrix
+from crm.semantic_deals import SemanticDealIndex
+
+QUERIES = [
+    ("Fashion & Retail", {"deal_size": 250000}),
+    ("Beauty", {}),
+    ("Food & Restaurant", {"deal_size": 80000}),
+    ("Grocery", {"deal_size": 500000}),
+]
+
+
+def loop_similar_deals(deals, industry, criteria, k=5):
+    """The scoring SimilarDealsTool used before DealMatrix: score every deal in Python, sort, take the top k"""
+    scored_deals = []
+    for deal in deals:
+        if deal.get("status") != "successful":
+            continue
+        score = 0.0
+        deal_industry = deal.get("industry", "").lower()
+        target_industry_lower = industry.lower()
+        if target_industry_lower in deal_industry or deal_industry in target_industry_lower:
+            score += 1
+        elif any(word in deal_industry for word in target_industry_lower.split()):
+            score += 0.9
+        if "deal_size" in deal and "deal_size" in criteria:
+            size_diff = abs(deal["deal_size"] - criteria["deal_size"])
+            score += max(0, 0.2 - (size_diff / criteria["deal_size"]) * 0.2)
+        if score > 0:
+            scored_deals.append({
+                "deal_id": deal.get("id"),
+                "company_name": deal.get("company"),
+                "industry": deal.get("industry"),
+                "deal_size": deal.get("deal_size"),
+                "deal_date": deal.get("start_date"),
+                "completion_date": deal.get("completion_date"),
+                "key_metrics": deal.get("key_metrics"),
+                "similarity_score": round(score, 2)
+            })
+    scored_deals.sort(key=lambda x: x["similarity_score"], reverse=True)
+    return scored_deals[:k]
+
+
+def bench_queue(deals, matrix, n_queries):
+    """Per-query vs batch similar deals for a rep queue of (industry, deal_size) queries; both must agree"""
+    rng = random.Random(1)
+    industries = sorted({deal["industry"] for deal in deals[:1000]}) + ["Personal Care", "Coffee Shop", "Skincare"]
+    queries = [(rng.choice(industries), {"deal_size": rng.randrange(20, 1000) * 1000}) for _ in range(n_queries)]
+    index = SemanticDealIndex.build(deals)
+    results = {}
+    for name, single, batch in (("keyword", matrix.search, matrix.search_many),
+                                ("semantic", index.search, index.search_many)):
+        start = time.perf_counter()
+        expected = [single(industry, criteria) for industry, criteria in queries]
+        results[f"{name}: {n_queries} queries one by one"] = time.perf_counter() - start
+        start = time.perf_counter()
+        matches = batch(queries)
+        results[f"{name}: {n_queries} queries in one batch"] = time.perf_counter() - start
+        # Batched matrix products may differ from one-by-one in the last float bits, so compare the deals only
+        assert [[m[0] if isinstance(m, tuple) else m["deal_id"] for m in q] for q in matches] == \
+               [[m[0] if isinstance(m, tuple) else m["deal_id"] for m in q] for q in expected], name
+    return results
+
+
+def bench(n, n_queries):
+    rng = random.Random(0)
+    deals = [_deal(rng, i) for i in range(n)]
+    results = {}
+
+    start = time.perf_counter()
+    matrix = DealMatrix(deals)
+    results["matrix build (once per CRM change)"] = time.perf_counter() - start
+
+    loop_total = matrix_total = index_total = 0.0
+    for industry, criteria in QUERIES:
+        start = time.perf_counter()
+        expected = loop_similar_deals(deals, industry, criteria)
+        loop_total += time.perf_counter() - start
+        start = time.perf_counter()
+        matches = matrix.top_k(matrix.scores(industry, criteria))
+        matrix_total += time.perf_counter() - start
+        assert matches == expected, (industry, criteria)
+        start = time.perf_counter()
+        matches = matrix.search(industry, criteria)
+        index_total += time.perf_counter() - start
+        assert matches == expected, (industry, criteria)
+    results["python loop per query"] = loop_total / len(QUERIES)
+    results["vectorized full scan per query"] = matrix_total / len(QUERIES)
+    results["industry index per query"] = index_total / len(QUERIES)
+    results.update(bench_queue(deals, matrix, n_queries))
+
+    # Incremental maintenance: new deals and status changes (includes growing the columns once)
+    start = time.perf_counter()
+    for i in range(500):
+        matrix.upsert(dict(deals[i], id=f"DEAL-NEW-{i}", status="successful"))
+        matrix.upsert(dict(deals[i], status="lost" if deals[i]["status"] == "successful" else "successful"))
+    results["incremental deal update (avg of 1000)"] = (time.perf_counter() - start) / 1000
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--deals", type=int, default=1000000)
+    parser.add_argument("--queue", type=int, default=5000, help="Queries in the rep-queue comparison")
+    args = parser.parse_args()
+    results = bench(args.deals, args.queue)
+    print(f"{args.deals} deals (full scan and industry index identical to the loop for {len(QUERIES)} queries)")
+    for name, seconds in results.items():
+        print(f"  {name:<44} {seconds * 1000:>10.1f} ms")
@@ -0,0 +1,186 @@
+"""
+Synthetic CRM generator: writes a crm_data.json with the same schema as data/crm_data.json at any size.
+
+Usage (from palona_ai_sales_system/):
+    python -m benchmarks.synthetic_crm --leads 100000 --output /tmp/crm_100k/crm_data.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from crm.message_store import MessageStore
+
+FIRST_NAMES = ["Calvin", "John", "Artemis", "Brian", "Todd", "Laura", "Maria", "David", "Priya", "Wei", "Sofia", "James",
+               "Aisha", "Carlos", "Emma", "Kenji", "Olivia", "Noah", "Fatima", "Lucas"]
+LAST_NAMES = ["McDonald", "Donahoe", "Patrick", "Niccol", "Graves", "Nguyen", "Garcia", "Smith", "Patel", "Chen",
+              "Rossi", "Johnson", "Khan", "Lopez", "Martin", "Tanaka", "Brown", "Davis", "Ali", "Silva"]
+COMPANY_WORDS = ["Blue", "Harbor", "Summit", "Green", "Urban", "Golden", "Crest", "Pine", "Maple", "Nova", "Bright",
+                 "Coastal", "Peak", "River", "Stone", "Velvet", "Copper", "Atlas", "Lumen", "Willow"]
+COMPANY_SUFFIXES = ["Market", "Kitchen", "Apparel", "Beauty", "Wellness", "Foods", "Outfitters", "Cafe", "Labs", "Goods"]
+INDUSTRIES = ["Fashion & Retail", "Food & Restaurant", "Beauty & Retail", "Health & Wellness", "Retail & Beauty",
+              "Hospitality", "Consumer Electronics", "Grocery"]
+SEGMENTS = ["Enterprise", "Mid-Market", "SMB"]
+LOCATIONS = [
+    ("USA", "America/New_York", "New York, New York"),
+    ("USA", "America/Los_Angeles", "Los Angeles, California"),
+    ("USA", "America/Chicago", "Chicago, Illinois"),
+    ("Canada", "America/Vancouver", "Vancouver, Canada"),
+    ("Canada", "America/Toronto", "Toronto, Canada"),
+    ("France", "Europe/Paris", "Paris, France"),
+    ("UK", "Europe/London", "London, UK"),
+]
+JOB_TITLES = ["CEO", "President & CEO", "Founder & CEO", "COO", "CTO", "VP of Marketing", "Head of Digital", "CMO"]
+COMPANY_SIZES = ["11-50", "51-200", "500+", "1,001-5,000", "10,001+", "39,000+", "100,000+"]
+STATUSES = ["New Lead", "Qualified", "Contacted", "Proposal Sent", "Closed Won", "Closed Lost"]
+DEAL_STAGES = ["Discovery", "Qualification", "Proposal", "Negotiation", "Closed"]
+CONTACT_METHODS = ["Email", "Video Call", "Phone"]
+SALES_REPS = ["Sue", "Laura", "Alex", "Jordan", "Sam"]
+NOTES = [
+    "Interested in implementing AI for personalized shopping experiences",
+    "Exploring AI solutions for digital transformation and customer experience",
+    "Looking to enhance customer consultations with AI",
+    "Wants to automate phone ordering during peak hours",
+    "Evaluating AI agents for loyalty and retention campaigns",
+]
+DEAL_STATUSES = ["successful", "successful", "successful", "in_progress", "lost"]
+IMPLEMENTATION_TYPES = ["full_integration", "pilot", "phased_rollout"]
+
+
+def _day(rng: random.Random, start: date, span_days: int) -> str:
+    return (start + timedelta(days=rng.randrange(span_days))).isoformat()
+
+
+def _company(rng: random.Random, i: int) -> str:
+    # Enough distinct names that company lookups are selective at every scale
+    return f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)} {i // 10}"
+
+
+def _lead(rng: random.Random, i: int) -> dict:
+    first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    company_name = _company(rng, i)
+    slug = company_name.lower().replace(" ", "")
+    country, timezone, headquarters = rng.choice(LOCATIONS)
+    last_contact = _day(rng, date(2024, 1, 1), 500)
+    return {
+        "record_id": str(i + 1),
+        "first_name": first_name,
+        "last_name": last_name,
+        "became_a_lead_date": _day(rng, date(2023, 1, 1), 800),
+        "company_name": company_name,
+        "country": country,
+        "email": f"{first_name.lower()}.{last_name.lower()}@{slug}.example.com",
+        "job_title": rng.choice(JOB_TITLES),
+        "company_website": f"https://www.{slug}.example.com",
+        "linkedin_url": f"https://www.linkedin.com/in/{first_name.lower()}-{last_name.lower()}-{i + 1}/",
+        "company_size": rng.choice(COMPANY_SIZES),
+        "industry": rng.choice(INDUSTRIES),
+        "lead_score": rng.randint(40, 99),
+        "customer_segment": rng.choice(SEGMENTS),
+        "notes": rng.choice(NOTES),
+        "status": rng.choice(STATUSES),
+        "deal_date": None,
+        "deal_size": None,
+        "last_contact_date": last_contact,
+        "next_follow_up": (date.fromisoformat(last_contact) + timedelta(days=7)).isoformat(),
+        "deal_stage": rng.choice(DEAL_STAGES),
+        "interaction_count": rng.randint(0, 12),
+        "preferred_contact_method": rng.choice(CONTACT_METHODS),
+        "timezone": timezone,
+        "company_annual_revenue": f"${rng.randint(1, 900)}M",
+        "company_founded": str(rng.randint(1950, 2022)),
+        "company_headquarters": headquarters,
+        "social_media_presence": {
+            "linkedin": f"https://linkedin.com/company/{slug}",
+            "instagram": f"https://instagram.com/{slug}"
+        },
+        "sales_rep": rng.choice(SALES_REPS),
+        "message_log": []
+    }
+
+
+def _messages(rng: random.Random, lead: dict, count: int) -> list:
+    start = date.fromisoformat(lead["became_a_lead_date"])
+    timestamps = sorted(_day(rng, start, 400) for _ in range(count))
+    return [
+        {
+            "message": f"Hi {lead['first_name']},\n\nFollowing up on how Palona AI could help {lead['company_name']} "
+                       f"with {lead['notes'].lower()}.\n\nBest,\n{lead['sales_rep']}",
+            "timestamp": timestamp
+        }
+        for timestamp in timestamps
+    ]
+
+
+def _deal(rng: random.Random, i: int) -> dict:
+    start = _day(rng, date(2022, 1, 1), 900)
+    duration = rng.choice([30, 60, 90, 120, 180])
+    return {
+        "id": f"DEAL-{i + 1:03d}",
+        "company": _company(rng, i),
+        "industry": rng.choice(INDUSTRIES),
+        "deal_size": rng.randrange(25000, 1000000, 5000),
+        "status": rng.choice(DEAL_STATUSES),
+        "implementation_type": rng.choice(IMPLEMENTATION_TYPES),
+        "implementation_duration_days": duration,
+        "start_date": start,
+        "completion_date": (date.fromisoformat(start) + timedelta(days=duration)).isoformat(),
+        "key_metrics": {
+            "roi": rng.randint(80, 300),
+            "customer_satisfaction": round(rng.uniform(3.5, 5.0), 1),
+            "adoption_rate": rng.randint(50, 99)
+        }
+    }
+
+
+def generate_crm(output, leads: int, deals: int = None, message_ratio: float = 0.2, max_messages: int = 5,
+                 embed_messages: bool = False, seed: int = 0) -> dict:
+    """
+    Write a synthetic CRM file with `leads` leads and `deals` deals (leads // 10 by default), streamed record by record.
+    About message_ratio of the leads get 1..max_messages message_log entries. By default these go to the lead's
+    message store segment next to the file (<stem>_messages/), like a migrated CRM; embed_messages keeps them inside
+    the leads instead, like an older export.
+    Output is deterministic for a given seed. Returns counts of what was written.
+    """
+    rng = random.Random(seed)
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    deals = max(1, leads // 10) if deals is None else deals
+    store = MessageStore(output.with_name(f"{output.stem}_messages"))
+    message_count = 0
+    with open(output, 'w') as f:
+        f.write('{\n    "crm_leads": [')
+        for i in range(leads):
+            lead = _lead(rng, i)
+            if rng.random() < message_ratio:
+                messages = _messages(rng, lead, rng.randint(1, max_messages))
+                message_count += len(messages)
+                if embed_messages:
+                    lead["message_log"] = messages
+                else:
+                    store.write_archive(lead["record_id"], messages)
+            if not embed_messages:
+                del lead["message_log"]
+            f.write(("" if i == 0 else ",") + "\n        " + json.dumps(lead))
+        f.write('\n    ],\n    "deals": [')
+        for i in range(deals):
+            f.write(("" if i == 0 else ",") + "\n        " + json.dumps(_deal(rng, i)))
+        f.write('\n    ]\n}\n')
+    return {"leads": leads, "deals": deals, "messages": message_count}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--leads", type=int, default=1000)
+    parser.add_argument("--deals", type=int, help="Number of deals (default: leads // 10)")
+    parser.add_argument("--message-ratio", type=float, default=0.2, help="Share of leads with a message history")
+    parser.add_argument("--max-messages", type=int, default=5)
+    parser.add_argument("--embed-messages", action="store_true", help="Keep message logs inside the leads (older export format)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+    print(generate_crm(args.output, args.leads, args.deals, args.message_ratio, args.max_messages, args.embed_messages, args.seed))
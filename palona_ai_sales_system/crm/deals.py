@@ -0,0 +1,397 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Upper bound on the cells of one (queries x deals) score matrix in DealMatrix.search_many
+BATCH_SCORE_CELLS = 4_000_000
+
+# Per-row columns of a DealMatrix and their dtypes
+_COLUMNS = {
+    "industry_ids": np.int32,
+    "deal_size": np.float64,
+    "successful": bool,
+    "ids": object,
+    "companies": object,
+    "raw_industries": object,
+    "raw_sizes": object,
+    "start_dates": object,
+    "completion_dates": object,
+    "key_metrics": object,
+}
+
+
+class IndustryIndex:
+    """
+    Inverted index from industry ids to successful deals (rows of a DealMatrix), so a query only touches the deals
+    of the industries it matches. Rows are added and removed one at a time as deals change; nothing is rebuilt per query.
+    """
+
+    def __init__(self):
+        self._rows = {}
+        # Sorted row arrays per industry, built lazily and dropped when the industry's rows change
+        self._arrays = {}
+
+    def set_rows(self, industry_id: int, rows: np.ndarray):
+        """Replace the successful rows of an industry (sorted), e.g. when bulk loading"""
+        self._rows[industry_id] = set(rows.tolist())
+        self._arrays[industry_id] = rows.astype(np.int64)
+
+    def add(self, row: int, industry_id: int):
+        self._rows.setdefault(industry_id, set()).add(row)
+        self._arrays.pop(industry_id, None)
+
+    def discard(self, row: int, industry_id: int):
+        rows = self._rows.get(industry_id)
+        if rows is not None and row in rows:
+            rows.discard(row)
+            self._arrays.pop(industry_id, None)
+
+    def candidates(self, industry_ids: Iterable[int]) -> np.ndarray:
+        """Rows of the successful deals of the given industries"""
+        arrays = []
+        for industry_id in industry_ids:
+            array = self._arrays.get(industry_id)
+            if array is None:
+                array = np.fromiter(sorted(self._rows.get(industry_id, ())), dtype=np.int64)
+                self._arrays[industry_id] = array
+            arrays.append(array)
+        return np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.int64)
+
+
+class DealMatrix:
+    """
+    Column arrays over the CRM deals, so similar-deal scoring runs over all (or all candidate) deals in one vectorized pass.
+    Industries are stored as ids into the list of distinct industries: the (string) industry match is computed once
+    per distinct industry and then gathered for every deal. Only the top-k deals are turned back into dicts.
+    Deals can be added, changed and removed in place (upsert/remove/sync), which also keeps the IndustryIndex
+    of successful deals current.
+    """
+
+    def __init__(self, deals: Iterable[Dict] = ()):
+        self._size = 0
+        self._columns = {name: np.zeros(0, dtype=dtype) for name, dtype in _COLUMNS.items()}
+        self._rows_by_key = {}
+        self.industries = []
+        self._industries_lower = []
+        self._industry_ids = {}
+        self.index = IndustryIndex()
+        self.sync(deals)
+
+    def __len__(self):
+        return self._size
+
+    def column(self, name: str) -> np.ndarray:
+        """One column (see _COLUMNS), trimmed to the rows in use"""
+        return self._columns[name][:self._size]
+
+    def _industry_id(self, industry: str) -> int:
+        industry_id = self._industry_ids.get(industry)
+        if industry_id is None:
+            industry_id = self._industry_ids[industry] = len(self.industries)
+            self.industries.append(industry)
+            self._industries_lower.append(industry.lower())
+        return industry_id
+
+    def _values(self, deal: Dict) -> Dict:
+        size = deal.get("deal_size")
+        return {
+            "industry_ids": self._industry_id(deal.get("industry") or ""),
+            "deal_size": size if isinstance(size, (int, float)) and not isinstance(size, bool) else np.nan,
+            "successful": deal.get("status") == "successful",
+            "ids": deal.get("id"),
+            "companies": deal.get("company"),
+            "raw_industries": deal.get("industry"),
+            "raw_sizes": size,
+            "start_dates": deal.get("start_date"),
+            "completion_dates": deal.get("completion_date"),
+            "key_metrics": deal.get("key_metrics"),
+        }
+
+    def _changed(self, row: int, values: Dict) -> bool:
+        for name, value in values.items():
+            current = self._columns[name][row]
+            if name == "deal_size":
+                if not (current == value or (np.isnan(current) and np.isnan(value))):
+                    return True
+            elif current != value:
+                return True
+        return False
+
+    def upsert(self, deal: Dict, key=None):
+        """Add a deal, or update it in place if a deal with the same id (or key) is already in the matrix"""
+        key = deal_key(deal, self._size) if key is None else key
+        values = self._values(deal)
+        row = self._rows_by_key.get(key)
+        if row is None:
+            row = self._size
+            if row == len(self._columns["ids"]):
+                # Grow all columns geometrically so appends are amortized O(1)
+                capacity = max(16, 2 * row)
+                for name, column in self._columns.items():
+                    grown = np.zeros(capacity, dtype=column.dtype)
+                    grown[:row] = column
+                    self._columns[name] = grown
+            self._size += 1
+            self._rows_by_key[key] = row
+        elif self._changed(row, values):
+            if self._columns["successful"][row]:
+                self.index.discard(row, int(self._columns["industry_ids"][row]))
+        else:
+            return
+        for name, value in values.items():
+            self._columns[name][row] = value
+        if values["successful"]:
+            self.index.add(row, values["industry_ids"])
+
+    def remove(self, key):
+        """Drop a deal from the results; its row is kept but never matches again"""
+        row = self._rows_by_key.pop(key, None)
+        if row is not None and self._columns["successful"][row]:
+            self.index.discard(row, int(self._columns["industry_ids"][row]))
+            self._columns["successful"][row] = False
+
+    def _load(self, deals: Iterable[Dict]):
+        """Fill an empty matrix column-wise, which is much faster than upserting deal by deal"""
+        columns = {name: [] for name in _COLUMNS}
+        industry_ids, deal_size, successful = columns["industry_ids"], columns["deal_size"], columns["successful"]
+        ids, companies, raw_industries, raw_sizes = columns["ids"], columns["companies"], columns["raw_industries"], columns["raw_sizes"]
+        start_dates, completion_dates, key_metrics = columns["start_dates"], columns["completion_dates"], columns["key_metrics"]
+        rows_by_key = self._rows_by_key
+        for i, deal in enumerate(deals):
+            key = deal_key(deal, i)
+            if key in rows_by_key:
+                # A repeated id updates the earlier deal, as upsert would
+                for name, value in self._values(deal).items():
+                    columns[name][rows_by_key[key]] = value
+                continue
+            rows_by_key[key] = len(ids)
+            industry = deal.get("industry")
+            industry_id = self._industry_ids.get(industry or "")
+            industry_ids.append(self._industry_id(industry or "") if industry_id is None else industry_id)
+            size = deal.get("deal_size")
+            deal_size.append(size if isinstance(size, (int, float)) and not isinstance(size, bool) else np.nan)
+            successful.append(deal.get("status") == "successful")
+            ids.append(deal.get("id"))
+            companies.append(deal.get("company"))
+            raw_industries.append(industry)
+            raw_sizes.append(size)
+            start_dates.append(deal.get("start_date"))
+            completion_dates.append(deal.get("completion_date"))
+            key_metrics.append(deal.get("key_metrics"))
+        self._size = len(ids)
+        for name, values in columns.items():
+            column = np.empty(len(values), dtype=_COLUMNS[name])
+            column[:] = values
+            self._columns[name] = column
+        successful_rows = np.flatnonzero(self._columns["successful"])
+        successful_industries = self._columns["industry_ids"][successful_rows]
+        for industry_id in np.unique(successful_industries):
+            self.index.set_rows(int(industry_id), successful_rows[successful_industries == industry_id])
+
+    def sync(self, deals: Iterable[Dict]):
+        """Apply the difference between the matrix and the CRM's current deals: new, changed and removed deals"""
+        if not self._size:
+            self._load(deals)
+            return
+        seen = set()
+        for i, deal in enumerate(deals):
+            key = deal_key(deal, i)
+            seen.add(key)
+            self.upsert(deal, key)
+        for key in [key for key in self._rows_by_key if key not in seen]:
+            self.remove(key)
+
+    def industry_scores(self, industry: str) -> np.ndarray:
+        """
+        Industry part of the similarity score, per distinct industry: 1 if one industry contains the other, else 0.9
+        if any word of the target industry appears in the deal's industry (so "Tech" matches "Technology"), else 0
+        """
+        target = (industry or "").lower()
+        words = target.split()
+        return np.array([
+            1.0 if target in deal_industry or deal_industry in target
+            else 0.9 if any(word in deal_industry for word in words)
+            else 0.0
+            for deal_industry in self._industries_lower
+        ], dtype=np.float64)
+
+    def scores(self, industry: str, criteria: Optional[Dict] = None, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Similarity score of every deal (or of the given rows): industry_scores() of its industry, plus up to 0.2 for
+        a deal_size close to criteria["deal_size"]
+        """
+        return self._scores(self.industry_scores(industry), criteria, rows)
+
+    def _scores(self, per_industry: np.ndarray, criteria: Optional[Dict], rows: Optional[np.ndarray]) -> np.ndarray:
+        industry_ids = self.column("industry_ids") if rows is None else self.column("industry_ids")[rows]
+        deal_size = self.column("deal_size") if rows is None else self.column("deal_size")[rows]
+        scores = per_industry[industry_ids] if len(per_industry) else np.zeros(len(industry_ids))
+        criteria = criteria or {}
+        if criteria.get("deal_size"):
+            target_size = float(criteria["deal_size"])
+            size_scores = np.maximum(0, 0.2 - (np.abs(deal_size - target_size) / target_size) * 0.2)
+            # Deals without a numeric deal_size get no size score
+            scores = scores + np.nan_to_num(size_scores, nan=0.0)
+        return scores
+
+    def top_k(self, scores: np.ndarray, k: int = 5, rows: Optional[np.ndarray] = None) -> List[Dict]:
+        """
+        Return the k successful deals with the highest (2-decimal) score above zero, as SimilarDealsTool matches.
+        scores are for all deals, or for `rows` if given. Ties keep CRM order, like a stable sort.
+        """
+        if k <= 0:
+            return []
+        rows = np.arange(len(self)) if rows is None else rows
+        eligible = self.column("successful")[rows] & (scores > 0)
+        candidates, scores = rows[eligible], scores[eligible]
+        rounded = np.round(scores, 2)
+        if len(candidates) > k:
+            # argpartition finds the k-th best score; everything above it plus the earliest ties make the top k
+            kth = rounded[np.argpartition(-rounded, k - 1)[k - 1]]
+            above = np.flatnonzero(rounded > kth)
+            tied = np.flatnonzero(rounded == kth)
+            tied = tied[np.argsort(candidates[tied], kind="stable")][:k - len(above)]
+            keep = np.concatenate([above, tied])
+            candidates, scores, rounded = candidates[keep], scores[keep], rounded[keep]
+        order = np.lexsort((candidates, -rounded))
+        return [self.match(candidates[i], scores[i]) for i in order]
+
+    def search(self, industry: str, criteria: Optional[Dict] = None, k: int = 5) -> List[Dict]:
+        """
+        Top-k similar successful deals, the same as a full scan (top_k of scores()): only the deals of the industries
+        the query matches are scored. An industry match (0.9 or more) outranks any deal_size score (0.2 at most),
+        so other deals are only scanned when fewer than k deals match the industry and criteria has a deal_size.
+        """
+        per_industry = self.industry_scores(industry)
+        rows = self.index.candidates(np.flatnonzero(per_industry).tolist())
+        if len(rows) < k and (criteria or {}).get("deal_size"):
+            return self.top_k(self._scores(per_industry, criteria, None), k)
+        return self.top_k(self._scores(per_industry, criteria, rows), k, rows)
+
+    def search_many(self, queries: Sequence[Tuple[str, Optional[Dict]]], k: int = 5) -> List[List[Dict]]:
+        """
+        search() for many (industry, criteria) queries at once, e.g. a whole rep queue. Candidates and industry scores
+        are computed once per distinct industry, then the scores and top k of all its queries as one matrix per chunk;
+        queries with the same industry and deal_size are scored once. Returns the matches of each query, in query order.
+        """
+        groups = {}
+        for i, (industry, criteria) in enumerate(queries):
+            size = (criteria or {}).get("deal_size")
+            groups.setdefault(industry or "", {}).setdefault(float(size) if size else None, []).append(i)
+        results = [None] * len(queries)
+        for industry, by_size in groups.items():
+            # Sorted rows, so the earliest tied deals are the leftmost columns
+            per_industry = self.industry_scores(industry)
+            rows = np.sort(self.index.candidates(np.flatnonzero(per_industry).tolist()))
+            if len(rows) < k:
+                # Deals of other industries can fill the top k on deal_size (see search)
+                for target, indices in by_size.items():
+                    matches = self.search(industry, {"deal_size": target} if target else None, k)
+                    for i in indices:
+                        results[i] = [dict(match) for match in matches]
+                continue
+            base = self._scores(per_industry, None, rows)
+            # An infinite size scores 0, like a missing one
+            deal_size = np.nan_to_num(self.column("deal_size")[rows], nan=np.inf)
+            targets = list(by_size)
+            chunk = max(1, BATCH_SCORE_CELLS // max(1, len(rows)))
+            for start in range(0, len(targets), chunk):
+                batch = targets[start:start + chunk]
+                scores = np.empty((len(batch), len(rows)))
+                for j, target in enumerate(batch):
+                    if target is None:
+                        scores[j] = base
+                        continue
+                    # base + max(0, 0.2 - |size - target| / target * 0.2), in place
+                    size_scores = scores[j]
+                    np.subtract(deal_size, target, out=size_scores)
+                    np.abs(size_scores, out=size_scores)
+                    size_scores /= target
+                    size_scores *= 0.2
+                    np.subtract(0.2, size_scores, out=size_scores)
+                    np.maximum(size_scores, 0, out=size_scores)
+                    size_scores += base
+                for target, matches in zip(batch, self._top_k_many(scores, k, rows)):
+                    for i in by_size[target]:
+                        results[i] = [dict(match) for match in matches]
+        return results
+
+    def _top_k_many(self, scores: np.ndarray, k: int, rows: np.ndarray) -> List[List[Dict]]:
+        """top_k for each row of a (queries x rows) score matrix, with `rows` sorted ascending"""
+        if k <= 0:
+            return [[] for _ in scores]
+        rounded = np.round(scores, 2)
+        rounded[~(self.column("successful")[rows] & (scores > 0))] = -np.inf
+        # The k-th best score per query; everything above it plus the leftmost (earliest) ties make the top k
+        kth = np.partition(rounded, len(rows) - k, axis=1)[:, len(rows) - k] if len(rows) > k else np.full(len(rounded), -np.inf)
+        results = []
+        for query_scores, query_rounded, query_kth in zip(scores, rounded, kth):
+            if query_kth == -np.inf:
+                columns = np.flatnonzero(query_rounded > -np.inf)
+            else:
+                above = np.flatnonzero(query_rounded > query_kth)
+                columns = np.concatenate([above, np.flatnonzero(query_rounded == query_kth)[:k - len(above)]])
+            columns = columns[np.lexsort((columns, -query_rounded[columns]))]
+            results.append([self.match(rows[c], query_scores[c]) for c in columns])
+        return results
+
+    def row(self, key) -> Optional[int]:
+        """Row of the deal with the given deal_key, or None"""
+        return self._rows_by_key.get(key)
+
+    def match(self, row: int, score: float) -> Dict:
+        """A row as a SimilarDealsTool match with the given similarity score"""
+        return {
+            "deal_id": self._columns["ids"][row],
+            "company_name": self._columns["companies"][row],
+            "industry": self._columns["raw_industries"][row],
+            "deal_size": self._columns["raw_sizes"][row],
+            "deal_date": self._columns["start_dates"][row],
+            "completion_date": self._columns["completion_dates"][row],
+            "key_metrics": self._columns["key_metrics"][row],
+            "similarity_score": round(float(score), 2)
+        }
+
+
+def deal_key(deal: Dict, position: int) -> str:
+    """
+    Key of a deal in DealMatrix and the semantic deal index: its id as a string (int and str ids are the same deal),
+    or, for a deal without an id, its position among the CRM's deals
+    """
+    deal_id = deal.get("id")
+    # \x1f cannot appear in a real id, so positional keys never collide with one
+    return f"\x1f{position}" if deal_id is None else str(deal_id)
+
+
+_matrices = {}
+_matrices_lock = threading.Lock()
+
+
+def get_deal_matrix(repo) -> DealMatrix:
+    """
+    Return the DealMatrix for a repository's deals.
+    When deals_signature() changes, the cached matrix is synced with the new deals (only new, changed and removed
+    deals touch the columns and index) instead of being rebuilt.
+    """
+    signature = repo.deals_signature()
+    with _matrices_lock:
+        cached = _matrices.get(id(repo))
+        if cached and cached[0] is repo:
+            if cached[1] != signature:
+                cached[2].sync(repo.iter_deals())
+                _matrices[id(repo)] = (repo, signature, cached[2])
+            return cached[2]
+        matrix = DealMatrix(repo.iter_deals())
+        _matrices[id(repo)] = (repo, signature, matrix)
+        return matrix
+
+
+def similar_deals(repo, industry: str, criteria: Optional[Dict] = None, k: int = 5) -> List[Dict]:
+    """Top-k successful deals most similar to the given industry and criteria (see DealMatrix.search)"""
+    return get_deal_matrix(repo).search(industry, criteria, k)
+
+
+def similar_deals_batch(repo, queries: Sequence[Tuple[str, Optional[Dict]]], k: int = 5) -> List[List[Dict]]:
+    """Top-k similar successful deals for each (industry, criteria) query, in one pass (see DealMatrix.search_many)"""
+    return get_deal_matrix(repo).search_many(queries, k)
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+
+def build_interaction_update(lead: Dict, email_message: Optional[str] = None, email_sent_date: Optional[str] = None,
+                             next_follow_up: Optional[str] = None) -> Tuple[Dict, Optional[Dict]]:
+    """
+    Compute the CRM changes for a logged interaction, based on the lead's current state.
+    Returns (fields, message): the lead fields to set and the message_log entry to append (or None).
+    Both are empty when there is nothing to update.
+    """
+    fields = {}
+    message = None
+    # Add to message_log and update last_contact_date only if both email_message and email_sent_date are provided
+    if email_message and email_sent_date:
+        message = {
+            "message": email_message,
+            "timestamp": email_sent_date
+        }
+        fields["last_contact_date"] = email_sent_date
+        # Update next_follow_up if provided, else auto-calc
+        next_follow_up_val = next_follow_up
+        if not next_follow_up_val:
+            try:
+                dt = datetime.strptime(email_sent_date, "%Y-%m-%d")
+                next_dt = dt + timedelta(days=7)
+                next_follow_up_val = next_dt.strftime("%Y-%m-%d")
+            except Exception:
+                next_follow_up_val = None
+        if next_follow_up_val:
+            fields["next_follow_up"] = next_follow_up_val
+    # If only next_follow_up is provided, update it
+    elif next_follow_up:
+        fields["next_follow_up"] = next_follow_up
+    # Increment interaction_count if any update
+    if (fields or message is not None) and "interaction_count" in lead:
+        fields["interaction_count"] = int(lead["interaction_count"]) + 1
+    return fields, message
@@ -0,0 +1,41 @@
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path, timeout: float = 30.0):
+    """
+    Hold an exclusive advisory lock on `path` (created if missing) for the duration of the block.
+    Serializes CRM writers across threads, Streamlit sessions and worker processes.
+    Raises TimeoutError if the lock cannot be acquired within `timeout` seconds.
+    """
+    lock_path = Path(path)
+    with open(lock_path, 'a+') as f:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Timed out waiting for lock on {lock_path}")
+                time.sleep(0.01)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,105 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import quote
+
+# Block size used when reading a segment backwards for tail()
+TAIL_BLOCK_SIZE = 64 * 1024
+
+
+class MessageStore:
+    """
+    Per-lead message log storage, kept outside the lead documents.
+    Each lead has an append-only JSONL segment (<record_id>.jsonl) for new messages and, once older history has been
+    migrated out of crm_data.json, an archive segment (<record_id>.archive.jsonl) holding the messages that came before it.
+    Reads are lazy: tail() only reads the end of a segment and iter_messages() streams it line by line.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def _segment(self, record_id: str, archive: bool = False) -> Path:
+        name = quote(str(record_id), safe="")
+        return self.root / (f"{name}.archive.jsonl" if archive else f"{name}.jsonl")
+
+    def append(self, record_id: str, messages: List[Dict]):
+        """Append messages to a lead's segment in a single write"""
+        if not messages:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        payload = "".join(json.dumps(m) + "\n" for m in messages).encode("utf-8")
+        with open(self._segment(record_id), 'ab') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def write_archive(self, record_id: str, messages: List[Dict]):
+        """Atomically replace a lead's archive segment; rewriting the same messages is idempotent"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        segment = self._segment(record_id, archive=True)
+        tmp_file = segment.with_name(f"{segment.name}.tmp")
+        with open(tmp_file, 'w') as f:
+            f.write("".join(json.dumps(m) + "\n" for m in messages))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, segment)
+
+    def iter_messages(self, record_id: str, include_archive: bool = True) -> Iterator[Dict]:
+        """Lazily iterate over a lead's messages, oldest first"""
+        segments = [self._segment(record_id, archive=True)] if include_archive else []
+        segments.append(self._segment(record_id))
+        for segment in segments:
+            try:
+                f = open(segment, 'r')
+            except FileNotFoundError:
+                continue
+            with f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def tail(self, record_id: str, n: int, include_archive: bool = True) -> List[Dict]:
+        """Return a lead's last n messages (oldest first), reading only the end of its segments"""
+        messages = self._tail_segment(self._segment(record_id), n)
+        if include_archive and len(messages) < n:
+            messages = self._tail_segment(self._segment(record_id, archive=True), n - len(messages)) + messages
+        return messages
+
+    def between(self, record_id: str, start: Optional[str] = None, end: Optional[str] = None,
+                include_archive: bool = True) -> List[Dict]:
+        """Return a lead's messages with start <= timestamp <= end (ISO date strings, either bound optional)"""
+        return [m for m in self.iter_messages(record_id, include_archive) if in_range(m, start, end)]
+
+    def _tail_segment(self, segment: Path, n: int) -> List[Dict]:
+        if n <= 0:
+            return []
+        try:
+            f = open(segment, 'rb')
+        except FileNotFoundError:
+            return []
+        with f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b""
+            # Read backwards until the buffer holds n complete lines (or the whole file)
+            while position > 0 and data.count(b"\n") <= n:
+                step = min(TAIL_BLOCK_SIZE, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+        lines = [line for line in data.splitlines() if line.strip()]
+        if position > 0:
+            # The first line may be cut off mid-record
+            lines = lines[1:]
+        return [json.loads(line) for line in lines[-n:]]
+
+
+def in_range(message, start: Optional[str] = None, end: Optional[str] = None) -> bool:
+    """True if a message's timestamp falls within [start, end]; messages without a timestamp only match open ranges"""
+    if start is None and end is None:
+        return True
+    timestamp = message.get("timestamp") if isinstance(message, dict) else None
+    if not timestamp:
+        return False
+    return (start is None or timestamp >= start) and (end is None or timestamp <= end)
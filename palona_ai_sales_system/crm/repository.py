@@ -0,0 +1,483 @@
+import argparse
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from crm.locking import file_lock
+from crm.message_store import MessageStore, in_range
+
+# Robust path resolution for crm_data.json (CRM_DATA_PATH points the app at another CRM file)
+CRM_DATA_PATH = Path(os.getenv("CRM_DATA_PATH") or Path(__file__).parent.parent / 'data' / 'crm_data.json')
+
+# Journal size that triggers a background compaction into a new snapshot
+JOURNAL_COMPACT_BYTES = int(os.getenv("CRM_JOURNAL_COMPACT_BYTES", str(4 * 1024 * 1024)))
+
+
+class CRMVersionConflict(Exception):
+    """Raised when a lead changed since the caller read it (its version no longer matches)"""
+
+
+class CRMRepository:
+    """
+    Shared in-process access layer for the mock CRM (crm_data.json).
+    Keeps the parsed document in memory and only reparses the file when its mtime or size changes,
+    so tools and UI pages can look up leads and deals without a full json.load on every call.
+    Lookup indexes (record_id, case-folded name + company, company, sales_rep) are built once per load.
+    Updates are appended to a JSONL journal next to the snapshot (crm_data.journal.jsonl) and replayed over it on read;
+    compact() folds the journal back into a new snapshot, and runs in the background once the journal grows large.
+    Writers hold an advisory file lock (crm_data.json.lock), snapshots are replaced atomically, and every lead
+    carries a version counter so concurrent read-modify-write updates are detected instead of silently overwritten.
+    Message logs live outside the lead documents in a per-lead MessageStore (crm_data_messages/); read them with
+    get_messages. Logs still embedded in an older snapshot are read from there and kept by compaction until
+    migrate_messages() moves them into the store.
+    Returned leads and deals are the cached objects: treat them as read-only and write through update_lead.
+    """
+
+    def __init__(self, data_file=CRM_DATA_PATH):
+        self.data_file = Path(data_file)
+        self.journal_file = self.data_file.with_name(f"{self.data_file.stem}.journal.jsonl")
+        self.lock_file = self.data_file.with_name(f"{self.data_file.name}.lock")
+        self.messages = MessageStore(self.data_file.with_name(f"{self.data_file.stem}_messages"))
+        self._lock = threading.RLock()
+        self._data = None
+        self._signature = None
+        self._seq = 0
+        self._journal_offset = 0
+        self._compaction = None
+        self._by_id = {}
+        self._by_name = {}
+        self._by_company = {}
+        self._by_rep = {}
+
+    def _file_signature(self):
+        stat = os.stat(self.data_file)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _journal_size(self) -> int:
+        try:
+            return os.path.getsize(self.journal_file)
+        except FileNotFoundError:
+            return 0
+
+    def _load(self) -> Dict:
+        """Return the cached CRM document, reloading the snapshot only if it changed on disk and replaying new journal records"""
+        with self._lock:
+            signature = self._file_signature()
+            if self._data is None or signature != self._signature:
+                with open(self.data_file, 'r') as f:
+                    self._data = json.load(f)
+                self._signature = signature
+                self._seq = self._data.get("journal_seq", 0)
+                self._journal_offset = 0
+                self._build_indexes()
+            if self._journal_size() < self._journal_offset:
+                # The journal was rewritten by a compaction we have not seen yet
+                self._data = None
+                return self._load()
+            self._replay_journal()
+            return self._data
+
+    def _replay_journal(self):
+        """Apply journal records appended since the last read"""
+        size = self._journal_size()
+        if size == self._journal_offset:
+            return
+        with open(self.journal_file, 'rb') as f:
+            f.seek(self._journal_offset)
+            chunk = f.read(size - self._journal_offset)
+        # Only consume complete lines; a partially written record is picked up on the next read
+        end = chunk.rfind(b"\n") + 1
+        reindex = False
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            # Records already folded into the snapshot are skipped, so replay is idempotent
+            if record["seq"] <= self._seq:
+                continue
+            reindex = self._apply_record(record) or reindex
+            self._seq = record["seq"]
+        self._journal_offset += end
+        if reindex:
+            self._build_indexes()
+
+    def _apply_record(self, record: Dict) -> bool:
+        """Apply one journal record to the in-memory document; returns True if indexed fields changed"""
+        lead = self._by_id.get(record["record_id"])
+        if not lead:
+            return False
+        fields = record.get("fields") or {}
+        lead.update(fields)
+        # Journal records written before the message store existed still carry the message itself
+        message = record.get("message")
+        if message is not None and isinstance(lead.setdefault("message_log", []), list):
+            lead["message_log"].append(message)
+        return bool(_INDEXED_FIELDS.intersection(fields))
+
+    def _append_journal(self, records: List[Dict]):
+        payload = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+        with open(self.journal_file, 'ab') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _build_indexes(self):
+        """Build the hash indexes used by the lead lookups"""
+        by_id, by_name, by_company, by_rep = {}, {}, {}, {}
+        for lead in self._data["crm_leads"]:
+            # Keep the first match, like the linear scans these indexes replace
+            by_id.setdefault(lead["record_id"], lead)
+            by_name.setdefault(_name_key(lead.get("first_name"), lead.get("last_name"), lead.get("company_name")), lead)
+            by_company.setdefault(_fold(lead.get("company_name")), lead)
+            by_rep.setdefault(lead.get("sales_rep"), []).append(lead)
+        self._by_id, self._by_name, self._by_company, self._by_rep = by_id, by_name, by_company, by_rep
+
+    def get_lead(self, record_id: str) -> Optional[Dict]:
+        """Return the lead with the given record_id, or None"""
+        with self._lock:
+            self._load()
+            return self._by_id.get(record_id)
+
+    def find_lead(self, first_name: str, last_name: str, company_name: str) -> Optional[Dict]:
+        """Return the lead matching first name, last name and company (case-insensitive), or None"""
+        with self._lock:
+            self._load()
+            return self._by_name.get(_name_key(first_name, last_name, company_name))
+
+    def find_lead_by_company(self, company_name: str) -> Optional[Dict]:
+        """Return the first lead at the given company (case-insensitive), or None"""
+        with self._lock:
+            self._load()
+            return self._by_company.get(_fold(company_name))
+
+    def leads_for_rep(self, sales_rep: str) -> List[Dict]:
+        """Return the leads assigned to a sales rep"""
+        with self._lock:
+            self._load()
+            return list(self._by_rep.get(sales_rep, []))
+
+    def iter_leads(self) -> Iterator[Dict]:
+        """Iterate over all leads"""
+        return iter(self._load()["crm_leads"])
+
+    def list_leads(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Return one page of leads in CRM order"""
+        leads = self._load()["crm_leads"]
+        return leads[offset:] if limit is None else leads[offset:offset + limit]
+
+    def count_leads(self) -> int:
+        """Return the total number of leads"""
+        return len(self._load()["crm_leads"])
+
+    def query_leads(self, fields: Optional[List[str]] = None, filters: Optional[Dict] = None, sort: Optional[str] = None,
+                    limit: Optional[int] = None, offset: int = 0) -> Tuple[List[Dict], int]:
+        """
+        Return (leads, total) for a filtered, sorted page of leads.
+        filters may contain sales_rep, status and segment (customer_segment); sort is a field name, prefixed with
+        "-" for descending order; fields projects each lead down to the given keys. total counts all matches.
+        """
+        filters = _lead_filters(filters)
+        with self._lock:
+            self._load()
+            if "sales_rep" in filters:
+                leads = list(self._by_rep.get(filters.pop("sales_rep"), []))
+            else:
+                leads = self._data["crm_leads"]
+        if filters:
+            leads = [lead for lead in leads if all(lead.get(key) == value for key, value in filters.items())]
+        if sort:
+            field = sort.lstrip("-")
+            leads = sorted(leads, key=lambda lead: _sort_key(lead.get(field)), reverse=sort.startswith("-"))
+        total = len(leads)
+        page = leads[offset:] if limit is None else leads[offset:offset + limit]
+        return _project(page, fields), total
+
+    def get_deals(self) -> List[Dict]:
+        """Return all deals"""
+        return self._load().get("deals", [])
+
+    def iter_deals(self) -> Iterator[Dict]:
+        """Iterate over all deals"""
+        return iter(self.get_deals())
+
+    def deals_signature(self):
+        """Value that changes whenever the deals may have changed, for caches built over them"""
+        with self._lock:
+            self._load()
+            # Updates never touch deals, so only a new snapshot can change them
+            return self._signature
+
+    def get_messages(self, record_id: str, limit: Optional[int] = None, start: Optional[str] = None,
+                     end: Optional[str] = None) -> List[Dict]:
+        """
+        Return a lead's message_log entries, oldest first.
+        limit keeps only the most recent n; start/end (YYYY-MM-DD, inclusive) restrict to a time range.
+        """
+        pending = self._pending_for(record_id)
+        # Embedded messages predate the store and supersede an archive segment left by an interrupted migration
+        include_archive = not pending
+        if start is None and end is None and limit is not None:
+            messages = self.messages.tail(record_id, limit, include_archive)
+            if len(messages) < limit and pending:
+                messages = pending[len(messages) - limit:] + messages
+            return messages
+        messages = [m for m in pending if in_range(m, start, end)]
+        messages += self.messages.between(record_id, start, end, include_archive)
+        return messages if limit is None else messages[-limit:] if limit > 0 else []
+
+    def _pending_for(self, record_id: str) -> List[Dict]:
+        """Messages of a lead that are not in the message store yet (its embedded message_log), oldest first"""
+        with self._lock:
+            self._load()
+            lead = self._by_id.get(record_id)
+            message_log = lead.get("message_log") if lead else None
+            return list(message_log) if isinstance(message_log, list) else []
+
+    def update_lead(self, record_id: str, fields: Dict, message: Optional[Dict] = None, expected_version: Optional[int] = None) -> bool:
+        """
+        Apply field changes to a lead, optionally appending a message_log entry, and bump its version.
+        The change is appended to the journal, so the cost does not depend on the size of the CRM.
+        If expected_version is given and the lead's version differs, raises CRMVersionConflict.
+        Returns False if the lead does not exist.
+        """
+        with self._lock, file_lock(self.lock_file):
+            # Catch up with writes from other processes before checking the version
+            self._load()
+            lead = self._by_id.get(record_id)
+            if not lead:
+                return False
+            version = lead.get("version", 0)
+            if expected_version is not None and version != expected_version:
+                raise CRMVersionConflict(f"Lead {record_id} is at version {version}, expected {expected_version}")
+            if message is not None:
+                self.messages.append(record_id, [message])
+            self._append_journal([{
+                "seq": self._seq + 1,
+                "record_id": record_id,
+                "fields": {**fields, "version": version + 1}
+            }])
+            # Catch up from the journal, which applies the record we just wrote
+            self._load()
+            self._maybe_compact()
+            return True
+
+    def update_leads(self, updates: List[Tuple[str, Callable]]) -> List[Dict]:
+        """
+        Apply many lead updates in one transaction: one lock, one load and one journal write.
+        Each update is (record_id, build), where build(lead) returns (fields, message) computed from the lead's
+        current state, including earlier updates to the same lead in this batch.
+        Returns one {"record_id", "status"} per update, with status "success", "no_update", "not_found" or "error".
+        """
+        results = []
+        with self._lock, file_lock(self.lock_file):
+            self._load()
+            records = []
+            messages = {}
+            reindex = False
+            try:
+                for record_id, build in updates:
+                    lead = self._by_id.get(record_id)
+                    if not lead:
+                        results.append({"record_id": record_id, "status": "not_found"})
+                        continue
+                    try:
+                        fields, message = build(lead)
+                    except Exception as e:
+                        results.append({"record_id": record_id, "status": "error", "message": str(e)})
+                        continue
+                    if not fields and message is None:
+                        results.append({"record_id": record_id, "status": "no_update"})
+                        continue
+                    record = {
+                        "seq": self._seq + 1,
+                        "record_id": record_id,
+                        "fields": {**fields, "version": lead.get("version", 0) + 1}
+                    }
+                    if message is not None:
+                        messages.setdefault(record_id, []).append(message)
+                    # Apply in memory right away so later entries for the same lead build on it
+                    reindex = self._apply_record(record) or reindex
+                    self._seq = record["seq"]
+                    records.append(record)
+                    results.append({"record_id": record_id, "status": "success"})
+                for record_id, lead_messages in messages.items():
+                    self.messages.append(record_id, lead_messages)
+                if records:
+                    self._append_journal(records)
+            except Exception:
+                # The in-memory copy may be ahead of the journal; rebuild it from disk on the next read
+                self._data = None
+                raise
+            if reindex:
+                self._build_indexes()
+            # Move past the records we just wrote (already applied, so replay skips them by seq)
+            self._load()
+            self._maybe_compact()
+        return results
+
+    def compact(self) -> bool:
+        """
+        Fold the journal into a new crm_data.json snapshot and drop the folded records from the journal.
+        Message logs still embedded in the snapshot stay there; migrate_messages() moves them.
+        Returns False if there was nothing to compact.
+        """
+        with self._lock, file_lock(self.lock_file):
+            self._load()
+            if self._journal_offset == 0:
+                return False
+            self._write_snapshot()
+            return True
+
+    def migrate_messages(self) -> int:
+        """
+        Move the message logs embedded in crm_data.json into the leads' archive segments and write a snapshot without
+        them (folding the journal on the way). Nothing calls this implicitly: run python -m crm.repository
+        migrate-messages. Returns the number of leads whose message_log was moved.
+        """
+        with self._lock, file_lock(self.lock_file):
+            self._load()
+            leads = [lead for lead in self._data["crm_leads"] if "message_log" in lead]
+            if not leads:
+                return 0
+            try:
+                for lead in leads:
+                    message_log = lead.pop("message_log")
+                    if isinstance(message_log, list) and message_log:
+                        self.messages.write_archive(lead["record_id"], message_log)
+                self._write_snapshot()
+            except Exception:
+                # The in-memory copy no longer matches the snapshot; reload it on the next read
+                self._data = None
+                raise
+            return len(leads)
+
+    def _write_snapshot(self):
+        """Replace crm_data.json with the in-memory document and drop the folded records from the journal"""
+        self._data["journal_seq"] = self._seq
+        tmp_file = self.data_file.with_name(f"{self.data_file.name}.tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump(self._data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.data_file)
+        self._signature = self._file_signature()
+        if self._journal_offset == 0:
+            return
+        # Writers are locked out, but keep anything past the folded records (e.g. a torn final line)
+        with open(self.journal_file, 'rb') as f:
+            f.seek(self._journal_offset)
+            remainder = f.read()
+        tmp_journal = self.journal_file.with_name(f"{self.journal_file.name}.tmp")
+        with open(tmp_journal, 'wb') as f:
+            f.write(remainder)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_journal, self.journal_file)
+        self._journal_offset = 0
+
+    def _maybe_compact(self):
+        """Start a background compaction once the journal grows past JOURNAL_COMPACT_BYTES"""
+        if self._journal_size() >= JOURNAL_COMPACT_BYTES:
+            self._start_compaction()
+
+    def wait_for_compaction(self, timeout: Optional[float] = None):
+        """Block until a running background compaction has finished"""
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join(timeout)
+
+    def _start_compaction(self):
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        self._compaction = threading.Thread(target=self.compact, name="crm-journal-compaction", daemon=True)
+        self._compaction.start()
+
+
+_INDEXED_FIELDS = {"record_id", "first_name", "last_name", "company_name", "sales_rep"}
+
+
+# Filter names accepted by query_leads, mapped to lead fields
+LEAD_FILTERS = {"sales_rep": "sales_rep", "status": "status", "segment": "customer_segment"}
+
+
+def _lead_filters(filters: Optional[Dict]) -> Dict:
+    """Translate query_leads filters into lead field names, rejecting unknown ones"""
+    translated = {}
+    for name, value in (filters or {}).items():
+        if name not in LEAD_FILTERS:
+            raise ValueError(f"Unsupported lead filter: {name} (expected one of {', '.join(LEAD_FILTERS)})")
+        if value is not None and value != "":
+            translated[LEAD_FILTERS[name]] = value
+    return translated
+
+
+def _sort_key(value):
+    # Missing values sort first ascending / last descending. Other values are grouped by type (numbers, then strings,
+    # like SQLite's ORDER BY, then anything else by its JSON text), so values of different types are never compared
+    if value is None:
+        return (0, 0, "")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, 0, value)
+    if isinstance(value, str):
+        return (1, 1, value)
+    return (1, 2, json.dumps(value, sort_keys=True, default=str))
+
+
+def _project(leads: List[Dict], fields: Optional[List[str]]) -> List[Dict]:
+    if not fields:
+        return list(leads)
+    return [{field: lead.get(field) for field in fields} for lead in leads]
+
+
+def _fold(value) -> str:
+    return (value or "").strip().casefold()
+
+
+def _name_key(first_name, last_name, company_name):
+    return (_fold(first_name), _fold(last_name), _fold(company_name))
+
+
+_repositories = {}
+_repositories_lock = threading.Lock()
+
+
+def get_repository(data_file=None):
+    """
+    Return the process-wide CRM repository.
+    The storage engine is selected with CRM_BACKEND ("json" by default, "sqlite" with CRM_SQLITE_PATH, or "stream"
+    to scan crm_data.json with bounded memory instead of loading it);
+    passing an explicit data_file always opens that JSON file.
+    """
+    backend = os.getenv("CRM_BACKEND", "json").lower()
+    with _repositories_lock:
+        if data_file is None and backend == "sqlite":
+            from crm.sqlite_store import CRM_SQLITE_PATH, SQLiteCRMRepository
+            key = ("sqlite", Path(os.getenv("CRM_SQLITE_PATH") or CRM_SQLITE_PATH).resolve())
+            if key not in _repositories:
+                _repositories[key] = SQLiteCRMRepository(key[1])
+        elif data_file is None and backend == "stream":
+            from crm.streaming import StreamingCRMRepository
+            key = ("stream", CRM_DATA_PATH.resolve())
+            if key not in _repositories:
+                _repositories[key] = StreamingCRMRepository(key[1])
+        else:
+            key = ("json", Path(data_file or CRM_DATA_PATH).resolve())
+            if key not in _repositories:
+                _repositories[key] = CRMRepository(key[1])
+        return _repositories[key]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CRM repository maintenance")
+    parser.add_argument("command", choices=["compact", "migrate-messages"],
+                        help="compact: fold the update journal into crm_data.json; "
+                             "migrate-messages: move embedded message logs into the message store")
+    parser.add_argument("--data-file", default=str(CRM_DATA_PATH))
+    args = parser.parse_args()
+    repo = CRMRepository(args.data_file)
+    if args.command == "migrate-messages":
+        print({"migrated_leads": repo.migrate_messages()})
+    else:
+        print({"compacted": repo.compact()})
@@ -0,0 +1,336 @@
+import argparse
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from crm.deals import deal_key, get_deal_matrix
+
+# Dimensions of the hashed feature space
+VECTOR_DIM = 512
+# Above this many distinct deal vectors, queries go through an IVF (inverted file) index instead of a full scan
+IVF_MIN_VECTORS = 20000
+# Clusters probed per IVF query
+IVF_NPROBE = int(os.getenv("CRM_DEAL_INDEX_NPROBE", "32"))
+# Upper bound on the cells of one (queries x vectors) score matrix in SemanticDealIndex.search_many
+BATCH_SCORE_CELLS = 4_000_000
+# Bumped whenever the features or deal keys change, so stale persisted indexes are rebuilt
+INDEX_FORMAT = 2
+
+# Offline "synonyms": industry keywords that mean the same market, so e.g. "Personal Care" finds "Beauty & Cosmetics"
+INDUSTRY_CONCEPTS = {
+    "beauty": ["beauty", "cosmetic", "cosmetics", "skincare", "skin", "makeup", "personal", "care", "fragrance", "salon", "spa"],
+    "retail": ["retail", "fashion", "apparel", "clothing", "footwear", "ecommerce", "commerce", "store", "stores", "shop",
+               "shopping", "d2c", "dtc", "consumer", "goods", "grocery", "market"],
+    "food": ["food", "restaurant", "restaurants", "dining", "cafe", "coffee", "qsr", "pizza", "bakery", "beverage",
+             "beverages", "grocery", "hospitality", "catering"],
+    "wellness": ["health", "wellness", "fitness", "nutrition", "supplements", "mental", "meditation", "medical",
+                 "pharmacy", "care"],
+    "hospitality": ["hospitality", "hotel", "hotels", "travel", "tourism", "leisure", "resort"],
+    "technology": ["technology", "tech", "software", "saas", "electronics", "devices"],
+}
+_CONCEPTS_BY_WORD = {}
+for _concept, _words in INDUSTRY_CONCEPTS.items():
+    for _word in _words:
+        _CONCEPTS_BY_WORD.setdefault(_word, []).append(_concept)
+
+# Relative weight of each kind of feature
+_WEIGHTS = {"word": 1.0, "trigram": 0.3, "concept": 1.5, "implementation": 0.6, "size": 0.8, "roi": 0.3}
+
+
+def _feature_index(feature: str) -> Tuple[int, float]:
+    # Stable across processes (unlike hash()), so persisted indexes stay valid; the sign halves collision bias
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % VECTOR_DIM, 1.0 if (h // VECTOR_DIM) % 2 == 0 else -1.0
+
+
+def _size_bucket(size) -> Optional[int]:
+    if not isinstance(size, (int, float)) or isinstance(size, bool) or size <= 0:
+        return None
+    return max(0, min(14, int(math.log2(size / 10000))))
+
+
+def deal_features(industry: Optional[str], implementation_type: Optional[str] = None, deal_size=None,
+                  roi=None) -> Dict[str, float]:
+    """Weighted features of a deal (or query): industry words, their character trigrams and concepts, and buckets"""
+    features = {}
+    words = re.findall(r"[0-9a-z]+", (industry or "").casefold())
+    for word in words:
+        features[f"w:{word}"] = features.get(f"w:{word}", 0) + _WEIGHTS["word"]
+        padded = f"^{word}$"
+        for i in range(len(padded) - 2):
+            features[f"c:{padded[i:i + 3]}"] = features.get(f"c:{padded[i:i + 3]}", 0) + _WEIGHTS["trigram"]
+        for concept in _CONCEPTS_BY_WORD.get(word, ()):
+            features[f"k:{concept}"] = _WEIGHTS["concept"]
+    if implementation_type:
+        features[f"i:{implementation_type.casefold()}"] = _WEIGHTS["implementation"]
+    bucket = _size_bucket(deal_size)
+    if bucket is not None:
+        # Neighbouring buckets too, so close sizes are similar across bucket edges
+        features[f"s:{bucket}"] = _WEIGHTS["size"]
+        features[f"s:{bucket - 1}"] = features[f"s:{bucket + 1}"] = _WEIGHTS["size"] / 2
+    if isinstance(roi, (int, float)) and not isinstance(roi, bool):
+        features[f"r:{int(roi) // 50}"] = _WEIGHTS["roi"]
+    return features
+
+
+def _hash_vector(features: Dict[str, float]) -> np.ndarray:
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    for feature, weight in features.items():
+        index, sign = _feature_index(feature)
+        vector[index] += sign * weight
+    return vector
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _feature_key(deal: Dict) -> tuple:
+    # Equal keys mean equal deal_features
+    metrics = deal.get("key_metrics") if isinstance(deal.get("key_metrics"), dict) else {}
+    roi = metrics.get("roi")
+    return (deal.get("industry"), deal.get("implementation_type"), _size_bucket(deal.get("deal_size")),
+            int(roi) // 50 if isinstance(roi, (int, float)) and not isinstance(roi, bool) else None)
+
+
+class SemanticDealIndex:
+    """
+    Offline, CPU-only vector search over the successful deals.
+    Each deal is a hashed TF-IDF vector of its industry (words, character trigrams and INDUSTRY_CONCEPTS), its
+    implementation type, and size and ROI buckets. Deals with the same features share one vector, so the index holds
+    the distinct vectors plus the deal keys (see deal_key) behind each; above IVF_MIN_VECTORS distinct vectors, queries probe the
+    IVF_NPROBE nearest k-means clusters instead of scanning them all.
+    The index is saved as <crm file>_deals.ann.npz next to the CRM and rebuilt when the deals change.
+    """
+
+    def __init__(self, vectors, idf, deal_ids, deal_offsets, centroids=None, cluster_offsets=None,
+                 signature: str = ""):
+        self.vectors = vectors
+        self.idf = idf
+        self.deal_ids = deal_ids
+        self.deal_offsets = deal_offsets
+        self.centroids = centroids
+        self.cluster_offsets = cluster_offsets
+        self.signature = signature
+
+    @classmethod
+    def build(cls, deals: Iterable[Dict], signature: str = "") -> "SemanticDealIndex":
+        groups = {}
+        for position, deal in enumerate(deals):
+            if deal.get("status") != "successful":
+                continue
+            key = _feature_key(deal)
+            group = groups.get(key)
+            if group is None:
+                metrics = deal.get("key_metrics") if isinstance(deal.get("key_metrics"), dict) else {}
+                features = deal_features(deal.get("industry"), deal.get("implementation_type"), deal.get("deal_size"),
+                                         metrics.get("roi"))
+                group = groups[key] = (features, [])
+            # Results are resolved through DealMatrix.row, which uses the same keys
+            group[1].append(deal_key(deal, position))
+        raw = np.array([_hash_vector(features) for features, _ in groups.values()], dtype=np.float32).reshape(-1, VECTOR_DIM)
+        # Inverse document frequency over deals (not distinct vectors), so common features weigh less
+        counts = np.array([len(ids) for _, ids in groups.values()], dtype=np.float64)
+        document_frequency = ((raw != 0) * counts[:, None]).sum(axis=0)
+        idf = (np.log((1 + counts.sum()) / (1 + document_frequency)) + 1).astype(np.float32)
+        vectors = _normalize(raw * idf)
+        deal_ids = np.array([deal_id for _, ids in groups.values() for deal_id in ids], dtype=str)
+        deal_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        index = cls(vectors, idf, deal_ids, deal_offsets, signature=signature)
+        if len(vectors) > IVF_MIN_VECTORS:
+            index._build_ivf()
+        return index
+
+    def _build_ivf(self, iterations: int = 10, sample_size: int = 50000):
+        """Spherical k-means (2 * sqrt(n) clusters) over a sample of the vectors, then one inverted list per cluster"""
+        rng = np.random.default_rng(0)
+        n_clusters = int(2 * math.sqrt(len(self.vectors)))
+        sample = self.vectors[rng.choice(len(self.vectors), min(sample_size, len(self.vectors)), replace=False)]
+        centroids = sample[rng.choice(len(sample), n_clusters, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+        assignment = np.concatenate([
+            np.argmax(self.vectors[i:i + 65536] @ centroids.T, axis=1) for i in range(0, len(self.vectors), 65536)
+        ])
+        # Store the vectors (and their deal ids) grouped by cluster, so probing a cluster scans one contiguous slice
+        order = np.argsort(assignment, kind="stable")
+        counts = np.diff(self.deal_offsets)[order]
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.deal_ids = self.deal_ids[np.repeat(self.deal_offsets[order] - offsets[:-1], counts) + np.arange(offsets[-1])]
+        self.deal_offsets = offsets
+        self.vectors = self.vectors[order]
+        self.cluster_offsets = np.searchsorted(assignment[order], np.arange(n_clusters + 1)).astype(np.int64)
+        self.centroids = centroids.astype(np.float32)
+
+    def query_vector(self, industry: str, criteria: Optional[Dict] = None) -> np.ndarray:
+        criteria = criteria or {}
+        features = deal_features(industry, criteria.get("implementation_type"), criteria.get("deal_size"), criteria.get("roi"))
+        return _normalize(_hash_vector(features) * self.idf)
+
+    def search(self, industry: str, criteria: Optional[Dict] = None, k: int = 5) -> List[Tuple[str, float]]:
+        """Return up to k (deal_key, cosine similarity) of the most similar successful deals, best first"""
+        if k <= 0 or not len(self.vectors):
+            return []
+        query = self.query_vector(industry, criteria)
+        if self.centroids is not None:
+            return self._search_ivf(query, k)
+        return self._top(self.vectors @ query, np.arange(len(self.vectors)), k)
+
+    def search_many(self, queries: Sequence[Tuple[str, Optional[Dict]]], k: int = 5) -> List[List[Tuple[str, float]]]:
+        """
+        search() for many (industry, criteria) queries at once, e.g. a whole rep queue. Queries with the same features
+        are scored once, and without IVF the rest are scored in chunked (queries x vectors) matrix products.
+        """
+        if k <= 0 or not len(self.vectors):
+            return [[] for _ in queries]
+        positions = {}
+        for i, (industry, criteria) in enumerate(queries):
+            criteria = criteria or {}
+            key = _feature_key({"industry": industry, "implementation_type": criteria.get("implementation_type"),
+                             "deal_size": criteria.get("deal_size"), "key_metrics": {"roi": criteria.get("roi")}})
+            positions.setdefault(key, (industry, criteria, []))[2].append(i)
+        unique = list(positions.values())
+        results = [None] * len(queries)
+        chunk = max(1, BATCH_SCORE_CELLS // len(self.vectors))
+        everything = np.arange(len(self.vectors))
+        for start in range(0, len(unique), chunk):
+            batch = unique[start:start + chunk]
+            queries_matrix = np.array([self.query_vector(industry, criteria) for industry, criteria, _ in batch])
+            if self.centroids is not None:
+                matches = [self._search_ivf(query, k) for query in queries_matrix]
+            else:
+                matches = [self._top(scores, everything, k) for scores in queries_matrix @ self.vectors.T]
+            for (_, _, indices), query_matches in zip(batch, matches):
+                for i in indices:
+                    results[i] = list(query_matches)
+        return results
+
+    def _search_ivf(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        probe = np.argsort(-(self.centroids @ query))[:IVF_NPROBE]
+        candidates = np.concatenate([np.arange(self.cluster_offsets[c], self.cluster_offsets[c + 1]) for c in probe])
+        scores = np.concatenate([self.vectors[self.cluster_offsets[c]:self.cluster_offsets[c + 1]] @ query for c in probe])
+        return self._top(scores, candidates, k)
+
+    def _top(self, scores: np.ndarray, candidates: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """The deals behind the best-scoring candidate vectors, up to k; ties keep vector order"""
+        # k vectors always cover k deals, since every vector has at least one deal behind it
+        top = min(k, len(candidates))
+        if top < len(candidates):
+            kth = scores[np.argpartition(-scores, top - 1)[top - 1]]
+            above = np.flatnonzero(scores > kth)
+            tied = np.flatnonzero(scores == kth)
+            best = np.concatenate([above, tied[np.argsort(candidates[tied], kind="stable")][:top - len(above)]])
+        else:
+            best = np.arange(len(candidates))
+        best = best[np.lexsort((candidates[best], -scores[best]))]
+        results = []
+        for i in best:
+            if scores[i] <= 0:
+                break
+            vector = candidates[i]
+            for deal_id in self.deal_ids[self.deal_offsets[vector]:self.deal_offsets[vector + 1]][:k - len(results)]:
+                results.append((str(deal_id), float(scores[i])))
+            if len(results) >= k:
+                break
+        return results
+
+    def save(self, path):
+        path = Path(path)
+        tmp_file = path.with_name(f"{path.name}.tmp.npz")
+        arrays = {"vectors": self.vectors, "idf": self.idf, "deal_ids": self.deal_ids, "deal_offsets": self.deal_offsets,
+                  "meta": np.array(json.dumps({"format": INDEX_FORMAT, "dim": VECTOR_DIM, "signature": self.signature}))}
+        if self.centroids is not None:
+            arrays.update(centroids=self.centroids, cluster_offsets=self.cluster_offsets)
+        np.savez(tmp_file, **arrays)
+        os.replace(tmp_file, path)
+
+    @classmethod
+    def load(cls, path) -> Optional["SemanticDealIndex"]:
+        """Load a persisted index, or None if it is missing or was built with other features"""
+        try:
+            with np.load(path) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("format") != INDEX_FORMAT or meta.get("dim") != VECTOR_DIM:
+                    return None
+                return cls(data["vectors"], data["idf"], data["deal_ids"], data["deal_offsets"],
+                           data["centroids"] if "centroids" in data else None,
+                           data["cluster_offsets"] if "cluster_offsets" in data else None,
+                           meta.get("signature", ""))
+        except (FileNotFoundError, KeyError, ValueError):
+            return None
+
+
+def index_path(repo) -> Path:
+    """Where a repository's semantic deal index is persisted: next to its CRM file or database"""
+    crm_file = Path(getattr(repo, "data_file", None) or repo.db_path)
+    return crm_file.with_name(f"{crm_file.stem}_deals.ann.npz")
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_semantic_index(repo) -> SemanticDealIndex:
+    """Return the repository's semantic deal index: cached in memory, else loaded from disk, else built and saved"""
+    signature = json.dumps(repo.deals_signature())
+    with _indexes_lock:
+        cached = _indexes.get(id(repo))
+        if cached and cached[0] is repo and cached[1].signature == signature:
+            return cached[1]
+        path = index_path(repo)
+        index = SemanticDealIndex.load(path)
+        if index is None or index.signature != signature:
+            index = SemanticDealIndex.build(repo.iter_deals(), signature)
+            index.save(path)
+        _indexes[id(repo)] = (repo, index)
+        return index
+
+
+def semantic_similar_deals(repo, industry: str, criteria: Optional[Dict] = None, k: int = 5) -> List[Dict]:
+    """Top-k successful deals by semantic similarity, in the same shape as SimilarDealsTool matches"""
+    matrix = get_deal_matrix(repo)
+    matches = []
+    for deal_id, score in get_semantic_index(repo).search(industry, criteria, k):
+        row = matrix.row(deal_id)
+        if row is not None:
+            matches.append(matrix.match(row, score))
+    return matches
+
+
+def semantic_similar_deals_batch(repo, queries: Sequence[Tuple[str, Optional[Dict]]], k: int = 5) -> List[List[Dict]]:
+    """semantic_similar_deals for each (industry, criteria) query, sharing one index and one pass (see search_many)"""
+    matrix = get_deal_matrix(repo)
+    results = []
+    for found in get_semantic_index(repo).search_many(queries, k):
+        rows = [(matrix.row(deal_id), score) for deal_id, score in found]
+        results.append([matrix.match(row, score) for row, score in rows if row is not None])
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the semantic similar-deal index for the configured CRM")
+    parser.add_argument("--query", help="Industry to search for after building")
+    parser.add_argument("--deal-size", type=float)
+    args = parser.parse_args()
+    from crm.repository import get_repository
+    repo = get_repository()
+    index = get_semantic_index(repo)
+    print({"path": str(index_path(repo)), "vectors": len(index.vectors), "deals": len(index.deal_ids),
+           "ivf": index.centroids is not None})
+    if args.query:
+        criteria = {"deal_size": args.deal_size} if args.deal_size else {}
+        for match in semantic_similar_deals(repo, args.query, criteria):
+            print(match["similarity_score"], match["deal_id"], match["industry"], match["deal_size"])
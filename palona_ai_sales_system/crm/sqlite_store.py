@@ -0,0 +1,372 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from crm.repository import CRM_DATA_PATH, CRMRepository, CRMVersionConflict, _fold, _lead_filters, _project
+
+# Default location of the SQLite CRM database, next to crm_data.json
+CRM_SQLITE_PATH = Path(__file__).parent.parent / 'data' / 'crm.sqlite3'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    record_id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    first_name TEXT,
+    last_name TEXT,
+    company_name TEXT,
+    name_key TEXT,
+    company_key TEXT,
+    sales_rep TEXT,
+    industry TEXT,
+    next_follow_up TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_leads_position ON leads (position);
+CREATE INDEX IF NOT EXISTS idx_leads_name_key ON leads (name_key);
+CREATE INDEX IF NOT EXISTS idx_leads_company_key ON leads (company_key);
+CREATE INDEX IF NOT EXISTS idx_leads_company_name ON leads (company_name);
+CREATE INDEX IF NOT EXISTS idx_leads_sales_rep ON leads (sales_rep, position);
+CREATE INDEX IF NOT EXISTS idx_leads_next_follow_up ON leads (next_follow_up);
+CREATE INDEX IF NOT EXISTS idx_leads_industry ON leads (industry);
+
+CREATE TABLE IF NOT EXISTS deals (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    industry TEXT,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_deals_position ON deals (position);
+CREATE INDEX IF NOT EXISTS idx_deals_industry ON deals (industry);
+
+CREATE TABLE IF NOT EXISTS message_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    record_id TEXT NOT NULL,
+    timestamp TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_message_log_record_id ON message_log (record_id, id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Lead fields stored in their own (indexed) columns; anything else is read from the JSON document
+LEAD_COLUMNS = {"record_id", "first_name", "last_name", "company_name", "sales_rep", "industry", "next_follow_up"}
+
+
+def _lead_expr(field: str) -> str:
+    """SQL expression for a lead field, for use in WHERE and ORDER BY"""
+    if field in LEAD_COLUMNS:
+        return f"l.{field}"
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", field):
+        raise ValueError(f"Invalid lead field: {field}")
+    return f"json_extract(l.data, '$.{field}')"
+
+
+# Lead documents are stored without their message_log, which lives in the message_log table
+LEAD_SELECT = "SELECT l.data FROM leads l"
+
+
+def _name_key(first_name, last_name, company_name) -> str:
+    return "\x1f".join([_fold(first_name), _fold(last_name), _fold(company_name)])
+
+
+def _lead_row(lead: Dict, position: int):
+    data = {k: v for k, v in lead.items() if k != "message_log"}
+    return (
+        lead["record_id"],
+        position,
+        lead.get("first_name"),
+        lead.get("last_name"),
+        lead.get("company_name"),
+        _name_key(lead.get("first_name"), lead.get("last_name"), lead.get("company_name")),
+        _fold(lead.get("company_name")),
+        lead.get("sales_rep"),
+        lead.get("industry"),
+        lead.get("next_follow_up"),
+        json.dumps(data)
+    )
+
+
+def _connect(db_path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db_path), timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+def import_json(json_path=CRM_DATA_PATH, db_path=CRM_SQLITE_PATH) -> Dict:
+    """
+    One-shot import of crm_data.json into the SQLite CRM database.
+    Reads through CRMRepository, so journaled updates and message logs already moved to the message store are included;
+    the source files are only read, never rewritten.
+    Existing rows are replaced so the import can be rerun safely. Returns row counts.
+    """
+    repo = CRMRepository(json_path)
+    conn = _connect(db_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM message_log")
+        conn.execute("DELETE FROM leads")
+        conn.execute("DELETE FROM deals")
+        leads = list(repo.iter_leads())
+        conn.executemany(
+            "INSERT INTO leads VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (_lead_row(lead, i) for i, lead in enumerate(leads))
+        )
+        messages = 0
+        for lead in leads:
+            log = repo.get_messages(lead["record_id"])
+            conn.executemany(
+                "INSERT INTO message_log (record_id, timestamp, data) VALUES (?, ?, ?)",
+                ((lead["record_id"], m.get("timestamp") if isinstance(m, dict) else None, json.dumps(m)) for m in log)
+            )
+            messages += len(log)
+        deals = repo.get_deals()
+        conn.executemany(
+            "INSERT INTO deals VALUES (?, ?, ?, ?, ?)",
+            ((deal.get("id"), i, deal.get("industry"), deal.get("status"), json.dumps(deal)) for i, deal in enumerate(deals))
+        )
+        # Lets caches built over the deals (see deals_signature) notice the re-import
+        conn.execute("INSERT INTO meta (key, value) VALUES ('deals_version', 1) "
+                     "ON CONFLICT(key) DO UPDATE SET value = value + 1")
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return {"leads": len(leads), "deals": len(deals), "messages": messages}
+
+
+def _create_from_json(json_path, db_path: Path):
+    """
+    Import into a temporary database and move it into place when complete, so a failed or killed import never
+    leaves a partial database behind (the next open imports again).
+    """
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(prefix=f"{db_path.name}.", suffix=".tmp", dir=db_path.parent)
+    os.close(fd)
+    try:
+        import_json(json_path, tmp_file)
+        os.replace(tmp_file, db_path)
+    finally:
+        for path in (tmp_file, f"{tmp_file}-wal", f"{tmp_file}-shm"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class SQLiteCRMRepository:
+    """
+    SQLite (WAL mode) storage engine for the CRM, selected with CRM_BACKEND=sqlite.
+    Exposes the same accessors as CRMRepository and returns leads and deals in the same shape,
+    but looks them up with indexed queries and updates a single lead row instead of rewriting the whole file.
+    Leads carry the same version counter as the JSON backend for optimistic concurrency control.
+    Message logs are kept in their own table, indexed per lead, and read with get_messages.
+    The database is imported from crm_data.json the first time it is opened if it does not exist yet; the import is
+    written to a temporary file and only moved into place once complete.
+    """
+
+    def __init__(self, db_path=CRM_SQLITE_PATH, json_path=CRM_DATA_PATH):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        if not self.db_path.exists():
+            _create_from_json(json_path, self.db_path)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets readers proceed while a writer commits
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _connect(self.db_path)
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _leads(self, where: str = "", params=()) -> List[Dict]:
+        rows = self._conn().execute(f"{LEAD_SELECT} {where}", params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get_lead(self, record_id: str) -> Optional[Dict]:
+        """Return the lead with the given record_id, or None"""
+        leads = self._leads("WHERE l.record_id = ?", (record_id,))
+        return leads[0] if leads else None
+
+    def find_lead(self, first_name: str, last_name: str, company_name: str) -> Optional[Dict]:
+        """Return the lead matching first name, last name and company (case-insensitive), or None"""
+        leads = self._leads("WHERE l.name_key = ? ORDER BY l.position LIMIT 1", (_name_key(first_name, last_name, company_name),))
+        return leads[0] if leads else None
+
+    def find_lead_by_company(self, company_name: str) -> Optional[Dict]:
+        """Return the first lead at the given company (case-insensitive), or None"""
+        leads = self._leads("WHERE l.company_key = ? ORDER BY l.position LIMIT 1", (_fold(company_name),))
+        return leads[0] if leads else None
+
+    def leads_for_rep(self, sales_rep: str) -> List[Dict]:
+        """Return the leads assigned to a sales rep"""
+        return self._leads("WHERE l.sales_rep = ? ORDER BY l.position", (sales_rep,))
+
+    def iter_leads(self) -> Iterator[Dict]:
+        """Iterate over all leads"""
+        cursor = self._conn().execute(f"{LEAD_SELECT} ORDER BY l.position")
+        return (json.loads(row[0]) for row in cursor)
+
+    def list_leads(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Return one page of leads in CRM order"""
+        return self._leads("ORDER BY l.position LIMIT ? OFFSET ?", (-1 if limit is None else limit, offset))
+
+    def count_leads(self) -> int:
+        """Return the total number of leads"""
+        return self._conn().execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+
+    def query_leads(self, fields: Optional[List[str]] = None, filters: Optional[Dict] = None, sort: Optional[str] = None,
+                    limit: Optional[int] = None, offset: int = 0) -> Tuple[List[Dict], int]:
+        """
+        Return (leads, total) for a filtered, sorted page of leads.
+        filters may contain sales_rep, status and segment (customer_segment); sort is a field name, prefixed with
+        "-" for descending order; fields projects each lead down to the given keys. total counts all matches.
+        """
+        clauses, params = [], []
+        for field, value in _lead_filters(filters).items():
+            clauses.append(f"{_lead_expr(field)} = ?")
+            params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        total = self._conn().execute(f"SELECT COUNT(*) FROM leads l {where}", params).fetchone()[0]
+        order = "l.position"
+        if sort:
+            order = f"{_lead_expr(sort.lstrip('-'))} {'DESC' if sort.startswith('-') else 'ASC'}, l.position"
+        leads = self._leads(f"{where} ORDER BY {order} LIMIT ? OFFSET ?", params + [-1 if limit is None else limit, offset])
+        return _project(leads, fields), total
+
+    def get_deals(self) -> List[Dict]:
+        """Return all deals"""
+        rows = self._conn().execute("SELECT data FROM deals ORDER BY position").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def iter_deals(self) -> Iterator[Dict]:
+        """Iterate over all deals"""
+        cursor = self._conn().execute("SELECT data FROM deals ORDER BY position")
+        return (json.loads(row[0]) for row in cursor)
+
+    def deals_signature(self):
+        """Value that changes whenever the deals may have changed, for caches built over them"""
+        row = self._conn().execute("SELECT value FROM meta WHERE key = 'deals_version'").fetchone()
+        return row[0] if row else 0
+
+    def get_messages(self, record_id: str, limit: Optional[int] = None, start: Optional[str] = None,
+                     end: Optional[str] = None) -> List[Dict]:
+        """
+        Return a lead's message_log entries, oldest first.
+        limit keeps only the most recent n; start/end (YYYY-MM-DD, inclusive) restrict to a time range.
+        """
+        query = "SELECT data FROM message_log WHERE record_id = ?"
+        params = [record_id]
+        if start is not None:
+            query += " AND timestamp >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND timestamp <= ?"
+            params.append(end)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(-1 if limit is None else limit)
+        rows = self._conn().execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def update_lead(self, record_id: str, fields: Dict, message: Optional[Dict] = None, expected_version: Optional[int] = None) -> bool:
+        """
+        Apply field changes to a lead, optionally appending a message_log entry, and bump its version in one transaction.
+        If expected_version is given and the lead's version differs, raises CRMVersionConflict.
+        Returns False if the lead does not exist.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            position, lead = self._read_lead_row(conn, record_id)
+            if not lead:
+                conn.execute("ROLLBACK")
+                return False
+            version = lead.get("version", 0)
+            if expected_version is not None and version != expected_version:
+                raise CRMVersionConflict(f"Lead {record_id} is at version {version}, expected {expected_version}")
+            self._write_lead_row(conn, position, lead, fields, message)
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def update_leads(self, updates: List[Tuple[str, Callable]]) -> List[Dict]:
+        """
+        Apply many lead updates in a single transaction.
+        Each update is (record_id, build), where build(lead) returns (fields, message) computed from the lead's
+        current state, including earlier updates to the same lead in this batch.
+        Returns one {"record_id", "status"} per update, with status "success", "no_update", "not_found" or "error".
+        """
+        results = []
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for record_id, build in updates:
+                position, lead = self._read_lead_row(conn, record_id)
+                if not lead:
+                    results.append({"record_id": record_id, "status": "not_found"})
+                    continue
+                try:
+                    fields, message = build(lead)
+                except Exception as e:
+                    results.append({"record_id": record_id, "status": "error", "message": str(e)})
+                    continue
+                if not fields and message is None:
+                    results.append({"record_id": record_id, "status": "no_update"})
+                    continue
+                self._write_lead_row(conn, position, lead, fields, message)
+                results.append({"record_id": record_id, "status": "success"})
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        return results
+
+    def _read_lead_row(self, conn, record_id: str):
+        """Read a lead's position and document (without message_log) inside the current transaction"""
+        row = conn.execute("SELECT position, data FROM leads WHERE record_id = ?", (record_id,)).fetchone()
+        if not row:
+            return None, None
+        return row[0], json.loads(row[1])
+
+    def _write_lead_row(self, conn, position: int, lead: Dict, fields: Dict, message: Optional[Dict]):
+        """Apply field changes to a lead read with _read_lead_row, bump its version and log the message"""
+        lead.update(fields)
+        lead["version"] = lead.get("version", 0) + 1
+        conn.execute(
+            "UPDATE leads SET first_name = ?, last_name = ?, company_name = ?, name_key = ?, company_key = ?, "
+            "sales_rep = ?, industry = ?, next_follow_up = ?, data = ? WHERE record_id = ?",
+            _lead_row(lead, position)[2:] + (lead["record_id"],)
+        )
+        if message is not None:
+            conn.execute(
+                "INSERT INTO message_log (record_id, timestamp, data) VALUES (?, ?, ?)",
+                (lead["record_id"], message.get("timestamp"), json.dumps(message))
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import crm_data.json into the SQLite CRM database")
+    parser.add_argument("json_path", nargs="?", default=str(CRM_DATA_PATH))
+    parser.add_argument("db_path", nargs="?", default=str(CRM_SQLITE_PATH))
+    args = parser.parse_args()
+    print(import_json(args.json_path, args.db_path))
@@ -0,0 +1,424 @@
+import heapq
+import io
+import json
+import os
+import re
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from crm.locking import file_lock
+from crm.repository import (CRM_DATA_PATH, CRMRepository, CRMVersionConflict, _fold, _lead_filters, _name_key,
+                            _project, _sort_key)
+
+# Characters read from the snapshot per refill; memory use is bounded by this plus the largest single lead or deal
+STREAM_CHUNK_SIZE = int(os.getenv("CRM_STREAM_CHUNK_SIZE", str(1024 * 1024)))
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_JOURNAL_SEQ = re.compile(rb'"journal_seq"\s*:\s*(\d+)\s*\}\s*$')
+_decoder = json.JSONDecoder()
+
+# Top-level arrays that can be arbitrarily large; they are never decoded as a whole
+RECORD_KEYS = ("crm_leads", "deals")
+
+
+class _JSONReader:
+    """Incremental reader over a JSON text stream that decodes one value at a time from a bounded buffer"""
+
+    def __init__(self, f, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ("" at end of input)"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed CRM file: expected {char!r}, found {found or 'end of file'!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def items(self) -> Iterator:
+        """Iterate over the elements of the array at the current position"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Malformed CRM file: expected ',' or ']', found {separator or 'end of file'!r}")
+
+
+def iter_sections(f, stream_keys=RECORD_KEYS, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Tuple[str, object]]:
+    """
+    Iterate over the top-level (key, value) pairs of a CRM document without loading it.
+    Arrays under stream_keys are yielded as iterators over their elements; elements the caller does not consume
+    are decoded and discarded one at a time before moving on to the next key. Record arrays not in stream_keys
+    are skipped the same way without being yielded.
+    """
+    reader = _JSONReader(f, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if key in RECORD_KEYS and key not in stream_keys and reader.peek() == "[":
+            for _ in reader.items():
+                pass
+        elif key in stream_keys and reader.peek() == "[":
+            items = reader.items()
+            yield key, items
+            for _ in items:
+                pass
+        else:
+            yield key, reader.value()
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == "}":
+            return
+        if separator != ",":
+            raise ValueError(f"Malformed CRM file: expected ',' or '}}', found {separator or 'end of file'!r}")
+
+
+def iter_records(data_file, key: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Dict]:
+    """Stream the elements of one top-level array ("crm_leads" or "deals") of a CRM file"""
+    with open(data_file, 'r', encoding='utf-8') as f:
+        for section, value in iter_sections(f, (key,), chunk_size):
+            if section == key:
+                yield from value
+                return
+
+
+class StreamingCRMRepository(CRMRepository):
+    """
+    Bounded-memory CRM backend for exports too large to json.load, selected with CRM_BACKEND=stream.
+    Nothing is cached: every lookup streams crm_data.json one lead or deal at a time and overlays the (small) update
+    journal, so lookups cost a scan of the file but memory stays at a chunk plus one record.
+    Updates are journaled exactly like CRMRepository, and compact() streams a new snapshot instead of loading one,
+    so both backends can share the same files.
+    """
+
+    def __init__(self, data_file=CRM_DATA_PATH, chunk_size: int = STREAM_CHUNK_SIZE):
+        super().__init__(data_file)
+        self.chunk_size = chunk_size
+        self._journal_cache = None
+        self._count = None
+
+    def _open_snapshot(self):
+        """Open the snapshot and return (text stream, journal_seq); journal_seq is the last key of a compacted snapshot"""
+        f = open(self.data_file, 'rb')
+        try:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 4096))
+            match = _JOURNAL_SEQ.search(f.read())
+            f.seek(0)
+        except Exception:
+            f.close()
+            raise
+        return io.TextIOWrapper(f, encoding='utf-8'), int(match.group(1)) if match else 0
+
+    def _journal_state(self, snapshot_seq: int):
+        """Return (last seq, {record_id: fields}, {record_id: [messages]}) for journal records newer than the snapshot"""
+        try:
+            stat = os.stat(self.journal_file)
+        except FileNotFoundError:
+            return snapshot_seq, {}, {}
+        key = (snapshot_seq, stat.st_size, stat.st_mtime_ns)
+        if self._journal_cache and self._journal_cache[0] == key:
+            return self._journal_cache[1]
+        seq, fields, messages = snapshot_seq, {}, {}
+        with open(self.journal_file, 'rb') as f:
+            data = f.read()
+        # Only complete lines; a partially written record is picked up on the next read
+        for line in data[:data.rfind(b"\n") + 1].splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["seq"] <= snapshot_seq:
+                continue
+            fields.setdefault(record["record_id"], {}).update(record.get("fields") or {})
+            if record.get("message") is not None:
+                messages.setdefault(record["record_id"], []).append(record["message"])
+            seq = max(seq, record["seq"])
+        self._journal_cache = (key, (seq, fields, messages))
+        return seq, fields, messages
+
+    def _scan(self, keep_messages: bool = False) -> Iterator[Dict]:
+        """Stream leads with journaled updates applied (and, unless keep_messages, without embedded message logs)"""
+        f, snapshot_seq = self._open_snapshot()
+        with f:
+            _, updates, _ = self._journal_state(snapshot_seq)
+            for key, value in iter_sections(f, ("crm_leads",), self.chunk_size):
+                if key != "crm_leads":
+                    continue
+                for lead in value:
+                    if not keep_messages:
+                        lead.pop("message_log", None)
+                    lead.update(updates.get(lead.get("record_id"), {}))
+                    yield lead
+                return
+
+    def _first(self, predicate: Callable[[Dict], bool], keep_messages: bool = False) -> Optional[Dict]:
+        return next((lead for lead in self._scan(keep_messages) if predicate(lead)), None)
+
+    def get_lead(self, record_id: str) -> Optional[Dict]:
+        """Return the lead with the given record_id, or None"""
+        return self._first(lambda lead: lead.get("record_id") == record_id)
+
+    def find_lead(self, first_name: str, last_name: str, company_name: str) -> Optional[Dict]:
+        """Return the lead matching first name, last name and company (case-insensitive), or None"""
+        key = _name_key(first_name, last_name, company_name)
+        return self._first(lambda lead: _name_key(lead.get("first_name"), lead.get("last_name"), lead.get("company_name")) == key)
+
+    def find_lead_by_company(self, company_name: str) -> Optional[Dict]:
+        """Return the first lead at the given company (case-insensitive), or None"""
+        key = _fold(company_name)
+        return self._first(lambda lead: _fold(lead.get("company_name")) == key)
+
+    def leads_for_rep(self, sales_rep: str) -> List[Dict]:
+        """Return the leads assigned to a sales rep"""
+        return [lead for lead in self._scan() if lead.get("sales_rep") == sales_rep]
+
+    def iter_leads(self) -> Iterator[Dict]:
+        """Iterate over all leads"""
+        return self._scan()
+
+    def list_leads(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Return one page of leads in CRM order"""
+        leads, _ = self.query_leads(limit=limit, offset=offset)
+        return leads
+
+    def count_leads(self) -> int:
+        """Return the total number of leads"""
+        signature = self._file_signature()
+        if self._count is None or self._count[0] != signature:
+            self._count = (signature, sum(1 for _ in iter_records(self.data_file, "crm_leads", self.chunk_size)))
+        return self._count[1]
+
+    def query_leads(self, fields: Optional[List[str]] = None, filters: Optional[Dict] = None, sort: Optional[str] = None,
+                    limit: Optional[int] = None, offset: int = 0) -> Tuple[List[Dict], int]:
+        """
+        Return (leads, total) for a filtered, sorted page of leads.
+        filters may contain sales_rep, status and segment (customer_segment); sort is a field name, prefixed with
+        "-" for descending order; fields projects each lead down to the given keys. total counts all matches.
+        Only the requested page is held in memory (the first offset + limit matches when sorting).
+        """
+        filters = _lead_filters(filters)
+        end = None if limit is None else offset + limit
+        total = 0
+        page = []
+
+        def matches():
+            nonlocal total
+            for lead in self._scan():
+                if all(lead.get(key) == value for key, value in filters.items()):
+                    total += 1
+                    yield total, lead
+
+        if sort:
+            field = sort.lstrip("-")
+            descending = sort.startswith("-")
+
+            # CRM order breaks ties, like a stable sort
+            def key(item):
+                return _sort_key(item[1].get(field)), -item[0] if descending else item[0]
+
+            if end is None:
+                ordered = sorted(matches(), key=key, reverse=descending)
+            else:
+                ordered = (heapq.nlargest if descending else heapq.nsmallest)(end, matches(), key=key)
+            page = [lead for _, lead in ordered[offset:end]]
+        else:
+            for position, lead in matches():
+                if position > offset and (end is None or position <= end):
+                    page.append(lead)
+        return _project(page, fields), total
+
+    def iter_deals(self) -> Iterator[Dict]:
+        """Iterate over all deals without loading them"""
+        return iter_records(self.data_file, "deals", self.chunk_size)
+
+    def get_deals(self) -> List[Dict]:
+        """Return all deals"""
+        return list(self.iter_deals())
+
+    def deals_signature(self):
+        """Value that changes whenever the deals may have changed, for caches built over them"""
+        return self._file_signature()
+
+    def _pending_for(self, record_id: str) -> List[Dict]:
+        f, snapshot_seq = self._open_snapshot()
+        f.close()
+        _, _, journal_messages = self._journal_state(snapshot_seq)
+        lead = self._first(lambda lead: lead.get("record_id") == record_id, keep_messages=True)
+        embedded = lead.get("message_log") if lead else None
+        return (list(embedded) if isinstance(embedded, list) else []) + journal_messages.get(record_id, [])
+
+    def update_lead(self, record_id: str, fields: Dict, message: Optional[Dict] = None, expected_version: Optional[int] = None) -> bool:
+        """
+        Apply field changes to a lead, optionally appending a message_log entry, and bump its version.
+        If expected_version is given and the lead's version differs, raises CRMVersionConflict.
+        Returns False if the lead does not exist.
+        """
+        results = self._update([(record_id, lambda lead: (fields, message))], expected_version)
+        return results[0]["status"] != "not_found"
+
+    def update_leads(self, updates: List[Tuple[str, Callable]]) -> List[Dict]:
+        """
+        Apply many lead updates with one scan of the CRM file and one journal write.
+        See CRMRepository.update_leads for the shape of updates and results.
+        """
+        return self._update(updates)
+
+    def _update(self, updates: List[Tuple[str, Callable]], expected_version: Optional[int] = None) -> List[Dict]:
+        with self._lock, file_lock(self.lock_file):
+            f, snapshot_seq = self._open_snapshot()
+            f.close()
+            seq, _, _ = self._journal_state(snapshot_seq)
+            wanted = {record_id for record_id, _ in updates}
+            leads = {}
+            for lead in self._scan():
+                if lead.get("record_id") in wanted:
+                    leads.setdefault(lead["record_id"], lead)
+                    if len(leads) == len(wanted):
+                        break
+            results, records, messages = [], [], {}
+            for record_id, build in updates:
+                lead = leads.get(record_id)
+                if not lead:
+                    results.append({"record_id": record_id, "status": "not_found"})
+                    continue
+                version = lead.get("version", 0)
+                if expected_version is not None and version != expected_version:
+                    raise CRMVersionConflict(f"Lead {record_id} is at version {version}, expected {expected_version}")
+                try:
+                    fields, message = build(lead)
+                except Exception as e:
+                    results.append({"record_id": record_id, "status": "error", "message": str(e)})
+                    continue
+                if not fields and message is None:
+                    results.append({"record_id": record_id, "status": "no_update"})
+                    continue
+                seq += 1
+                record = {"seq": seq, "record_id": record_id, "fields": {**fields, "version": version + 1}}
+                # Later entries for the same lead build on this one
+                lead.update(record["fields"])
+                if message is not None:
+                    messages.setdefault(record_id, []).append(message)
+                records.append(record)
+                results.append({"record_id": record_id, "status": "success"})
+            for record_id, lead_messages in messages.items():
+                self.messages.append(record_id, lead_messages)
+            if records:
+                self._append_journal(records)
+            self._maybe_compact()
+        return results
+
+    def compact(self) -> bool:
+        """
+        Stream the snapshot into a new crm_data.json with the journal folded in, one lead at a time.
+        Message logs still embedded in the snapshot stay there; migrate_messages() moves them.
+        Returns False if there was nothing to compact.
+        """
+        return self._rewrite(migrate=False) is not None
+
+    def migrate_messages(self) -> int:
+        """Like CRMRepository.migrate_messages, streaming the snapshot instead of loading it"""
+        return self._rewrite(migrate=True) or 0
+
+    def _rewrite(self, migrate: bool) -> Optional[int]:
+        """
+        Stream a new snapshot with the journal folded in, moving embedded message logs to the leads' archive segments
+        if migrate is set. Returns the number of leads migrated, or None if there was nothing to rewrite.
+        """
+        with self._lock, file_lock(self.lock_file):
+            f, snapshot_seq = self._open_snapshot()
+            with f:
+                seq, updates, journal_messages = self._journal_state(snapshot_seq)
+                journal_size = self._journal_size()
+                tmp_file = self.data_file.with_name(f"{self.data_file.name}.tmp")
+                migrated = 0
+                with open(tmp_file, 'w', encoding='utf-8') as out:
+                    out.write("{")
+                    first_key = True
+                    for key, value in iter_sections(f, RECORD_KEYS, self.chunk_size):
+                        if key == "journal_seq":
+                            continue
+                        out.write(f'{"" if first_key else ","}\n    {json.dumps(key)}: ')
+                        first_key = False
+                        if key not in RECORD_KEYS or not isinstance(value, Iterator):
+                            out.write(json.dumps(value))
+                            continue
+                        out.write("[")
+                        for i, record in enumerate(value):
+                            if key == "crm_leads":
+                                record_id = record.get("record_id")
+                                if record_id in journal_messages and isinstance(record.setdefault("message_log", []), list):
+                                    # Journal records written before the message store existed carry the message
+                                    record["message_log"] += journal_messages[record_id]
+                                if migrate and "message_log" in record:
+                                    message_log = record.pop("message_log")
+                                    if isinstance(message_log, list) and message_log:
+                                        self.messages.write_archive(record_id, message_log)
+                                    migrated += 1
+                                record.update(updates.get(record_id, {}))
+                            out.write(f'{"" if i == 0 else ","}\n        {json.dumps(record)}')
+                        out.write("\n    ]")
+                    out.write(f'{"" if first_key else ","}\n    "journal_seq": {seq}\n}}\n')
+                    out.flush()
+                    os.fsync(out.fileno())
+            if (migrate and not migrated) or (not migrate and journal_size == 0):
+                os.remove(tmp_file)
+                return None
+            os.replace(tmp_file, self.data_file)
+            if journal_size:
+                # Writers are locked out, but keep anything past the folded records (e.g. a torn final line)
+                with open(self.journal_file, 'rb') as journal:
+                    data = journal.read()
+                remainder = data[data.rfind(b"\n") + 1:]
+                tmp_journal = self.journal_file.with_name(f"{self.journal_file.name}.tmp")
+                with open(tmp_journal, 'wb') as journal:
+                    journal.write(remainder)
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                os.replace(tmp_journal, self.journal_file)
+            self._journal_cache = None
+            return migrated
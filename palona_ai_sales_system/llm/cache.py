@@ -0,0 +1,181 @@
+import argparse
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+LLM_CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH") or Path(__file__).parent.parent / "data" / "llm_cache.sqlite3")
+# Entries older than this are never served
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+# Least recently used entries are evicted beyond this total size
+LLM_CACHE_MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "200")) * 1024 * 1024)
+# Tools whose completions are cached; drafts and action detection are not, so each run gets a fresh answer.
+# Override with a comma-separated LLM_CACHE_TOOLS (empty disables the cache).
+DEFAULT_CACHED_TOOLS = {"CompanyResearchTool", "LinkedInResearchTool", "ReportGenerationTool", "CommunicationSummaryTool"}
+
+# totals holds the entries' total size, kept current by triggers, so a store never has to sum the table
+SCHEMA = """
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed);
+CREATE INDEX IF NOT EXISTS idx_entries_created ON entries (created);
+CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO totals SELECT 0, COALESCE(SUM(size), 0) FROM entries;
+CREATE TRIGGER IF NOT EXISTS entries_inserted AFTER INSERT ON entries
+    BEGIN UPDATE totals SET bytes = bytes + new.size; END;
+CREATE TRIGGER IF NOT EXISTS entries_deleted AFTER DELETE ON entries
+    BEGIN UPDATE totals SET bytes = bytes - old.size; END;
+CREATE TRIGGER IF NOT EXISTS entries_resized AFTER UPDATE OF size ON entries
+    BEGIN UPDATE totals SET bytes = bytes - old.size + new.size; END;
+COMMIT;
+"""
+# Least recently used entries read per step when evicting
+EVICT_BATCH = 256
+
+# Set per Streamlit session/run (see bypass_cache), so one user's bypass does not affect others
+_bypass = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+def cached_tools():
+    value = os.getenv("LLM_CACHE_TOOLS")
+    if value is None:
+        return DEFAULT_CACHED_TOOLS
+    return {tool.strip() for tool in value.split(",") if tool.strip()}
+
+
+def cache_enabled(tool: Optional[str]) -> bool:
+    return tool is not None and tool in cached_tools()
+
+
+def bypass_cache(bypass: bool = True):
+    """Skip cache lookups (fresh completions are still stored) for the rest of the current context, e.g. a UI run"""
+    _bypass.set(bool(bypass))
+
+
+def cache_bypassed() -> bool:
+    return _bypass.get()
+
+
+def cache_key(provider: str, model: str, temperature: float, max_tokens: int, system: Optional[str], prompt: str) -> str:
+    """Content address of a completion: everything that changes the answer, hashed"""
+    payload = json.dumps([provider, model, temperature, max_tokens, system, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent LLM response cache in SQLite (WAL mode), keyed by cache_key.
+    Entries expire after LLM_CACHE_TTL seconds; once the cache grows beyond LLM_CACHE_MAX_BYTES the least recently
+    used entries are evicted. Hits, misses, stores and evictions are counted in stats.
+    """
+
+    def __init__(self, db_path=LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL, max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.db_path = Path(db_path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread, as in crm/sqlite_store.py
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str, n: int = 1):
+        with self._stats_lock:
+            self.stats[name] += n
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT value FROM entries WHERE key = ? AND created >= ?", (key, now - self.ttl)).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return row[0]
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete would not fire the totals trigger
+            conn.execute("INSERT INTO entries VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value,"
+                         " size = excluded.size, created = excluded.created, accessed = excluded.accessed",
+                         (key, value, len(value.encode("utf-8")), now, now))
+            evicted = conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,)).rowcount
+            evicted += _evict_lru(conn, self.max_bytes)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._count("stores")
+        self._count("evictions", evicted)
+
+    def clear(self):
+        self._conn().execute("DELETE FROM entries")
+
+    def info(self) -> Dict:
+        count, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"path": str(self.db_path), "entries": count, "bytes": size, **self.stats}
+
+
+def _evict_lru(conn: sqlite3.Connection, max_bytes: int) -> int:
+    """Delete least recently used entries, oldest first in batches off the accessed index, until totals fits max_bytes"""
+    excess = conn.execute("SELECT bytes FROM totals").fetchone()[0] - max_bytes
+    evicted = 0
+    while excess > 0:
+        rows = conn.execute("SELECT key, size FROM entries ORDER BY accessed LIMIT ?", (EVICT_BATCH,)).fetchall()
+        if not rows:
+            break
+        keys = []
+        for key, size in rows:
+            keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", keys)
+        evicted += len(keys)
+    return evicted
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the LLM response cache")
+    parser.add_argument("command", choices=["info", "clear"])
+    args = parser.parse_args()
+    if args.command == "clear":
+        get_llm_cache().clear()
+    print(get_llm_cache().info())
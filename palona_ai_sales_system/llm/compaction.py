@@ -0,0 +1,108 @@
+import re
+import threading
+from typing import Dict, Iterable, Optional
+
+from bs4 import BeautifulSoup
+
+# Rough characters per token for English text and URLs; close enough to budget prompts without a tokenizer
+CHARS_PER_TOKEN = 4
+# Longest string kept from any single field (snippets, descriptions, extracts are cut at a word boundary)
+MAX_FIELD_CHARS = 400
+# Keys that only carry API bookkeeping, markup variants or page metadata
+NOISE_KEYS = {
+    "kind", "pagemap", "metatags", "cse_thumbnail", "cse_image", "htmlTitle", "htmlSnippet", "htmlFormattedUrl",
+    "formattedUrl", "displayLink", "cacheId", "queries", "context", "searchInformation", "request", "nextPage",
+    "urlToImage", "FirstURL", "Icon", "Result",
+}
+
+_TAG = re.compile(r"<[^>]+>")
+_SPACE = re.compile(r"\s+")
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def clean_text(text: str, max_chars: int = MAX_FIELD_CHARS) -> str:
+    """Strip HTML and collapse whitespace, then cut to max_chars at a word boundary"""
+    if _TAG.search(text):
+        text = BeautifulSoup(text, "html.parser").get_text(" ")
+    text = _SPACE.sub(" ", text).strip()
+    if len(text) > max_chars:
+        text = text[:max_chars].rsplit(" ", 1)[0] + " …"
+    return text
+
+
+def _render(value, fields: Optional[Iterable[str]], max_chars: int, indent: str = "") -> list:
+    """Lines of text for a value: dicts as "key: value" without noise keys, lists as "- " items, empty values dropped"""
+    if value is None or value == "" or value == [] or value == {}:
+        return []
+    if isinstance(value, dict):
+        keys = [key for key in (fields or value.keys()) if key in value and key not in NOISE_KEYS]
+        lines = []
+        for key in keys:
+            child = _render(value[key], None, max_chars, indent + "  ")
+            if len(child) == 1:
+                lines.append(f"{indent}{key}: {child[0].strip()}")
+            elif child:
+                lines.append(f"{indent}{key}:")
+                lines.extend(child)
+        return lines
+    if isinstance(value, (list, tuple)):
+        lines = []
+        for item in value:
+            child = _render(item, fields, max_chars, indent + "  ")
+            if child:
+                lines.append(f"{indent}- {child[0].strip()}")
+                lines.extend(child[1:])
+        return lines
+    text = clean_text(str(value), max_chars)
+    return [f"{indent}{text}"] if text else []
+
+
+def compact(value, budget: int, fields: Optional[Iterable[str]] = None, max_field_chars: int = MAX_FIELD_CHARS) -> str:
+    """
+    Compact text for one source's data: HTML stripped, noise keys and empty values dropped, fields cut to
+    max_field_chars, and lines kept up to a budget of about `budget` tokens (the line that overflows it is cut).
+    fields keeps only those keys of a dict (or of each dict in a list), in that order.
+    """
+    lines, remaining = [], budget * CHARS_PER_TOKEN
+    for line in _render(value, fields, max_field_chars):
+        if len(line) >= remaining:
+            cut = line[:remaining].rsplit(" ", 1)[0]
+            # Not worth keeping a line cut down to a few words
+            if len(cut) > remaining // 2:
+                lines.append(cut + " …")
+            else:
+                lines.append("…")
+            break
+        lines.append(line)
+        remaining -= len(line) + 1
+    return "\n".join(lines)
+
+
+def compact_sources(tool: str, sources: Dict[str, Dict]) -> Dict[str, str]:
+    """
+    Compact each source, given as name -> compact() arguments, and add the estimated tokens of its raw repr (what the
+    prompts used to include) and of the compacted text to the tool's stats.
+    """
+    compacted = {}
+    for name, options in sources.items():
+        compacted[name] = compact(**options)
+        before = estimate_tokens(str(options["value"]))
+        after = estimate_tokens(compacted[name])
+        with _stats_lock:
+            stats = _stats.setdefault(f"{tool}:{name}", {"calls": 0, "tokens_before": 0, "tokens_after": 0})
+            stats["calls"] += 1
+            stats["tokens_before"] += before
+            stats["tokens_after"] += after
+    return compacted
+
+
+def get_compaction_stats() -> Dict[str, Dict]:
+    """Calls and estimated prompt tokens before and after compaction per "tool:source" since the process started"""
+    with _stats_lock:
+        return {key: dict(stats) for key, stats in _stats.items()}
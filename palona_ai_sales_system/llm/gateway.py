@@ -0,0 +1,392 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from llm.cache import cache_bypassed, cache_enabled, cache_key, get_llm_cache
+from llm.compaction import get_compaction_stats
+from web.aio import get_session as get_async_session
+
+ANTHROPIC_URL = "https://api.anthropic.com/v1/messages"
+ANTHROPIC_VERSION = "2023-06-01"
+OPENAI_URL = "https://api.openai.com/v1/chat/completions"
+
+# Model per tier and provider; "large" is what every tool used before the gateway
+MODEL_TIERS = {
+    "large": {"claude": "claude-3-opus-20240229", "openai": "gpt-4"},
+    "small": {"claude": "claude-3-haiku-20240307", "openai": "gpt-3.5-turbo"},
+}
+# (connect, read) timeouts in seconds
+LLM_TIMEOUT = (float(os.getenv("LLM_CONNECT_TIMEOUT", "10")), float(os.getenv("LLM_READ_TIMEOUT", "120")))
+# Retries on connection errors, rate limits (429) and overloaded/5xx responses, with exponential backoff. A request
+# that may have reached the provider (read error or timeout) is never re-sent, since it could be billed twice.
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+RETRY_STATUSES = (429, 500, 502, 503, 504, 529)
+# Kept-alive connections per provider host
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "10"))
+
+
+class LLMUnavailableError(RuntimeError):
+    """Neither CLAUDE_API_KEY nor OPENAI_API_KEY is set"""
+
+
+def provider() -> Optional[str]:
+    """The provider complete() calls: "claude" if CLAUDE_API_KEY is set, else "openai" if OPENAI_API_KEY is, else None"""
+    if os.getenv("CLAUDE_API_KEY"):
+        return "claude"
+    if os.getenv("OPENAI_API_KEY"):
+        return "openai"
+    return None
+
+
+def available() -> bool:
+    return provider() is not None
+
+
+def provider_options(options: Dict[str, Dict]) -> Dict:
+    """A tool's complete() keyword arguments for the current provider, from {"claude": {...}, "openai": {...}}"""
+    return options.get(provider(), {})
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """One process-wide session, so calls reuse pooled keep-alive connections instead of a TLS handshake each"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(total=LLM_MAX_RETRIES, connect=LLM_MAX_RETRIES, read=0, other=0, status=LLM_MAX_RETRIES,
+                          backoff_factor=1, status_forcelist=RETRY_STATUSES, allowed_methods=None,
+                          respect_retry_after_header=True, raise_on_status=False)
+            session = requests.Session()
+            # One connection pool per provider host
+            session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=LLM_POOL_SIZE, max_retries=retry))
+            _session = session
+        return _session
+
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _record(name: str, model: str, seconds: float, input_tokens: int = 0, output_tokens: int = 0, error: bool = False,
+            first_chunk_seconds: Optional[float] = None):
+    with _metrics_lock:
+        metrics = _metrics.setdefault(f"{name}:{model}", {"calls": 0, "errors": 0, "seconds": 0.0,
+                                                          "input_tokens": 0, "output_tokens": 0,
+                                                          "streams": 0, "first_chunk_seconds": 0.0})
+        metrics["calls"] += 1
+        metrics["errors"] += error
+        metrics["seconds"] += seconds
+        metrics["input_tokens"] += input_tokens
+        metrics["output_tokens"] += output_tokens
+        if first_chunk_seconds is not None:
+            metrics["streams"] += 1
+            metrics["first_chunk_seconds"] += first_chunk_seconds
+
+
+def get_metrics() -> Dict[str, Dict]:
+    """
+    Calls, errors, total seconds and tokens per "provider:model" since the process started (calls answered from the
+    response cache are not counted), with the number of streamed calls and their total time to the first chunk,
+    plus the cache's hits/misses/stores/evictions under "cache" and the research tools' prompt tokens before and after
+    compaction per source under "compaction"
+    """
+    with _metrics_lock:
+        metrics = {key: dict(metrics) for key, metrics in _metrics.items()}
+    metrics["cache"] = dict(get_llm_cache().stats)
+    metrics["compaction"] = get_compaction_stats()
+    return metrics
+
+
+def _post(name: str, model: str, url: str, headers: Dict, payload: Dict) -> Dict:
+    start = time.perf_counter()
+    try:
+        response = _get_session().post(url, headers=headers, json=payload, timeout=LLM_TIMEOUT)
+        if response.status_code >= 400:
+            # The API's error body says why (bad model, context too long, ...), which raise_for_status drops
+            raise requests.HTTPError(f"{response.status_code} from {name} ({model}): {response.text[:500]}",
+                                     response=response)
+        result = response.json()
+    except Exception:
+        _record(name, model, time.perf_counter() - start, error=True)
+        raise
+    usage = result.get("usage") or {}
+    _record(name, model, time.perf_counter() - start,
+            usage.get("input_tokens", usage.get("prompt_tokens", 0)),
+            usage.get("output_tokens", usage.get("completion_tokens", 0)))
+    return result
+
+
+def _post_stream(name: str, model: str, url: str, headers: Dict, payload: Dict) -> Iterator[Dict]:
+    """POST a streaming request and yield the server-sent events' JSON payloads as they arrive"""
+    start = time.perf_counter()
+    first_chunk = None
+    usage = {}
+    error = True
+    try:
+        with _get_session().post(url, headers=headers, json=payload, timeout=LLM_TIMEOUT, stream=True) as response:
+            if response.status_code >= 400:
+                raise requests.HTTPError(f"{response.status_code} from {name} ({model}): {response.text[:500]}",
+                                         response=response)
+            response.encoding = "utf-8"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                if event.get("type") == "error":
+                    raise RuntimeError(f"Stream error from {name} ({model}): {event.get('error')}")
+                # Claude reports usage in message_start and message_delta, OpenAI in the last chunk
+                usage.update(event.get("usage") or (event.get("message") or {}).get("usage") or {})
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - start
+                yield event
+        error = False
+    finally:
+        _record(name, model, time.perf_counter() - start,
+                usage.get("input_tokens", usage.get("prompt_tokens")) or 0,
+                usage.get("output_tokens", usage.get("completion_tokens")) or 0,
+                error=error, first_chunk_seconds=first_chunk)
+
+
+async def _apost(name: str, model: str, url: str, headers: Dict, payload: Dict) -> Dict:
+    """_post() on the shared aiohttp session, with the same retries"""
+    start = time.perf_counter()
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=LLM_TIMEOUT[0], sock_read=LLM_TIMEOUT[1])
+    try:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            retry_after = None
+            try:
+                async with get_async_session().post(url, headers=headers, json=payload, timeout=timeout) as response:
+                    if response.status in RETRY_STATUSES and attempt < LLM_MAX_RETRIES:
+                        retry_after = response.headers.get("Retry-After")
+                    elif response.status >= 400:
+                        text = await response.text()
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history, status=response.status,
+                            message=f"{response.status} from {name} ({model}): {text[:500]}"
+                        )
+                    else:
+                        result = await response.json(content_type=None)
+                        break
+            except (aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError):
+                # Only failures to connect; a read timeout or dropped response is not re-sent
+                if attempt == LLM_MAX_RETRIES:
+                    raise
+            # Exponential backoff, or as long as the API asks
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt
+            await asyncio.sleep(delay)
+    except Exception:
+        _record(name, model, time.perf_counter() - start, error=True)
+        raise
+    usage = result.get("usage") or {}
+    _record(name, model, time.perf_counter() - start,
+            usage.get("input_tokens", usage.get("prompt_tokens", 0)),
+            usage.get("output_tokens", usage.get("completion_tokens", 0)))
+    return result
+
+
+def _claude_request(model: str, prompt: str, max_tokens: int, temperature: float, system: Optional[str],
+                    stream: bool = False):
+    payload = {"model": model, "max_tokens": max_tokens, "temperature": temperature,
+               "messages": [{"role": "user", "content": prompt}]}
+    if system:
+        payload["system"] = system
+    if stream:
+        payload["stream"] = True
+    headers = {"x-api-key": os.getenv("CLAUDE_API_KEY"), "anthropic-version": ANTHROPIC_VERSION,
+               "content-type": "application/json"}
+    return headers, payload
+
+
+def _openai_request(model: str, prompt: str, max_tokens: int, temperature: float, system: Optional[str],
+                    stream: bool = False):
+    messages = [{"role": "system", "content": system}] if system else []
+    messages.append({"role": "user", "content": prompt})
+    payload = {"model": model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+    if stream:
+        payload.update({"stream": True, "stream_options": {"include_usage": True}})
+    headers = {"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}", "Content-Type": "application/json"}
+    return headers, payload
+
+
+def _complete_claude(model: str, prompt: str, max_tokens: int, temperature: float, system: Optional[str]) -> str:
+    headers, payload = _claude_request(model, prompt, max_tokens, temperature, system)
+    result = _post("claude", model, ANTHROPIC_URL, headers, payload)
+    return result["content"][0]["text"].strip()
+
+
+def _complete_openai(model: str, prompt: str, max_tokens: int, temperature: float, system: Optional[str]) -> str:
+    headers, payload = _openai_request(model, prompt, max_tokens, temperature, system)
+    result = _post("openai", model, OPENAI_URL, headers, payload)
+    return result["choices"][0]["message"]["content"].strip()
+
+
+async def _acomplete_claude(model: str, prompt: str, max_tokens: int, temperature: float, system: Optional[str]) -> str:
+    headers, payload = _claude_request(model, prompt, max_tokens, temperature, system)
+    result = await _apost("claude", model, ANTHROPIC_URL, headers, payload)
+    return result["content"][0]["text"].strip()
+
+
+async def _acomplete_openai(model: str, prompt: str, max_tokens: int, temperature: float, system: Optional[str]) -> str:
+    headers, payload = _openai_request(model, prompt, max_tokens, temperature, system)
+    result = await _apost("openai", model, OPENAI_URL, headers, payload)
+    return result["choices"][0]["message"]["content"].strip()
+
+
+def _stream_claude(model: str, prompt: str, max_tokens: int, temperature: float, system: Optional[str]) -> Iterator[str]:
+    headers, payload = _claude_request(model, prompt, max_tokens, temperature, system, stream=True)
+    for event in _post_stream("claude", model, ANTHROPIC_URL, headers, payload):
+        if event.get("type") == "content_block_delta":
+            yield event.get("delta", {}).get("text", "")
+
+
+def _stream_openai(model: str, prompt: str, max_tokens: int, temperature: float, system: Optional[str]) -> Iterator[str]:
+    headers, payload = _openai_request(model, prompt, max_tokens, temperature, system, stream=True)
+    for event in _post_stream("openai", model, OPENAI_URL, headers, payload):
+        for choice in event.get("choices") or []:
+            yield (choice.get("delta") or {}).get("content") or ""
+
+
+def _resolve(model_tier: str):
+    """(provider, model) for a tier"""
+    if model_tier not in MODEL_TIERS:
+        raise ValueError(f"Unknown model tier: {model_tier}")
+    name = provider()
+    if name is None:
+        raise LLMUnavailableError("Neither CLAUDE_API_KEY nor OPENAI_API_KEY is set")
+    return name, MODEL_TIERS[model_tier][name]
+
+
+def _cache_get(key: Optional[str]) -> Optional[str]:
+    if not key or cache_bypassed():
+        return None
+    try:
+        return get_llm_cache().get(key)
+    except sqlite3.Error:
+        # The cache is an optimization; an unreadable cache must not fail the call
+        return None
+
+
+def _cache_put(key: Optional[str], text: str):
+    if key:
+        try:
+            get_llm_cache().put(key, text)
+        except sqlite3.Error:
+            pass
+
+
+def complete(prompt: str, model_tier: str = "large", max_tokens: int = 1000, temperature: float = 0.2,
+             system: Optional[str] = None, tool: Optional[str] = None) -> str:
+    """
+    Complete a prompt with Claude (if CLAUDE_API_KEY is set) or OpenAI, using the model of the given tier
+    (see MODEL_TIERS), and return the stripped text.
+    If the calling tool opted into the response cache (see llm/cache.py), an identical earlier completion is returned
+    without calling the API, unless the cache is bypassed for this run.
+    Raises LLMUnavailableError without an API key, and requests exceptions for failed calls.
+    """
+    name, model = _resolve(model_tier)
+    key = cache_key(name, model, temperature, max_tokens, system, prompt) if cache_enabled(tool) else None
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+    text = _complete(name, model, prompt, max_tokens, temperature, system)
+    _cache_put(key, text)
+    return text
+
+
+def _complete(name: str, model: str, prompt: str, max_tokens: int, temperature: float, system: Optional[str]) -> str:
+    if name == "claude":
+        return _complete_claude(model, prompt, max_tokens, temperature, system)
+    try:
+        return _complete_openai(model, prompt, max_tokens, temperature, system)
+    except requests.HTTPError as e:
+        # Accounts without access to the tier's model (404) fall back to the small tier's model
+        fallback = MODEL_TIERS["small"]["openai"]
+        if e.response is not None and e.response.status_code == 404 and model != fallback:
+            return _complete_openai(fallback, prompt, max_tokens, temperature, system)
+        raise
+
+
+async def acomplete(prompt: str, model_tier: str = "large", max_tokens: int = 1000, temperature: float = 0.2,
+                    system: Optional[str] = None, tool: Optional[str] = None) -> str:
+    """
+    complete() for asyncio code: the call runs on the event loop's shared aiohttp session (web/aio.py), so one process
+    can keep many completions in flight. Same models, cache and metrics; raises aiohttp exceptions for failed calls.
+    """
+    name, model = _resolve(model_tier)
+    key = cache_key(name, model, temperature, max_tokens, system, prompt) if cache_enabled(tool) else None
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+    text = await _acomplete(name, model, prompt, max_tokens, temperature, system)
+    _cache_put(key, text)
+    return text
+
+
+async def _acomplete(name: str, model: str, prompt: str, max_tokens: int, temperature: float,
+                     system: Optional[str]) -> str:
+    if name == "claude":
+        return await _acomplete_claude(model, prompt, max_tokens, temperature, system)
+    try:
+        return await _acomplete_openai(model, prompt, max_tokens, temperature, system)
+    except aiohttp.ClientResponseError as e:
+        fallback = MODEL_TIERS["small"]["openai"]
+        if e.status == 404 and model != fallback:
+            return await _acomplete_openai(fallback, prompt, max_tokens, temperature, system)
+        raise
+
+
+def stream(prompt: str, model_tier: str = "large", max_tokens: int = 1000, temperature: float = 0.2,
+           system: Optional[str] = None, tool: Optional[str] = None) -> Iterator[str]:
+    """
+    complete(), but yield the text in chunks as the model generates it (leading whitespace dropped), so callers can
+    show output within a second or two instead of after the whole response.
+    A cached completion is yielded as one chunk; a streamed one is stored in the cache once it is complete.
+    """
+    name, model = _resolve(model_tier)
+    key = cache_key(name, model, temperature, max_tokens, system, prompt) if cache_enabled(tool) else None
+    cached = _cache_get(key)
+    if cached is not None:
+        yield cached
+        return
+    chunks = []
+    for chunk in _stream(name, model, prompt, max_tokens, temperature, system):
+        if not chunks:
+            chunk = chunk.lstrip()
+        if chunk:
+            chunks.append(chunk)
+            yield chunk
+    _cache_put(key, "".join(chunks).strip())
+
+
+def _stream(name: str, model: str, prompt: str, max_tokens: int, temperature: float, system: Optional[str]) -> Iterator[str]:
+    if name == "claude":
+        yield from _stream_claude(model, prompt, max_tokens, temperature, system)
+        return
+    chunks = _stream_openai(model, prompt, max_tokens, temperature, system)
+    try:
+        # The request is only sent on the first next(), so a 404 surfaces here, before anything was yielded
+        first = next(chunks, None)
+    except requests.HTTPError as e:
+        fallback = MODEL_TIERS["small"]["openai"]
+        if e.response is not None and e.response.status_code == 404 and model != fallback:
+            yield from _stream_openai(fallback, prompt, max_tokens, temperature, system)
+            return
+        raise
+    if first is not None:
+        yield first
+    yield from chunks
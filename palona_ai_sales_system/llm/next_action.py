@@ -0,0 +1,260 @@
+import argparse
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from llm.gateway import available, complete
+
+LABELS = ("schedule_meeting", "follow_up", "send_email")
+# The label when the model is unsure and the LLM cannot decide: sending email has no side effect, unlike a meeting
+DEFAULT_LABEL = "send_email"
+# Below this model probability the small LLM tier decides instead
+NEXT_ACTION_MIN_CONFIDENCE = float(os.getenv("NEXT_ACTION_MIN_CONFIDENCE", "0.6"))
+# Classified messages remembered per process, by hash of the message text
+NEXT_ACTION_CACHE_SIZE = int(os.getenv("NEXT_ACTION_CACHE_SIZE", "4096"))
+FEATURE_DIM = 1 << 14
+
+# Matched against the lowercased text (faster than re.I). A call to action for a meeting decides on its own;
+# following up only without one. A meeting needs a request ("can we", "would you", "let's", ...) before it, so pitch
+# sentences that merely mention booking, time or a meeting are left to the model.
+_REQUEST = r"(can|could|shall|should) we|(would|could|can|will) you|are you|would it make sense|let['’]s|let us" \
+           r"|i['’]d (love|like) to"
+_MEETING = r"(call|chat)(?![ -]?(agents?|bots?|cent(er|re)s?|widgets?|support))|meeting|meet|demo|walkthrough" \
+           r"|conversation|zoom|\d+[- ]minutes?|(find|grab|book|set up) (some )?time"
+RULES = [
+    ("schedule_meeting", re.compile(
+        rf"\b({_REQUEST})\b[^.?!\n]{{0,80}}\b({_MEETING})\b"
+        r"|\b(calendar link|calendly|meeting invite|calendar invite)\b"
+        r"|\bdoes \w+day\b[^.?!\n]{0,30}\bwork\b")),
+    ("follow_up", re.compile(
+        r"\b(follow(ing)? up|circl(e|ing) back|check(ing)? (back )?in|touch(ing)? base|bump(ing)? this"
+        r"|haven't heard|reach out again|gentle reminder)\b")),
+]
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+# Seed corpus for the linear model: greeting, context and closing are shared, the call to action carries the label
+_GREETINGS = ["Hi {name},", "Hello {name},", "Dear {name},", "{name},", "Good morning {name},"]
+_CONTEXT = [
+    "Palona AI builds emotionally intelligent agents that speak in your brand's voice across every channel.",
+    "Brands like yours use our AI agents to turn one-time buyers into loyal customers with 24/7 VIP service.",
+    "Given your focus on personalized customer experiences, I think our multi-agent platform could help.",
+    "We recently helped a peer retailer lift online conversion by 18% with brand-aligned AI advisors.",
+    "I enjoyed reading about your loyalty program relaunch and the push into new markets.",
+    "Our agents learn each customer's preferences and act on their behalf, which reduces reliance on third parties.",
+]
+_ACTIONS = {
+    "schedule_meeting": [
+        "Would you be open to a 20-minute call next week to explore this?",
+        "Are you available Tuesday or Thursday afternoon for a quick demo?",
+        "Let's find time to walk through how this could work for your team.",
+        "I'd love to set up a brief meeting with you and your CX lead.",
+        "Here is my calendar link, so pick any slot that suits you.",
+        "Could we grab 15 minutes to discuss your holiday season plans?",
+        "Happy to show you a live walkthrough whenever suits you this week.",
+        "Does Wednesday at 2pm work for a conversation?",
+        "When would be a good time to meet and go over a pilot?",
+        "I'd welcome the chance to talk through your goals over a short video call.",
+        "Would it make sense to connect over Zoom sometime next week?",
+        "Send me a couple of times that work and I'll send over an invite.",
+        "Could we meet at the conference to talk it over in person?",
+        "Let me know when you're free and I'll put something on the calendar.",
+    ],
+    "follow_up": [
+        "Just following up on my note from last week.",
+        "Circling back in case my previous email got buried.",
+        "I'll check back in a couple of weeks once your planning cycle wraps up.",
+        "No rush, I'll reach out again after your Q3 review.",
+        "Wanted to bump this to the top of your inbox.",
+        "I know timing may not be right, so I'll touch base next month.",
+        "Let me know once you've had a chance to review internally.",
+        "Checking in to see whether you had any thoughts on the proposal.",
+        "I haven't heard back, so I wanted to make sure this reached you.",
+        "I'll give it a few weeks and then send over an update.",
+        "Just a quick nudge on the note below.",
+        "Any update on your side regarding the pilot?",
+        "I'll ping you again after the holidays.",
+        "Did you get a chance to look at my last message?",
+    ],
+    "send_email": [
+        "I've attached the case study we discussed for your reference.",
+        "Sharing a short overview of our platform below.",
+        "Please find the pricing sheet and implementation timeline attached.",
+        "Here are the resources you asked for.",
+        "Thanks for your time today, and a recap of what we covered is below.",
+        "I'm introducing my colleague Sam, who leads our retail partnerships.",
+        "Feel free to forward this to anyone on your team who might find it useful.",
+        "Below are answers to the questions your team raised.",
+        "I've included the security documentation your IT team requested.",
+        "The onboarding guide and contract draft are attached.",
+        "Here's the deck I mentioned on our call.",
+        "For reference, the product sheet is linked below.",
+        "I put together a one-pager on the ROI you can expect.",
+        "You'll find the integration details in the document below.",
+    ],
+}
+_CLOSINGS = ["Best regards,\nAlex", "Thanks,\nJordan\nPalona AI", "Cheers,\nSam", "Warm regards,\nTaylor Kim\nAccount Executive"]
+_NAMES = ["Artemis", "Calvin", "Priya", "Marcus", "Elena", "Jamal"]
+
+
+def seed_examples(n_per_label: int = 150, seed: int = 0) -> List[Tuple[str, str]]:
+    rng = random.Random(seed)
+    examples = []
+    for label, actions in _ACTIONS.items():
+        for _ in range(n_per_label):
+            context = rng.sample(_CONTEXT, rng.randint(1, 3))
+            lines = [rng.choice(_GREETINGS).format(name=rng.choice(_NAMES)), " ".join(context), rng.choice(actions),
+                     rng.choice(_CLOSINGS)]
+            examples.append(("\n\n".join(lines), label))
+    return examples
+
+
+def _features(text: str) -> np.ndarray:
+    """Hashed unigram and bigram indices of the lowercased text"""
+    tokens = _TOKEN.findall(text.lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return np.fromiter({zlib.crc32(gram.encode()) % FEATURE_DIM for gram in grams}, dtype=np.int64)
+
+
+class NextActionModel:
+    """Multinomial logistic regression over hashed n-grams; small enough to train at first use in a fraction of a second"""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray):
+        self.weights = weights
+        self.bias = bias
+
+    @classmethod
+    def train(cls, examples: List[Tuple[str, str]], epochs: int = 300, lr: float = 5.0, l2: float = 1e-3) -> "NextActionModel":
+        features = [_features(text) for text, _ in examples]
+        # Gradient descent over the hashed columns that occur, not all FEATURE_DIM of them
+        columns = np.unique(np.concatenate(features))
+        x = np.zeros((len(examples), len(columns)), dtype=np.float32)
+        y = np.zeros((len(examples), len(LABELS)), dtype=np.float32)
+        for i, (idx, (_, label)) in enumerate(zip(features, examples)):
+            x[i, np.searchsorted(columns, idx)] = 1.0 / np.sqrt(max(len(idx), 1))
+            y[i, LABELS.index(label)] = 1.0
+        weights = np.zeros((len(columns), len(LABELS)), dtype=np.float32)
+        bias = np.zeros(len(LABELS), dtype=np.float32)
+        for _ in range(epochs):
+            probs = _softmax(x @ weights + bias)
+            grad = probs - y
+            weights -= lr * (x.T @ grad / len(examples) + l2 * weights)
+            bias -= lr * grad.mean(axis=0)
+        full = np.zeros((FEATURE_DIM, len(LABELS)), dtype=np.float32)
+        full[columns] = weights
+        return cls(full, bias)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        idx = _features(text)
+        scores = self.weights[idx].sum(axis=0) / np.sqrt(max(len(idx), 1)) + self.bias
+        probs = _softmax(scores)
+        best = int(probs.argmax())
+        return LABELS[best], float(probs[best])
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=-1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+_model = None
+_model_lock = threading.Lock()
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {"calls": 0, "cache": 0, "rules": 0, "model": 0, "llm": 0, "default": 0, "seconds": 0.0}
+_stats_lock = threading.Lock()
+
+
+def get_model() -> NextActionModel:
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = NextActionModel.train(seed_examples())
+        return _model
+
+
+def _rule_label(text: str) -> Optional[str]:
+    lowered = text.lower()
+    for label, pattern in RULES:
+        if pattern.search(lowered):
+            return label
+    return None
+
+
+def _llm_label(text: str, tool: Optional[str]) -> str:
+    prompt = (f"Given the following email, what is the next action for the sales rep? ({', '.join(LABELS)}, etc.)\n"
+              f"Email:\n{text}\nAction:(return only the action label)")
+    answer = complete(prompt, "small", max_tokens=10, temperature=0, system="You are a helpful assistant.", tool=tool)
+    tokens = re.findall(r"[a-z_]+", answer.lower().split("\n")[0])
+    return tokens[0] if tokens else LABELS[-1]
+
+
+def classify_next_action(text: str, tool: Optional[str] = None) -> Dict:
+    """
+    The sales rep's next action after sending an email (one of LABELS, or another label if the LLM says so):
+    keyword/regex rules first, then the linear model, and the small LLM tier only if the model's confidence is below
+    NEXT_ACTION_MIN_CONFIDENCE. Without an API key, or if that call fails, an unsure model gives DEFAULT_LABEL.
+    Returns {"label", "source" (cache/rules/model/llm/default), "confidence"}; results other than defaults are cached
+    by message hash.
+    """
+    start = time.perf_counter()
+    key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    with _cache_lock:
+        result = _cache.get(key)
+        if result is not None:
+            _cache.move_to_end(key)
+    if result is not None:
+        result = {**result, "source": "cache"}
+    else:
+        label = _rule_label(text)
+        if label:
+            result = {"label": label, "source": "rules", "confidence": 1.0}
+        else:
+            label, confidence = get_model().predict(text)
+            result = {"label": label, "source": "model", "confidence": confidence}
+            if confidence < NEXT_ACTION_MIN_CONFIDENCE:
+                # An unsure guess must not book a meeting, and failing the send path is worse than no action
+                result = {"label": DEFAULT_LABEL, "source": "default", "confidence": confidence}
+                if available():
+                    try:
+                        result = {"label": _llm_label(text, tool), "source": "llm", "confidence": None}
+                    except Exception:
+                        pass
+        if result["source"] != "default":
+            with _cache_lock:
+                _cache[key] = result
+                while len(_cache) > NEXT_ACTION_CACHE_SIZE:
+                    _cache.popitem(last=False)
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats[result["source"]] += 1
+        _stats["seconds"] += time.perf_counter() - start
+    return result
+
+
+def get_next_action_stats() -> Dict:
+    """Classifications by source, their mean latency and the share that fell back to the LLM since the process started"""
+    with _stats_lock:
+        stats = dict(_stats)
+    calls = max(stats["calls"], 1)
+    stats["mean_ms"] = stats["seconds"] / calls * 1000
+    stats["llm_fallback_rate"] = stats["llm"] / calls
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classify the next action for an email body")
+    parser.add_argument("path", help="Text file with the email body")
+    args = parser.parse_args()
+    with open(args.path) as f:
+        print(classify_next_action(f.read()))
+    print(get_next_action_stats())
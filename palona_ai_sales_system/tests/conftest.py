@@ -0,0 +1,27 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.synthetic_crm import generate_crm
+
+
+@pytest.fixture
+def crm_file(tmp_path):
+    """A small synthetic crm_data.json in a temporary directory, with message logs still embedded in the leads"""
+    path = tmp_path / "crm_data.json"
+    generate_crm(path, leads=60, deals=30, message_ratio=0.5, embed_messages=True, seed=7)
+    return path
+
+
+@pytest.fixture
+def write_crm(tmp_path):
+    """Write a CRM file from lists of leads and deals and return its path"""
+    def write(leads, deals=(), name="crm_data.json"):
+        path = tmp_path / name
+        with open(path, 'w') as f:
+            json.dump({"crm_leads": list(leads), "deals": list(deals)}, f, indent=4)
+        return path
+    return write
@@ -0,0 +1,131 @@
+import random
+
+import numpy as np
+import pytest
+
+from benchmarks.bench_similar_deals import loop_similar_deals
+from benchmarks.synthetic_crm import _deal
+from crm.deals import DealMatrix, IndustryIndex, deal_key, similar_deals
+from crm.repository import CRMRepository
+
+QUERIES = [
+    ("Fashion & Retail", {"deal_size": 250000}),
+    ("Beauty", {}),
+    ("Food & Restaurant", {"deal_size": 80000}),
+    ("Grocery", {"deal_size": 500000}),
+    ("retail", {"deal_size": 1000000}),
+    ("Health and Wellness", {}),
+    ("Retailer", {"deal_size": 30000}),
+    ("Hospitality & Travel", {"deal_size": 120000}),
+    ("Aerospace", {}),
+]
+
+
+@pytest.fixture
+def deals():
+    """Synthetic deals plus the awkward ones: no deal_size, an int id and deals tied on score"""
+    rng = random.Random(3)
+    deals = [_deal(rng, i) for i in range(400)]
+    deals[10].pop("deal_size")
+    deals[11]["id"] = 11
+    deals += [dict(deals[20], id=f"TIE-{i}", status="successful") for i in range(8)]
+    return deals
+
+
+@pytest.mark.parametrize("industry, criteria", QUERIES)
+@pytest.mark.parametrize("k", [1, 5, 20])
+def test_full_scan_matches_the_loop(deals, industry, criteria, k):
+    matrix = DealMatrix(deals)
+    assert matrix.top_k(matrix.scores(industry, criteria), k) == loop_similar_deals(deals, industry, criteria, k)
+
+
+def test_top_k_keeps_tied_deals_in_crm_order(deals):
+    matrix = DealMatrix(deals)
+    industry = deals[20]["industry"]
+    matches = matrix.top_k(matrix.scores(industry, {"deal_size": deals[20]["deal_size"]}), k=50)
+    tied = [m["deal_id"] for m in matches if m["similarity_score"] == 1.2]
+    assert tied == [deal["id"] for deal in deals if deal["status"] == "successful" and deal["industry"] == industry
+                    and deal["deal_size"] == deals[20]["deal_size"]]
+    assert len(tied) >= 9
+
+
+@pytest.mark.parametrize("industry, criteria", QUERIES)
+@pytest.mark.parametrize("k", [1, 5, 20])
+def test_indexed_search_matches_the_loop(deals, industry, criteria, k):
+    matrix = DealMatrix(deals)
+    assert matrix.search(industry, criteria, k) == loop_similar_deals(deals, industry, criteria, k)
+
+
+def test_substring_matches_are_found():
+    deals = [{"id": "T-1", "industry": "Technology", "status": "successful", "deal_size": 100000},
+             {"id": "T-2", "industry": "Consumer Tech & Retail", "status": "successful", "deal_size": 100000},
+             {"id": "F-1", "industry": "Fashion", "status": "successful", "deal_size": 100000}]
+    matrix = DealMatrix(deals)
+    assert [(m["deal_id"], m["similarity_score"]) for m in matrix.search("Tech", {})] == [("T-1", 1.0), ("T-2", 1.0)]
+    assert [m["deal_id"] for m in matrix.search("Tech Startups", {})] == ["T-1", "T-2"]
+    assert matrix.search("Tech", {}) == loop_similar_deals(deals, "Tech", {})
+
+
+def test_deal_size_fills_the_top_k_when_few_industries_match(deals):
+    matrix = DealMatrix(deals)
+    matches = matrix.search("Aerospace", {"deal_size": 250000}, 5)
+    assert len(matches) == 5
+    assert all(match["similarity_score"] <= 0.2 for match in matches)
+    assert matches == loop_similar_deals(deals, "Aerospace", {"deal_size": 250000}, 5)
+    assert matrix.search("Aerospace", {}, 5) == []
+
+
+def test_candidates_are_the_successful_deals_of_matching_industries(deals):
+    matrix = DealMatrix(deals)
+    for industry in ["Fashion & Retail", "beauty", "Food and Drink", "Tech", "Nothing Matches", ""]:
+        per_industry = matrix.industry_scores(industry)
+        expected = [i for i, deal in enumerate(deals)
+                    if deal["status"] == "successful" and per_industry[matrix.industries.index(deal["industry"])] > 0]
+        assert sorted(matrix.index.candidates(np.flatnonzero(per_industry).tolist()).tolist()) == expected
+
+
+def test_industry_index_add_and_discard():
+    index = IndustryIndex()
+    index.add(4, 0)
+    index.add(2, 0)
+    index.add(3, 1)
+    assert sorted(index.candidates([0, 1]).tolist()) == [2, 3, 4]
+    index.discard(4, 0)
+    index.discard(9, 1)
+    assert index.candidates([0]).tolist() == [2]
+    assert index.candidates([7]).tolist() == []
+
+
+def test_search_many_matches_search(deals):
+    matrix = DealMatrix(deals)
+    queries = QUERIES + [QUERIES[0], ("Beauty", {"deal_size": 250000}), ("", {}), ("Aerospace", {"deal_size": 90000})]
+    assert matrix.search_many(queries, 5) == [matrix.search(industry, criteria, 5) for industry, criteria in queries]
+
+
+def test_in_place_updates_match_a_rebuilt_matrix(deals):
+    matrix = DealMatrix(deals)
+    changed = [dict(deal) for deal in deals]
+    changed[5] = dict(changed[5], status="lost" if changed[5]["status"] == "successful" else "successful")
+    changed[6] = dict(changed[6], industry="Personal Care & Beauty")
+    changed[7] = dict(changed[7], deal_size=changed[7]["deal_size"] + 5000)
+    del changed[30:40]
+    changed += [dict(deal, id=f"NEW-{i}", status="successful") for i, deal in enumerate(deals[100:110])]
+    changed.append({"industry": "Beauty", "status": "successful", "deal_size": 250000})
+    matrix.sync(changed)
+    rebuilt = DealMatrix(changed)
+    for industry, criteria in QUERIES + [("Personal Care", {"deal_size": 250000})]:
+        assert matrix.search(industry, criteria, 10) == rebuilt.search(industry, criteria, 10)
+    matrix.remove(deal_key(changed[6], 6))
+    assert all(match["deal_id"] != changed[6]["id"] for match in matrix.search("Personal Care", {}, 50))
+
+
+def test_similar_deals_follow_the_repository(write_crm, deals):
+    path = write_crm([], deals)
+    repo = CRMRepository(path)
+    assert similar_deals(repo, "Beauty", {"deal_size": 250000}) == DealMatrix(deals).search("Beauty", {"deal_size": 250000})
+    more = deals + [{"id": "BEST", "industry": "Beauty", "status": "successful", "deal_size": 250000}]
+    write_crm([], more)
+    matches = similar_deals(repo, "Beauty", {"deal_size": 250000}, k=50)
+    assert matches == DealMatrix(more).search("Beauty", {"deal_size": 250000}, 50)
+    assert "BEST" in [match["deal_id"] for match in matches]
+
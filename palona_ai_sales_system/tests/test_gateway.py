@@ -0,0 +1,103 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+import pytest
+import requests
+
+import llm.gateway
+from web.aio import close_session
+
+
+class Handler(BaseHTTPRequestHandler):
+    """/slow answers after a second, /busy with a 503 before answering; every POST is counted per path"""
+    posts = {}
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        count = self.posts[self.path] = self.posts.get(self.path, 0) + 1
+        if self.path == "/slow":
+            time.sleep(1)
+        status = 503 if self.path == "/busy" and count == 1 else 200
+        body = json.dumps({"usage": {"input_tokens": 3, "output_tokens": 1}}).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """A local provider, reached through a fresh gateway session that also pools plain http"""
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    monkeypatch.setattr(llm.gateway, "LLM_TIMEOUT", (1.0, 0.3))
+    monkeypatch.setattr(llm.gateway, "_session", None)
+    session = llm.gateway._get_session()
+    session.mount("http://", session.get_adapter("https://"))
+    handler = type("TestHandler", (Handler,), {"posts": {}})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield handler, f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_read_timeouts_are_not_resent(server):
+    handler, url = server
+    with pytest.raises(requests.ConnectionError):
+        llm.gateway._post("test", "model", f"{url}/slow", {}, {"prompt": "x"})
+    time.sleep(1)
+    assert handler.posts == {"/slow": 1}
+
+
+def test_overloaded_responses_are_retried(server):
+    handler, url = server
+    assert llm.gateway._post("test", "model", f"{url}/busy", {}, {"prompt": "x"})["usage"]["output_tokens"] == 1
+    assert handler.posts == {"/busy": 2}
+
+
+def test_async_read_timeouts_are_not_resent(server):
+    handler, url = server
+
+    async def post():
+        try:
+            return await llm.gateway._apost("test", "model", f"{url}/slow", {}, {"prompt": "x"})
+        finally:
+            await close_session()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(post())
+    time.sleep(1)
+    assert handler.posts == {"/slow": 1}
+
+
+def test_async_connection_failures_are_retried(monkeypatch):
+    monkeypatch.setattr(llm.gateway, "LLM_MAX_RETRIES", 1)
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(llm.gateway.asyncio, "sleep", sleep)
+
+    async def post():
+        try:
+            # Nothing listens on port 9 (discard) here
+            return await llm.gateway._apost("test", "model", "http://127.0.0.1:9/", {}, {"prompt": "x"})
+        finally:
+            await close_session()
+
+    with pytest.raises(aiohttp.ClientConnectorError):
+        asyncio.run(post())
+    assert sleeps == [1]
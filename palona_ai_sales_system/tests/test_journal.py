@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+import crm.repository
+from crm.repository import CRMRepository
+from crm.streaming import StreamingCRMRepository
+
+
+def read_leads(path):
+    with open(path) as f:
+        return {lead["record_id"]: lead for lead in json.load(f)["crm_leads"]}
+
+
+def test_no_journal_file(crm_file):
+    repo = CRMRepository(crm_file)
+    snapshot = crm_file.read_bytes()
+    assert repo.count_leads() == 60
+    assert repo.get_lead("1") == read_leads(crm_file)["1"]
+    assert not repo.compact()
+    assert not StreamingCRMRepository(crm_file).compact()
+    assert not repo.journal_file.exists()
+    assert crm_file.read_bytes() == snapshot
+
+
+def test_updates_go_to_the_journal_and_are_replayed(crm_file):
+    snapshot = crm_file.read_bytes()
+    writer, reader = CRMRepository(crm_file), CRMRepository(crm_file)
+    assert reader.get_lead("3")["status"] != "Closed Won"
+    writer.update_lead("3", {"status": "Closed Won"})
+    writer.update_lead("3", {"notes": "Signed"})
+    assert crm_file.read_bytes() == snapshot
+    assert [json.loads(line)["seq"] for line in writer.journal_file.read_text().splitlines()] == [1, 2]
+    for repo in (reader, CRMRepository(crm_file), StreamingCRMRepository(crm_file)):
+        lead = repo.get_lead("3")
+        assert (lead["status"], lead["notes"], lead["version"]) == ("Closed Won", "Signed", 2)
+
+
+def test_a_torn_final_record_is_applied_once_complete(crm_file):
+    repo = CRMRepository(crm_file)
+    repo.update_lead("1", {"status": "Qualified"})
+    record = json.dumps({"seq": 2, "record_id": "1", "fields": {"status": "Contacted", "version": 2}}) + "\n"
+    with open(repo.journal_file, 'a') as f:
+        f.write(record[:20])
+    reader = CRMRepository(crm_file)
+    assert reader.get_lead("1")["status"] == "Qualified"
+    with open(repo.journal_file, 'a') as f:
+        f.write(record[20:])
+    assert reader.get_lead("1")["status"] == "Contacted"
+    assert StreamingCRMRepository(crm_file).get_lead("1")["status"] == "Contacted"
+
+
+@pytest.mark.parametrize("compactor", [CRMRepository, StreamingCRMRepository])
+def test_compaction_folds_the_journal_into_the_snapshot(crm_file, compactor):
+    writer = CRMRepository(crm_file)
+    for i in range(1, 11):
+        writer.update_lead(str(i), {"lead_score": i, "status": f"Stage {i}"})
+    expected = {lead["record_id"]: lead for lead in writer.iter_leads()}
+    assert compactor(crm_file).compact()
+    assert writer.journal_file.read_bytes() == b""
+    assert read_leads(crm_file) == expected
+    with open(crm_file) as f:
+        assert json.load(f)["journal_seq"] == 10
+    # Instances that read the old snapshot catch up, and new updates continue the sequence
+    assert {lead["record_id"]: lead for lead in writer.iter_leads()} == expected
+    writer.update_lead("1", {"status": "After"})
+    assert json.loads(writer.journal_file.read_text())["seq"] == 11
+    assert CRMRepository(crm_file).get_lead("1")["status"] == "After"
+    assert compactor(crm_file).compact()
+    assert not compactor(crm_file).compact()
+
+
+def test_records_already_in_the_snapshot_are_skipped(crm_file):
+    repo = CRMRepository(crm_file)
+    repo.update_lead("2", {"status": "Folded"})
+    journal = repo.journal_file.read_bytes()
+    repo.compact()
+    # A crash between replacing the snapshot and truncating the journal leaves folded records behind
+    repo.journal_file.write_bytes(journal.replace(b"Folded", b"Stale!"))
+    for reader in (CRMRepository(crm_file), StreamingCRMRepository(crm_file)):
+        assert reader.get_lead("2")["status"] == "Folded"
+
+
+def test_large_journal_is_compacted_in_the_background(crm_file, monkeypatch):
+    monkeypatch.setattr(crm.repository, "JOURNAL_COMPACT_BYTES", 1024)
+    repo = CRMRepository(crm_file)
+    for i in range(20):
+        repo.update_lead("5", {"notes": "x" * 100, "interaction_count": i})
+    repo.wait_for_compaction(10)
+    with open(crm_file) as f:
+        assert json.load(f)["journal_seq"] > 0
+    assert repo.get_lead("5")["interaction_count"] == 19
+    assert CRMRepository(crm_file).get_lead("5")["interaction_count"] == 19
+
@@ -0,0 +1,158 @@
+import contextvars
+import sqlite3
+
+import pytest
+
+import llm.cache
+import llm.gateway
+from llm.cache import LLMCache, bypass_cache, cache_enabled, cache_key
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm.cache.time, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = LLMCache(tmp_path / "llm_cache.sqlite3", ttl=60, max_bytes=10_000)
+    cache.put("a", "answer")
+    clock.now += 59
+    assert cache.get("a") == "answer"
+    clock.now += 2
+    assert cache.get("a") is None
+    # Expired entries are dropped by the next store
+    cache.put("b", "other")
+    assert cache.info()["entries"] == 1
+    assert cache.stats == {"hits": 1, "misses": 1, "stores": 2, "evictions": 1}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = LLMCache(tmp_path / "llm_cache.sqlite3", ttl=3600, max_bytes=30)
+    for key in "abc":
+        clock.now += 1
+        cache.put(key, key * 10)
+    clock.now += 1
+    assert cache.get("a") == "a" * 10
+    clock.now += 1
+    cache.put("d", "d" * 10)
+    # "b" is the least recently used once "a" was read
+    assert [cache.get(key) is not None for key in "abcd"] == [True, False, True, True]
+    assert cache.info()["bytes"] == 30
+    assert cache.stats["evictions"] == 1
+
+
+def totals(cache):
+    """The running total and the actual sum of the entries' sizes"""
+    conn = cache._conn()
+    return conn.execute("SELECT bytes FROM totals").fetchone()[0], cache.info()["bytes"]
+
+
+def test_running_total_follows_every_change(tmp_path, clock):
+    cache = LLMCache(tmp_path / "llm_cache.sqlite3", ttl=60, max_bytes=25)
+    cache.put("a", "x" * 10)
+    cache.put("a", "y" * 20)
+    assert totals(cache) == (20, 20)
+    clock.now += 1
+    cache.put("b", "z" * 5)
+    assert totals(cache) == (25, 25)
+    clock.now += 1
+    cache.put("c", "w" * 10)
+    assert cache.get("a") is None
+    assert totals(cache) == (15, 15)
+    clock.now += 61
+    cache.put("d", "v")
+    assert totals(cache) == (1, 1)
+    cache.clear()
+    assert totals(cache) == (0, 0)
+
+
+def test_a_cache_from_before_the_running_total_is_counted(tmp_path):
+    path = tmp_path / "llm_cache.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                 "created REAL NOT NULL, accessed REAL NOT NULL)")
+    conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?)", [("a", "aaa", 3, 1e12, 1), ("b", "bb", 2, 1e12, 2)])
+    conn.commit()
+    conn.close()
+    cache = LLMCache(path, max_bytes=4)
+    assert totals(cache) == (5, 5)
+    cache.put("c", "c")
+    assert [cache.get(key) for key in "abc"] == [None, "bb", "c"]
+    assert totals(cache) == (3, 3)
+
+
+def test_the_cache_is_shared_between_instances(tmp_path):
+    path = tmp_path / "llm_cache.sqlite3"
+    LLMCache(path).put("key", "värde")
+    assert LLMCache(path).get("key") == "värde"
+    LLMCache(path).clear()
+    assert LLMCache(path).get("key") is None
+
+
+def test_cache_key_covers_everything_that_changes_the_answer():
+    base = ("claude", "model", 0.2, 1000, None, "prompt")
+    keys = {cache_key(*base)}
+    for i, changed in enumerate(["openai", "other", 0.3, 500, "system", "prompt!"]):
+        keys.add(cache_key(*base[:i], changed, *base[i + 1:]))
+    assert len(keys) == 7
+    assert cache_key(*base) == cache_key(*base)
+
+
+def test_cached_tools(monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_TOOLS", raising=False)
+    assert cache_enabled("CompanyResearchTool")
+    assert not cache_enabled("MessageDraftingTool")
+    assert not cache_enabled(None)
+    monkeypatch.setenv("LLM_CACHE_TOOLS", "MessageDraftingTool, ")
+    assert cache_enabled("MessageDraftingTool")
+    assert not cache_enabled("CompanyResearchTool")
+    monkeypatch.setenv("LLM_CACHE_TOOLS", "")
+    assert not cache_enabled("CompanyResearchTool")
+
+
+@pytest.fixture
+def gateway(tmp_path, monkeypatch):
+    """complete() against a temporary cache, with the provider call replaced by a counter"""
+    monkeypatch.setenv("CLAUDE_API_KEY", "test")
+    monkeypatch.delenv("LLM_CACHE_TOOLS", raising=False)
+    monkeypatch.setattr(llm.cache, "_cache", LLMCache(tmp_path / "llm_cache.sqlite3"))
+    calls = []
+
+    def provider_call(name, model, prompt, max_tokens, temperature, system):
+        calls.append(prompt)
+        return f"answer {len(calls)}"
+
+    monkeypatch.setattr(llm.gateway, "_complete", provider_call)
+    return calls
+
+
+def test_complete_serves_cached_tools_from_the_cache(gateway):
+    assert llm.gateway.complete("Research Acme", tool="CompanyResearchTool") == "answer 1"
+    assert llm.gateway.complete("Research Acme", tool="CompanyResearchTool") == "answer 1"
+    assert llm.gateway.complete("Research Acme", tool="CompanyResearchTool", max_tokens=10) == "answer 2"
+    # Tools outside LLM_CACHE_TOOLS always get a fresh completion
+    assert llm.gateway.complete("Draft", tool="MessageDraftingTool") == "answer 3"
+    assert llm.gateway.complete("Draft", tool="MessageDraftingTool") == "answer 4"
+    assert len(gateway) == 4
+
+
+def test_bypass_skips_lookups_but_stores(gateway):
+    def bypassed_run():
+        bypass_cache()
+        return llm.gateway.complete("Summarize", tool="CommunicationSummaryTool")
+
+    assert llm.gateway.complete("Summarize", tool="CommunicationSummaryTool") == "answer 1"
+    assert contextvars.copy_context().run(bypassed_run) == "answer 2"
+    # The bypass stays in its own context, and the fresh answer replaced the cached one
+    assert llm.gateway.complete("Summarize", tool="CommunicationSummaryTool") == "answer 2"
+    assert len(gateway) == 2
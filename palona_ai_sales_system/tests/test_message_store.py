@@ -0,0 +1,145 @@
+import json
+import sqlite3
+
+import pytest
+
+import crm.message_store
+from crm.message_store import MessageStore
+from crm.repository import CRMRepository
+from crm.sqlite_store import import_json
+from crm.streaming import StreamingCRMRepository
+
+
+def messages(start: int, count: int):
+    return [{"message": f"message {i} " + "x" * (i % 7) * 10, "timestamp": f"2025-01-{i + 1:02d}"}
+            for i in range(start, start + count)]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A lead whose history is split into an archive (messages 0-5) and a live segment (messages 6-9)"""
+    # Small blocks so tail() has to stitch records cut across block boundaries
+    monkeypatch.setattr(crm.message_store, "TAIL_BLOCK_SIZE", 64)
+    store = MessageStore(tmp_path / "crm_data_messages")
+    store.write_archive("lead/1", messages(0, 6))
+    store.append("lead/1", messages(6, 2))
+    store.append("lead/1", messages(8, 2))
+    return store
+
+
+@pytest.mark.parametrize("n", range(0, 13))
+def test_tail_across_the_archive_boundary(store, n):
+    everything = messages(0, 10)
+    assert store.tail("lead/1", n) == (everything[-n:] if n else [])
+    assert store.tail("lead/1", n, include_archive=False) == (messages(6, 4)[-n:] if n else [])
+
+
+@pytest.mark.parametrize("start, end", [
+    (None, None), ("2025-01-03", None), (None, "2025-01-07"), ("2025-01-05", "2025-01-08"), ("2025-01-07", "2025-01-07"),
+    ("2025-02-01", None),
+])
+def test_between_across_the_archive_boundary(store, start, end):
+    expected = [m for m in messages(0, 10) if (start is None or m["timestamp"] >= start) and (end is None or m["timestamp"] <= end)]
+    assert store.between("lead/1", start, end) == expected
+    assert list(store.iter_messages("lead/1")) == messages(0, 10)
+
+
+def test_unknown_lead_has_no_messages(store):
+    assert store.tail("other", 5) == []
+    assert store.between("other") == []
+
+
+def embedded_logs(path):
+    with open(path) as f:
+        return {lead["record_id"]: lead.get("message_log") for lead in json.load(f)["crm_leads"]}
+
+
+def test_reads_never_write(crm_file):
+    snapshot = crm_file.read_bytes()
+    repo = CRMRepository(crm_file)
+    for lead in list(repo.iter_leads()):
+        repo.get_messages(lead["record_id"], limit=2)
+    repo.query_leads(sort="lead_score")
+    repo.wait_for_compaction()
+    assert crm_file.read_bytes() == snapshot
+    assert sorted(path.name for path in crm_file.parent.iterdir()) == ["crm_data.json"]
+
+
+def test_unmigrated_logs_are_read_from_the_snapshot(crm_file):
+    repo = CRMRepository(crm_file)
+    for record_id, log in embedded_logs(crm_file).items():
+        assert repo.get_messages(record_id) == log
+        assert repo.get_messages(record_id, limit=2) == log[-2:]
+        assert repo.get_messages(record_id, start="2024-06-01") == [m for m in log if m["timestamp"] >= "2024-06-01"]
+
+
+@pytest.mark.parametrize("repository", [CRMRepository, StreamingCRMRepository])
+def test_new_messages_follow_the_embedded_log(crm_file, repository):
+    repo = repository(crm_file)
+    record_id, log = next((record_id, log) for record_id, log in embedded_logs(crm_file).items() if len(log) >= 3)
+    new = [{"message": "Following up", "timestamp": "2026-01-05"}, {"message": "Again", "timestamp": "2026-01-12"}]
+    for message in new:
+        repo.update_lead(record_id, {"last_contact_date": message["timestamp"]}, message)
+    assert repo.get_messages(record_id) == log + new
+    assert repo.get_messages(record_id, limit=3) == (log + new)[-3:]
+    assert repo.get_messages(record_id, start="2026-01-10") == new[1:]
+    # Compaction keeps the embedded log as it was; new messages stay in the store
+    repo.compact()
+    assert embedded_logs(crm_file)[record_id] == log
+    assert CRMRepository(crm_file).get_messages(record_id) == log + new
+
+
+@pytest.mark.parametrize("repository", [CRMRepository, StreamingCRMRepository])
+def test_migrate_messages(crm_file, repository):
+    logs = embedded_logs(crm_file)
+    repo = repository(crm_file)
+    repo.update_lead("1", {"status": "Qualified"}, {"message": "New", "timestamp": "2026-02-01"})
+    expected = {record_id: log + ([{"message": "New", "timestamp": "2026-02-01"}] if record_id == "1" else [])
+                for record_id, log in logs.items()}
+    assert repo.migrate_messages() == len(logs)
+    assert set(embedded_logs(crm_file).values()) == {None}
+    assert repo.journal_file.read_bytes() == b""
+    for reader in (repo, CRMRepository(crm_file), StreamingCRMRepository(crm_file)):
+        assert {record_id: reader.get_messages(record_id) for record_id in logs} == expected
+        assert reader.get_lead("1")["status"] == "Qualified"
+    assert repo.migrate_messages() == 0
+
+
+def test_interrupted_migration_is_ignored_until_it_completes(crm_file):
+    repo = CRMRepository(crm_file)
+    record_id, log = next((record_id, log) for record_id, log in embedded_logs(crm_file).items() if log)
+    # The archive was written but the snapshot still embeds the log
+    repo.messages.write_archive(record_id, log[:1])
+    assert repo.get_messages(record_id) == log
+    assert repo.get_messages(record_id, limit=1) == log[-1:]
+    repo.migrate_messages()
+    assert CRMRepository(crm_file).get_messages(record_id) == log
+
+
+def test_journal_records_with_messages_are_kept(crm_file):
+    # Journals written before the message store carried the message in the record
+    repo = CRMRepository(crm_file)
+    log = embedded_logs(crm_file)["2"]
+    old = {"message": "Journaled", "timestamp": "2025-12-01"}
+    with open(repo.journal_file, 'w') as f:
+        f.write(json.dumps({"seq": 1, "record_id": "2", "fields": {"version": 1}, "message": old}) + "\n")
+    assert repo.get_messages("2") == log + [old]
+    repo.compact()
+    assert embedded_logs(crm_file)["2"] == log + [old]
+    repo.migrate_messages()
+    assert CRMRepository(crm_file).get_messages("2") == log + [old]
+
+
+def test_sqlite_import_reads_the_source_without_changing_it(crm_file):
+    repo = CRMRepository(crm_file)
+    repo.update_lead("3", {"status": "Qualified"}, {"message": "Stored", "timestamp": "2026-03-01"})
+    snapshot, journal = crm_file.read_bytes(), repo.journal_file.read_bytes()
+    db_path = crm_file.with_name("crm.sqlite3")
+    counts = import_json(crm_file, db_path)
+    assert (crm_file.read_bytes(), repo.journal_file.read_bytes()) == (snapshot, journal)
+    assert counts["messages"] == sum(len(log) for log in embedded_logs(crm_file).values()) + 1
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT data FROM message_log WHERE record_id = '3' ORDER BY id").fetchall()
+    assert [json.loads(row[0]) for row in rows] == repo.get_messages("3")
+    assert json.loads(conn.execute("SELECT data FROM leads WHERE record_id = '3'").fetchone()[0])["status"] == "Qualified"
+    conn.close()
@@ -0,0 +1,127 @@
+from collections import OrderedDict
+
+import pytest
+
+import llm.next_action
+from llm.next_action import classify_next_action, get_model, seed_examples
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    """An empty classification cache, and no API key, so the LLM fallback is off unless a test turns it on"""
+    monkeypatch.setattr(llm.next_action, "_cache", OrderedDict())
+    monkeypatch.delenv("CLAUDE_API_KEY", raising=False)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+
+def email(action: str) -> str:
+    return f"Hi Dana,\n\nOur agents keep every conversation on-brand.\n\n{action}\n\nBest,\nAlex"
+
+
+@pytest.mark.parametrize("action, label", [
+    ("Would you be open to a 20-minute call next week?", "schedule_meeting"),
+    ("Can we schedule a quick demo on Thursday?", "schedule_meeting"),
+    ("Here is my Calendly link.", "schedule_meeting"),
+    ("Does Tuesday at 3pm work for you?", "schedule_meeting"),
+    ("Are you available Thursday afternoon for a quick demo?", "schedule_meeting"),
+    ("Let's find some time to walk through a pilot.", "schedule_meeting"),
+    ("Just following up on my last note.", "follow_up"),
+    ("Circling back on the proposal.", "follow_up"),
+    ("I haven't heard back yet.", "follow_up"),
+    # A call to action for a meeting wins over following up
+    ("Following up: are you free for a call this week?", "schedule_meeting"),
+])
+def test_rules(action, label):
+    assert classify_next_action(email(action)) == {"label": label, "source": "rules", "confidence": 1.0}
+
+
+@pytest.mark.parametrize("sentence", [
+    "Our platform helped Sephora find time savings of 30% across support.",
+    "Brands book more repeat sales when their chat agents remember past orders.",
+    "We can set up your agents in under a week, with no meeting overhead.",
+    "Would you like to see how our chat agents cut support calls by 30%?",
+    "Can you imagine a call center that never sleeps?",
+    "Our agents are available for chat 24/7.",
+])
+def test_pitch_sentences_are_not_meeting_requests(sentence):
+    # Left to the model (and the LLM below its confidence threshold) instead of booking a meeting outright
+    assert llm.next_action._rule_label(email(sentence)) is None
+    assert classify_next_action(email(sentence))["source"] != "rules"
+
+
+def test_model_labels_the_seed_corpus():
+    model = get_model()
+    examples = seed_examples(n_per_label=20, seed=1)
+    correct = sum(model.predict(text)[0] == label for text, label in examples)
+    assert correct / len(examples) >= 0.95
+
+
+@pytest.mark.parametrize("action, label", [
+    ("Please find the pricing sheet attached.", "send_email"),
+    ("I've included the security documentation below.", "send_email"),
+])
+def test_emails_without_a_rule_go_to_the_model(action, label):
+    result = classify_next_action(email(action))
+    assert (result["label"], result["source"]) == (label, "model")
+    assert result["confidence"] >= llm.next_action.NEXT_ACTION_MIN_CONFIDENCE
+
+
+def test_results_are_cached_by_message():
+    text = email("Here's the deck I mentioned.")
+    first = classify_next_action(text)
+    assert classify_next_action(text) == {**first, "source": "cache"}
+    assert classify_next_action(text + " ")["source"] == "model"
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(llm.next_action, "NEXT_ACTION_CACHE_SIZE", 2)
+    texts = [email(f"Here's the deck I mentioned, version {i}.") for i in range(3)]
+    for text in texts:
+        classify_next_action(text)
+    assert classify_next_action(texts[0])["source"] != "cache"
+    assert classify_next_action(texts[2])["source"] == "cache"
+
+
+@pytest.mark.parametrize("text", [email("Attached is the pricing overview."), "Looking forward to hearing from you."])
+def test_low_confidence_sends_email_without_an_api_key(monkeypatch, text):
+    monkeypatch.setattr(llm.next_action, "NEXT_ACTION_MIN_CONFIDENCE", 1.01)
+    confidence = get_model().predict(text)[1]
+    assert classify_next_action(text) == {"label": "send_email", "source": "default", "confidence": confidence}
+
+
+def test_unsure_meeting_guess_sends_email_without_an_api_key():
+    text = "Looking forward to hearing from you."
+    label, confidence = get_model().predict(text)
+    assert (label, confidence < llm.next_action.NEXT_ACTION_MIN_CONFIDENCE) == ("schedule_meeting", True)
+    assert classify_next_action(text) == {"label": "send_email", "source": "default", "confidence": confidence}
+
+
+def test_low_confidence_asks_the_small_llm_tier(monkeypatch):
+    monkeypatch.setattr(llm.next_action, "NEXT_ACTION_MIN_CONFIDENCE", 1.01)
+    monkeypatch.setenv("CLAUDE_API_KEY", "test")
+    calls = []
+
+    def complete(prompt, model_tier, **options):
+        calls.append((model_tier, options["tool"]))
+        return "Follow_up\nbecause the prospect went quiet"
+
+    monkeypatch.setattr(llm.next_action, "complete", complete)
+    text = email("Attached is the pricing overview.")
+    assert classify_next_action(text, tool="MessageActionTool") == {"label": "follow_up", "source": "llm",
+                                                                    "confidence": None}
+    assert classify_next_action(text)["source"] == "cache"
+    assert calls == [("small", "MessageActionTool")]
+
+
+def test_llm_errors_fall_back_to_send_email_uncached(monkeypatch):
+    monkeypatch.setattr(llm.next_action, "NEXT_ACTION_MIN_CONFIDENCE", 1.01)
+    monkeypatch.setenv("CLAUDE_API_KEY", "test")
+
+    def complete(prompt, model_tier, **options):
+        raise ConnectionError("offline")
+
+    monkeypatch.setattr(llm.next_action, "complete", complete)
+    text = email("Attached is the pricing overview.")
+    result = classify_next_action(text)
+    assert (result["label"], result["source"]) == ("send_email", "default")
+    assert classify_next_action(text)["source"] == "default"
@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from benchmarks.bench_research_parsing import bing_page, bs4_bing, bs4_homepage, bs4_rss, google_news_feed, homepage
+from web.parsing import iter_bing_results, parse_bing_results, parse_homepage, parse_rss_items
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_same_data_as_the_beautifulsoup_parsers(seed):
+    rng = random.Random(seed)
+    bing, feed, page = bing_page(rng), google_news_feed(rng), homepage(rng)
+    assert parse_bing_results(bing, 5) == bs4_bing(bing)
+    assert parse_rss_items(feed, 10) == bs4_rss(feed)
+    assert parse_homepage(page) == bs4_homepage(page)
+
+
+def rss(*items: str) -> str:
+    return f"<?xml version='1.0' encoding='UTF-8'?><rss version='2.0'><channel><title>Feed</title>{''.join(items)}</channel></rss>"
+
+
+def item(i: int) -> str:
+    return (f"<item><title>Story {i} &amp; more</title><link>https://news.example/{i}?a=1&amp;b=2</link>"
+            f"<pubDate>Wed, 01 May 2024 10:00:00 GMT</pubDate><source url='https://wire.example'>Wire</source></item>")
+
+
+def test_rss_limit_and_entities():
+    feed = rss(*(item(i) for i in range(20)))
+    items = parse_rss_items(feed, 3)
+    assert [entry["title"] for entry in items] == ["Story 0 & more", "Story 1 & more", "Story 2 & more"]
+    assert items[0] == {"title": "Story 0 & more", "link": "https://news.example/0?a=1&b=2",
+                        "pubDate": "Wed, 01 May 2024 10:00:00 GMT", "source": "Wire"}
+    assert len(parse_rss_items(feed)) == 10
+
+
+def test_rss_missing_fields_and_empty_feeds():
+    assert parse_rss_items(rss("<item><title>Only a title</title></item>")) == [
+        {"title": "Only a title", "link": "", "pubDate": "", "source": ""}]
+    assert parse_rss_items(rss()) == []
+    assert parse_rss_items("") == []
+
+
+def test_malformed_feed_keeps_the_items_before_the_error():
+    feed = rss(item(0), item(1))[:-len("</channel></rss>")] + "<item><title>Cut off"
+    assert [entry["title"] for entry in parse_rss_items(feed)][:2] == ["Story 0 & more", "Story 1 & more"]
+    assert parse_rss_items("not a feed at all") == []
+
+
+def test_external_entities_are_not_resolved(tmp_path):
+    secret = tmp_path / "secret.txt"
+    secret.write_text("classified")
+    feed = (f"<?xml version='1.0'?><!DOCTYPE rss [<!ENTITY xxe SYSTEM '{secret.as_uri()}'>]>"
+            "<rss><channel><item><title>&xxe;</title></item></channel></rss>")
+    assert all("classified" not in entry["title"] for entry in parse_rss_items(feed))
+
+
+def bing_result(i: int, caption: bool = True) -> str:
+    snippet = f"<div class='b_caption extra'><p>Snippet <b>{i}</b></p></div>" if caption else ""
+    return f"<li class='b_algo'><h2><a href='https://acme{i}.com'>Acme <em>{i}</em></a></h2>{snippet}</li>"
+
+
+def test_bing_results_in_page_order():
+    page = ("<html><body><ul><li class='b_scopebar'><a href='/images'>Images</a></li></ul><ol id='b_results'>"
+            + bing_result(0) + bing_result(1, caption=False) + "".join(bing_result(i) for i in range(2, 9))
+            + "</ol></body></html>")
+    results = parse_bing_results(page, 5)
+    assert results[0] == {"title": "Acme0", "link": "https://acme0.com", "snippet": "Snippet0"}
+    # Results without a caption, and items that are not results, are skipped
+    assert [result["link"] for result in results] == [f"https://acme{i}.com" for i in (0, 2, 3, 4, 5)]
+    assert len(list(iter_bing_results(page))) == 8
+    assert parse_bing_results("") == []
+
+
+def test_homepage():
+    page = ("<html><head><title>Acme</title><title>Second</title><META NAME='Description' content='First'>"
+            "<meta name='description' content='Repeated'><meta property='og:title' content='Acme OG'>"
+            "<script>var about = 'company';</script></head><body>"
+            "<p>Welcome.</p><p>About <b>Acme</b>: we make things.</p><p>Our company history.</p>"
+            "<a href='https://www.linkedin.com/company/acme'>in</a><a href='https://twitter.com/acme'>x</a>"
+            "<a href='https://www.linkedin.com/company/acme-2'>in</a></body></html>")
+    assert parse_homepage(page) == {
+        "title": "Acme",
+        "meta": {"description": "First", "og:title": "Acme OG"},
+        "social_links": {"linkedin": "https://www.linkedin.com/company/acme-2", "twitter": "https://twitter.com/acme"},
+        "about": "AboutAcme: we make things.",
+    }
+    assert parse_homepage("") == {"title": None, "meta": {}, "social_links": {}, "about": None}
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from crm.repository import CRMRepository
+from crm.sqlite_store import SQLiteCRMRepository
+from crm.streaming import StreamingCRMRepository
+
+BACKENDS = {
+    "json": lambda path: CRMRepository(path),
+    "stream": lambda path: StreamingCRMRepository(path, chunk_size=256),
+    "sqlite": lambda path: SQLiteCRMRepository(path.with_name("crm.sqlite3"), path),
+}
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def open_repo(request):
+    return BACKENDS[request.param]
+
+
+def expected(path, filters=None, sort=None):
+    """query_leads as a scan of the raw file: filter, then a stable sort with missing values first"""
+    with open(path) as f:
+        leads = json.load(f)["crm_leads"]
+    leads = [lead for lead in leads if all(lead.get(key) == value for key, value in (filters or {}).items())]
+    if sort:
+        field = sort.lstrip("-")
+        present = [lead for lead in leads if lead.get(field) is not None]
+        missing = [lead for lead in leads if lead.get(field) is None]
+        if sort.startswith("-"):
+            leads = sorted(present, key=lambda lead: lead[field], reverse=True) + missing
+        else:
+            leads = missing + sorted(present, key=lambda lead: lead[field])
+    return [lead["record_id"] for lead in leads]
+
+
+def ids(leads):
+    return [lead["record_id"] for lead in leads]
+
+
+@pytest.mark.parametrize("filters, raw_filters", [
+    ({"sales_rep": "Sue"}, {"sales_rep": "Sue"}),
+    ({"status": "Qualified"}, {"status": "Qualified"}),
+    ({"segment": "SMB", "sales_rep": "Alex"}, {"customer_segment": "SMB", "sales_rep": "Alex"}),
+    ({"sales_rep": "Nobody"}, {"sales_rep": "Nobody"}),
+    ({"status": "", "segment": None}, {}),
+])
+def test_filters_match_a_scan(crm_file, open_repo, filters, raw_filters):
+    leads, total = open_repo(crm_file).query_leads(filters=filters)
+    assert ids(leads) == expected(crm_file, raw_filters)
+    assert total == len(leads)
+
+
+def test_unknown_filter_is_rejected(crm_file, open_repo):
+    with pytest.raises(ValueError):
+        open_repo(crm_file).query_leads(filters={"industry": "Grocery"})
+
+
+@pytest.mark.parametrize("sort", ["lead_score", "-lead_score", "company_name", "-last_contact_date", "deal_size"])
+def test_sort_is_stable_and_matches_a_scan(crm_file, open_repo, sort):
+    leads, _ = open_repo(crm_file).query_leads(sort=sort)
+    assert ids(leads) == expected(crm_file, sort=sort)
+
+
+@pytest.mark.parametrize("limit, offset", [(10, 0), (10, 25), (7, 55), (5, 100), (None, 42)])
+def test_pages_partition_the_sorted_matches(crm_file, open_repo, limit, offset):
+    repo = open_repo(crm_file)
+    leads, total = repo.query_leads(filters={"segment": "Enterprise"}, sort="-lead_score", limit=limit, offset=offset)
+    everything = expected(crm_file, {"customer_segment": "Enterprise"}, "-lead_score")
+    assert total == len(everything)
+    assert ids(leads) == (everything[offset:] if limit is None else everything[offset:offset + limit])
+
+
+def test_fields_project_each_lead(crm_file, open_repo):
+    leads, _ = open_repo(crm_file).query_leads(fields=["record_id", "company_name"], limit=3)
+    assert [set(lead) for lead in leads] == [{"record_id", "company_name"}] * 3
+
+
+def test_sort_on_mixed_value_types(write_crm, open_repo):
+    priorities = [3, "high", None, 1.5, "low", 2]
+    path = write_crm({"record_id": str(i), "priority": priority} for i, priority in enumerate(priorities))
+    repo = open_repo(path)
+    ascending, _ = repo.query_leads(sort="priority")
+    # Missing values first, then numbers, then strings
+    assert [lead.get("priority") for lead in ascending] == [None, 1.5, 2, 3, "high", "low"]
+    descending, _ = repo.query_leads(sort="-priority")
+    assert [lead.get("priority") for lead in descending] == ["low", "high", 3, 2, 1.5, None]
+
+
+def test_sort_on_values_that_are_not_comparable(write_crm):
+    values = [{"b": 1}, [2], True, None, "x", 4, {"a": 1}]
+    path = write_crm({"record_id": str(i), "extra": value} for i, value in enumerate(values))
+    for repo in (CRMRepository(path), StreamingCRMRepository(path)):
+        leads, total = repo.query_leads(sort="extra")
+        assert total == len(values)
+        assert [lead.get("extra") for lead in leads][:3] == [None, 4, "x"]
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from crm.repository import CRMRepository
+
+
+def scan(path, predicate):
+    """The linear scan over crm_leads the indexes replace: every match, in CRM order"""
+    with open(path) as f:
+        return [lead for lead in json.load(f)["crm_leads"] if predicate(lead)]
+
+
+def first(leads):
+    return leads[0]["record_id"] if leads else None
+
+
+def record_id(lead):
+    return lead["record_id"] if lead else None
+
+
+@pytest.fixture
+def crm_with_duplicates(crm_file):
+    """The synthetic CRM plus leads that repeat an earlier lead's name and company in a different case"""
+    with open(crm_file) as f:
+        crm_data = json.load(f)
+    leads = crm_data["crm_leads"]
+    for i, lead in enumerate(leads[:5]):
+        leads.append(dict(lead, record_id=f"dup-{i}", first_name=lead["first_name"].upper(),
+                          company_name=f"  {lead['company_name'].lower()} "))
+    with open(crm_file, 'w') as f:
+        json.dump(crm_data, f)
+    return crm_file
+
+
+def test_get_lead_matches_a_scan(crm_with_duplicates):
+    repo = CRMRepository(crm_with_duplicates)
+    for lead in scan(crm_with_duplicates, lambda lead: True):
+        assert repo.get_lead(lead["record_id"]) == lead
+    assert repo.get_lead("missing") is None
+
+
+def test_find_lead_matches_a_case_insensitive_scan(crm_with_duplicates):
+    repo = CRMRepository(crm_with_duplicates)
+    for lead in scan(crm_with_duplicates, lambda lead: True):
+        first_name, last_name, company = lead["first_name"], lead["last_name"], lead["company_name"]
+        expected = scan(crm_with_duplicates, lambda other: (
+            other["first_name"].strip().lower() == first_name.strip().lower()
+            and other["last_name"].strip().lower() == last_name.strip().lower()
+            and other["company_name"].strip().lower() == company.strip().lower()))
+        # The first match wins, as it did for the scan
+        assert record_id(repo.find_lead(first_name.swapcase(), last_name, company.upper())) == first(expected)
+    assert repo.find_lead("No", "Body", "Nowhere") is None
+
+
+def test_find_lead_by_company_matches_a_scan(crm_with_duplicates):
+    repo = CRMRepository(crm_with_duplicates)
+    for lead in scan(crm_with_duplicates, lambda lead: True):
+        company = lead["company_name"].strip().lower()
+        expected = scan(crm_with_duplicates, lambda other: other["company_name"].strip().lower() == company)
+        assert record_id(repo.find_lead_by_company(company.title())) == first(expected)
+
+
+def test_leads_for_rep_matches_a_scan(crm_with_duplicates):
+    repo = CRMRepository(crm_with_duplicates)
+    for rep in ["Sue", "Laura", "Alex", "Jordan", "Sam", "Nobody"]:
+        expected = scan(crm_with_duplicates, lambda lead: lead.get("sales_rep") == rep)
+        assert [lead["record_id"] for lead in repo.leads_for_rep(rep)] == [lead["record_id"] for lead in expected]
+
+
+def test_indexes_follow_updates_to_indexed_fields(crm_file):
+    repo = CRMRepository(crm_file)
+    lead = repo.leads_for_rep("Sue")[0]
+    repo.update_lead(lead["record_id"], {"sales_rep": "Morgan", "company_name": "Renamed Co"})
+    # A second instance replays the update from the journal and indexes it too
+    for reader in (repo, CRMRepository(crm_file)):
+        assert lead["record_id"] not in [other["record_id"] for other in reader.leads_for_rep("Sue")]
+        assert [other["record_id"] for other in reader.leads_for_rep("Morgan")] == [lead["record_id"]]
+        assert record_id(reader.find_lead_by_company("renamed co")) == lead["record_id"]
+        assert record_id(reader.find_lead(lead["first_name"], lead["last_name"], "Renamed Co")) == lead["record_id"]
+
+
+def test_indexes_are_rebuilt_when_the_file_changes(write_crm):
+    path = write_crm([{"record_id": "1", "first_name": "Ada", "last_name": "L", "company_name": "A", "sales_rep": "Sue"}])
+    repo = CRMRepository(path)
+    assert record_id(repo.find_lead_by_company("A")) == "1"
+    write_crm([{"record_id": "2", "first_name": "Bo", "last_name": "M", "company_name": "B", "sales_rep": "Sue"},
+               {"record_id": "3", "first_name": "Cy", "last_name": "N", "company_name": "C", "sales_rep": "Sue"}])
+    assert repo.find_lead_by_company("A") is None
+    assert [lead["record_id"] for lead in repo.leads_for_rep("Sue")] == ["2", "3"]
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+import crm.repository
+from CRMSyncAgent.tools.SimilarDealsTool import SimilarDealsTool
+from crm.deals import DealMatrix
+from crm.repository import CRMRepository
+from crm.semantic_deals import SemanticDealIndex, index_path, semantic_similar_deals
+
+DEALS = [
+    {"id": "D-1", "industry": "Beauty & Cosmetics", "status": "successful", "deal_size": 250000},
+    {"id": 2, "industry": "Personal Care", "status": "successful", "deal_size": 240000},
+    {"industry": "Skincare", "status": "successful", "deal_size": 260000},
+    {"id": "D-4", "industry": "Beauty", "status": "lost", "deal_size": 250000},
+    {"id": "D-5", "industry": "Food & Restaurant", "status": "successful", "deal_size": 80000},
+]
+
+
+def test_index_keys_resolve_through_the_deal_matrix():
+    matrix = DealMatrix(DEALS)
+    index = SemanticDealIndex.build(DEALS)
+    # Int and missing ids included: every successful deal is reachable, and only those
+    rows = sorted(matrix.row(str(key)) for key in index.deal_ids)
+    assert rows == [0, 1, 2, 4]
+
+
+def test_semantic_search_returns_deals_without_an_id(write_crm):
+    repo = CRMRepository(write_crm([], DEALS))
+    matches = semantic_similar_deals(repo, "Beauty", {"deal_size": 250000}, k=10)
+    industries = [match["industry"] for match in matches]
+    assert industries[0] == "Beauty & Cosmetics"
+    assert {"Personal Care", "Skincare"} <= set(industries)
+    assert "Beauty" not in industries
+    assert [match["deal_id"] for match in matches if match["industry"] == "Personal Care"] == [2]
+    assert index_path(repo).exists()
+
+
+def test_similar_deals_tool_defaults_to_keyword_search(write_crm, monkeypatch):
+    monkeypatch.delenv("CRM_BACKEND", raising=False)
+    monkeypatch.setattr(crm.repository, "CRM_DATA_PATH", write_crm([], DEALS))
+    tool = SimilarDealsTool(industry="Beauty", criteria={"deal_size": 250000})
+    assert tool.search == "keyword"
+    result = json.loads(tool.run())
+    assert result["status"] == "success"
+    assert result["matches"] == DealMatrix(DEALS).search("Beauty", {"deal_size": 250000}, 5)
+    # Keyword search: one industry match, then deals close in size only
+    assert [match["similarity_score"] for match in result["matches"]] == [1.2, 0.19, 0.19, 0.06]
+    assert result["matches"][0]["industry"] == "Beauty & Cosmetics"
+
+
+@pytest.mark.parametrize("industry", ["Personal Care", "Skincare"])
+def test_similar_deals_tool_semantic_search_is_opt_in(write_crm, monkeypatch, industry):
+    monkeypatch.delenv("CRM_BACKEND", raising=False)
+    monkeypatch.setattr(crm.repository, "CRM_DATA_PATH", write_crm([], DEALS))
+    result = json.loads(SimilarDealsTool(industry=industry, search="semantic").run())
+    assert result["status"] == "success"
+    assert "Beauty & Cosmetics" in [match["industry"] for match in result["matches"]]
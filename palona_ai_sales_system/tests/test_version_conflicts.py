@@ -0,0 +1,122 @@
+import json
+import threading
+
+import pytest
+
+import crm.repository
+from CRMSyncAgent.tools import CRMUpdateTool as update_tool_module
+from CRMSyncAgent.tools.CRMUpdateTool import CRMUpdateTool
+from crm.repository import CRMRepository, CRMVersionConflict
+from crm.sqlite_store import SQLiteCRMRepository
+from crm.streaming import StreamingCRMRepository
+
+BACKENDS = {
+    "json": lambda path: CRMRepository(path),
+    "stream": lambda path: StreamingCRMRepository(path),
+    "sqlite": lambda path: SQLiteCRMRepository(path.with_name("crm.sqlite3"), path),
+}
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def open_repo(request):
+    return BACKENDS[request.param]
+
+
+def test_stale_version_is_rejected(crm_file, open_repo):
+    repo = open_repo(crm_file)
+    version = repo.get_lead("1").get("version", 0)
+    assert repo.update_lead("1", {"status": "Qualified"}, expected_version=version)
+    with pytest.raises(CRMVersionConflict):
+        repo.update_lead("1", {"status": "Contacted"}, expected_version=version)
+    lead = repo.get_lead("1")
+    assert (lead["status"], lead["version"]) == ("Qualified", version + 1)
+    assert not repo.update_lead("missing", {"status": "Qualified"}, expected_version=0)
+
+
+def increment(repo, record_id: str, attempts: int = 200) -> int:
+    """Read-modify-write with the same retry loop as CRMUpdateTool; returns the number of conflicts"""
+    for conflicts in range(attempts):
+        lead = repo.get_lead(record_id)
+        version = lead.get("version", 0)
+        try:
+            repo.update_lead(record_id, {"interaction_count": lead["interaction_count"] + 1}, expected_version=version)
+            return conflicts
+        except CRMVersionConflict:
+            continue
+    raise AssertionError("update kept conflicting")
+
+
+def test_concurrent_writers_retry_without_losing_updates(crm_file, open_repo):
+    start = open_repo(crm_file).get_lead("7")["interaction_count"]
+
+    def worker():
+        # Each writer has its own repository, like separate Streamlit sessions or worker processes
+        repo = open_repo(crm_file)
+        for _ in range(10):
+            increment(repo, "7")
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    lead = open_repo(crm_file).get_lead("7")
+    assert lead["interaction_count"] == start + 40
+    assert lead["version"] == 40
+
+
+@pytest.fixture
+def update_tool_crm(crm_file, monkeypatch):
+    """Point the tools' shared repository (get_repository) at the temporary CRM file"""
+    monkeypatch.delenv("CRM_BACKEND", raising=False)
+    monkeypatch.setattr(crm.repository, "CRM_DATA_PATH", crm_file)
+    monkeypatch.setattr(update_tool_module.time, "sleep", lambda seconds: None)
+    return crm_file
+
+
+def interfere(monkeypatch, crm_file, times: int):
+    """Make another writer update the lead between CRMUpdateTool's read and its write, `times` times"""
+    other = CRMRepository(crm_file)
+    build = CRMUpdateTool._build_update
+    calls = []
+
+    def racing_build(self, lead):
+        calls.append(lead.get("version", 0))
+        if len(calls) <= times:
+            other.update_lead(self.record_id, {"interaction_count": lead["interaction_count"] + 1})
+        return build(self, lead)
+
+    monkeypatch.setattr(CRMUpdateTool, "_build_update", racing_build)
+    return calls
+
+
+def test_update_tool_recomputes_after_a_conflict(update_tool_crm, monkeypatch):
+    lead = CRMRepository(update_tool_crm).get_lead("9")
+    count = lead["interaction_count"]
+    calls = interfere(monkeypatch, update_tool_crm, times=2)
+    tool = CRMUpdateTool(record_id="9", email_message="Following up", email_sent_date="2025-06-02")
+    assert json.loads(tool.run())["status"] == "success"
+    # Two lost races, then a write computed from the lead as the other writer left it
+    assert calls == [0, 1, 2]
+    lead = CRMRepository(update_tool_crm).get_lead("9")
+    assert (lead["interaction_count"], lead["version"]) == (count + 3, 3)
+    assert lead["last_contact_date"] == "2025-06-02"
+    assert CRMRepository(update_tool_crm).get_messages("9")[-1] == {"message": "Following up", "timestamp": "2025-06-02"}
+
+
+def test_update_tool_gives_up_after_max_attempts(update_tool_crm, monkeypatch):
+    calls = interfere(monkeypatch, update_tool_crm, times=update_tool_module.MAX_UPDATE_ATTEMPTS)
+    result = json.loads(CRMUpdateTool(record_id="9", next_follow_up="2025-07-01").run())
+    assert result["status"] == "error"
+    assert "modified concurrently" in result["message"]
+    assert len(calls) == update_tool_module.MAX_UPDATE_ATTEMPTS
+    assert CRMRepository(update_tool_crm).get_lead("9")["next_follow_up"] != "2025-07-01"
+
+
+def test_update_tool_reports_an_update_that_was_not_applied(update_tool_crm, monkeypatch):
+    # The lead is gone by the time of the write, e.g. the CRM file was replaced in between
+    monkeypatch.setattr(CRMRepository, "update_lead", lambda self, *args, **kwargs: False)
+    result = json.loads(CRMUpdateTool(record_id="9", next_follow_up="2025-07-01").run())
+    assert result["status"] == "error"
+    assert "not applied" in result["message"]
+    assert json.loads(CRMUpdateTool(record_id="missing", next_follow_up="2025-07-01").run())["status"] == "error"
@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import web.cache
+from web.aio import close_session
+from web.cache import WebCache, afetch_text, cache_key, fetch_text
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(web.cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """A temporary cache behind get_web_cache, so fetch_text never touches data/web_cache.sqlite3"""
+    cache = WebCache(tmp_path / "web_cache.sqlite3")
+    monkeypatch.setattr(web.cache, "_cache", cache)
+    return cache
+
+
+def test_lookup_and_freshness(tmp_path, clock):
+    cache = WebCache(tmp_path / "web_cache.sqlite3")
+    assert cache.lookup("page") is None
+    cache.put("page", "website", "<html>café</html>", ttl=60, etag='"v1"')
+    entry = cache.lookup("page")
+    assert (entry["text"], entry["etag"], entry["fresh"]) == ("<html>café</html>", '"v1"', True)
+    assert entry["raw_size"] == len("<html>café</html>".encode("utf-8"))
+    clock.now += 61
+    assert not cache.lookup("page")["fresh"]
+    # A 304 renews the stored response for another ttl
+    cache.hit("page", cache.lookup("page"), ttl=60)
+    assert cache.lookup("page")["fresh"]
+    assert cache.stats["revalidated"] == 1
+
+
+def test_expired_responses_without_validators_are_dropped(tmp_path, clock):
+    cache = WebCache(tmp_path / "web_cache.sqlite3")
+    cache.put("plain", "newsapi", "a", ttl=10)
+    cache.put("tagged", "newsapi", "b", ttl=10, last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    clock.now += 11
+    cache.put("new", "newsapi", "c", ttl=10)
+    assert [cache.lookup(key) is not None for key in ("plain", "tagged", "new")] == [False, True, True]
+    assert cache.stats["evictions"] == 1
+
+
+def test_least_recently_used_responses_are_evicted(tmp_path, clock):
+    # Room for three stored (compressed) bodies
+    size = len(zlib.compress(b"x" * 100, 6))
+    cache = WebCache(tmp_path / "web_cache.sqlite3", max_bytes=3 * size)
+    for key in "abc":
+        clock.now += 1
+        cache.put(key, "website", "x" * 100, ttl=3600)
+    clock.now += 1
+    cache.hit("a", cache.lookup("a"))
+    clock.now += 1
+    cache.put("d", "website", "x" * 100, ttl=3600)
+    assert [cache.lookup(key) is not None for key in "abcd"] == [True, False, True, True]
+    assert cache.info()["bytes"] == 3 * size
+
+
+def test_running_total_follows_every_change(tmp_path, clock):
+    cache = WebCache(tmp_path / "web_cache.sqlite3")
+    conn = cache._conn()
+
+    def totals():
+        return conn.execute("SELECT bytes FROM totals").fetchone()[0], cache.info()["bytes"]
+
+    cache.put("a", "website", "x" * 100, ttl=10)
+    cache.put("a", "website", "y" * 1000, ttl=10, etag='"v2"')
+    cache.put("b", "website", "z", ttl=10)
+    assert totals()[0] == totals()[1] > 0
+    clock.now += 11
+    cache.put("c", "website", "w" * 10, ttl=10)
+    # "b" expired without validators; "a" has an ETag and stays
+    assert cache.lookup("b") is None
+    assert totals()[0] == totals()[1]
+    cache.max_bytes = totals()[0] - 1
+    cache.put("c", "website", "w" * 10, ttl=10)
+    assert cache.lookup("a") is None
+    assert totals()[0] == totals()[1] <= cache.max_bytes
+    cache.clear()
+    assert totals() == (0, 0)
+
+
+def test_cache_key_covers_params_and_headers():
+    assert cache_key("https://a", {"q": "x", "n": 1}) == cache_key("https://a", {"n": 1, "q": "x"})
+    assert len({cache_key("https://a"), cache_key("https://a", {"q": "x"}), cache_key("https://a", None, {"H": "1"}),
+                cache_key("https://b")}) == 4
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves the page body with an ETag, a 304 for a matching If-None-Match, and a 404 for /missing"""
+    body = b"<html>version 1</html>"
+    etag = '"v1"'
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path.startswith("/missing"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(self.body)))
+            self.send_header("ETag", self.etag)
+            self.end_headers()
+            self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    handler = type("TestHandler", (Handler,), {"requests": []})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield handler, f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fetch_text_serves_fresh_and_revalidates_stale_responses(cache, clock, server):
+    handler, url = server
+    assert fetch_text("newsapi", f"{url}/page") == "<html>version 1</html>"
+    assert fetch_text("newsapi", f"{url}/page") == "<html>version 1</html>"
+    assert handler.requests == [("/page", None)]
+    clock.now += web.cache.source_ttl("newsapi") + 1
+    # Stale: a conditional request, answered with 304, serves the stored body
+    assert fetch_text("newsapi", f"{url}/page") == "<html>version 1</html>"
+    assert handler.requests[-1] == ("/page", '"v1"')
+    handler.body, handler.etag = b"<html>version 2</html>", '"v2"'
+    clock.now += web.cache.source_ttl("newsapi") + 1
+    assert fetch_text("newsapi", f"{url}/page") == "<html>version 2</html>"
+    assert fetch_text("newsapi", f"{url}/page") == "<html>version 2</html>"
+    assert len(handler.requests) == 3
+    assert {name: cache.stats[name] for name in ("hits", "revalidated", "misses", "stores")} == \
+        {"hits": 2, "revalidated": 1, "misses": 2, "stores": 2}
+
+
+def test_fetch_text_stores_only_successful_responses(cache, server):
+    handler, url = server
+    with pytest.raises(requests.HTTPError):
+        fetch_text("website", f"{url}/missing")
+    assert fetch_text("website", f"{url}/missing", raise_for_status=False) == ""
+    assert fetch_text("website", f"{url}/page", max_bytes=6) == "<html>"
+    # The capped response is stored under the same key as the full page
+    assert fetch_text("website", f"{url}/page", max_bytes=6) == "<html>"
+    assert [path for path, _ in handler.requests] == ["/missing", "/missing", "/page"]
+    assert cache.info()["entries"] == 1
+
+
+def test_afetch_text_shares_the_cache(cache, server):
+    handler, url = server
+
+    async def fetch_twice():
+        try:
+            return [await afetch_text("website", f"{url}/page") for _ in range(2)]
+        finally:
+            await close_session()
+
+    assert asyncio.run(fetch_twice()) == ["<html>version 1</html>"] * 2
+    assert fetch_text("website", f"{url}/page") == "<html>version 1</html>"
+    assert handler.requests == [("/page", None)]
@@ -1,12 +1,15 @@
 import streamlit as st
 from CRMSyncAgent.tools.SimilarDealsTool import SimilarDealsTool
+from CRMSyncAgent.tools.SimilarDealsBatchTool import SimilarDealsBatchTool
 from CRMSyncAgent.tools.LeadProfileIngestionTool import LeadProfileIngestionTool
 from CRMSyncAgent.tools.CRMUpdateTool import CRMUpdateTool
+from CRMSyncAgent.tools.CRMBatchUpdateTool import CRMBatchUpdateTool
 from CRMSyncAgent.tools.CommunicationHistoryTool import CommunicationHistoryTool
 from ResearchAgent.tools.ReportGenerationTool import ReportGenerationTool
 from ResearchAgent.tools.LinkedInResearchTool import LinkedInResearchTool
 from ResearchAgent.tools.CompanyResearchTool import CompanyResearchTool
 from ResearchAgent.tools.CommunicationSummaryTool import CommunicationSummaryTool
+from llm.cache import bypass_cache
 import json
 
 # Map tool names to classes and their input fields with descriptions
@@ -18,6 +21,12 @@ TOOLS = {
             "criteria": "Additional matching criteria (JSON format, e.g., {'deal_size': 100000})"
         }
     },
+    "Similar Deals (Batch)": {
+        "class": SimilarDealsBatchTool,
+        "fields": {
+            "queries": "Queries (JSON list of {industry, deal_size})"
+        }
+    },
     "Lead Profile Ingestion": {
         "class": LeadProfileIngestionTool,
         "fields": {}
@@ -31,6 +40,12 @@ TOOLS = {
             "next_follow_up": "Next follow-up date (YYYY-MM-DD, optional)"
         }
     },
+    "CRM Batch Update": {
+        "class": CRMBatchUpdateTool,
+        "fields": {
+            "updates": "Updates to log (JSON list of {record_id, email_message, email_sent_date, next_follow_up})"
+        }
+    },
     "Communication History": {
         "class": CommunicationHistoryTool,
         "fields": {
@@ -71,6 +86,8 @@ def get_input_widget(field_name, field_description):
     """Create appropriate input widget based on field name and description"""
     if field_name == "criteria":
         return st.text_area(field_description, value="{}", help="Enter JSON format criteria")
+    elif field_name == "updates":
+        return st.text_area(field_description, value="[]", help="Enter a JSON list of updates")
     elif field_name == "uploaded_document":
         return st.text_area(field_description, help="Paste communication document content here")
     elif "date" in field_name.lower():
@@ -92,6 +109,7 @@ def main():
     inputs = {}
     for field_name, field_description in tool_info["fields"].items():
         inputs[field_name] = get_input_widget(field_name, field_description)
+    bypass_cache(st.checkbox("Bypass LLM cache", help="Call the LLM even if an identical prompt was answered before"))
 
     # Run button
     if st.button("Run Tool"):
@@ -103,6 +121,18 @@ def main():
                 except json.JSONDecodeError:
                     st.error("Invalid JSON format for criteria")
                     return
+            if "updates" in inputs and inputs["updates"]:
+                try:
+                    inputs["updates"] = json.loads(inputs["updates"])
+                except json.JSONDecodeError:
+                    st.error("Invalid JSON format for updates")
+                    return
+            if "queries" in inputs and inputs["queries"]:
+                try:
+                    inputs["queries"] = json.loads(inputs["queries"])
+                except json.JSONDecodeError:
+                    st.error("Invalid JSON format for queries")
+                    return
 
             # Instantiate and run tool
             tool = tool_info["class"](**inputs)
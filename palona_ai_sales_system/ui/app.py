@@ -10,6 +10,7 @@ from main_workflow.email_draft import email_draft
 from hubspot_db import hubspot_db
 from login import login_page
 from sidebar import sidebar
+from llm.cache import bypass_cache
 
 # Set wide mode for best reading experience
 st.set_page_config(layout="wide")
@@ -39,6 +40,8 @@ if not st.session_state["authenticated"]:
 else:
     # Show sidebar for authenticated users
     sidebar()
+    # Applies to every LLM call of this run (the flag is per session)
+    bypass_cache(st.session_state.get("bypass_llm_cache", False))
     # Main content
     if st.session_state["page"] == "Main Page":
         welcome_section()
@@ -10,19 +10,30 @@ def hubspot_db():
     st.header("HubSpot CRM & Deal Database")
     if st.button("Refresh CRM Data", use_container_width=True):
         st.session_state["refresh_crm"] = True
+    # Page through leads instead of loading the whole CRM into one table
+    col1, col2 = st.columns(2)
+    with col1:
+        page_size = st.selectbox("Leads per page", [25, 50, 100, 500], key="hubspot_page_size")
+    with col2:
+        page = st.number_input("Page", min_value=1, value=1, step=1, key="hubspot_page")
     # Always reload if refresh button is pressed
-    crm_tool = LeadProfileIngestionTool()
+    crm_tool = LeadProfileIngestionTool(limit=page_size, offset=(page - 1) * page_size)
     result = crm_tool.run()
     if result["status"] != "success":
         st.error("Failed to load CRM data.")
         return
     leads = result["leads"]
     deals = result["deals"]
+    total = result["total"]
     
     tab1, tab2 = st.tabs(["Leads", "Deals"])
 
     with tab1:
         st.subheader("Leads")
+        if leads:
+            st.caption(f"Showing leads {(page - 1) * page_size + 1}-{(page - 1) * page_size + len(leads)} of {total}")
+        else:
+            st.caption(f"No leads on this page ({total} leads in total)")
         df_leads = pd.DataFrame(leads)
         # Convert object columns to readable strings
         for col in df_leads.columns:
@@ -2,10 +2,10 @@ import streamlit as st
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from tools_utils import run_tool, get_tool_inputs
+from tools_utils import run_tool, stream_tool, get_tool_inputs
 from formatting_tool import ReportFormattingTool
 from pathlib import Path
-from CRMSyncAgent.tools.LeadProfileIngestionTool import LeadProfileIngestionTool
+from crm.repository import get_repository
 
 def communication_summary():
     st.subheader("Step 3: Communication Summary")
@@ -29,15 +29,14 @@ def communication_summary():
     last_name = name_split[1] if len(name_split) > 1 else ""
     prospect_name = first_name
 
-    # Get the correct lead_id from CRM using LeadProfileIngestionTool
-    crm_tool = LeadProfileIngestionTool()
-    crm_result = crm_tool.run()
+    # Get the correct lead_id from the CRM name index
     lead_id = None
-    if crm_result["status"] == "success":
-        for lead in crm_result["leads"]:
-            if lead["first_name"] == first_name and lead["company_name"] == company_name:
-                lead_id = lead["record_id"]
-                break
+    try:
+        lead = get_repository().find_lead(first_name, last_name, company_name)
+        if lead:
+            lead_id = lead["record_id"]
+    except Exception:
+        pass
     if not lead_id:
         st.error("Could not find lead ID for selected lead.")
         return
@@ -133,17 +132,17 @@ def communication_summary():
 
         if st.button("Generate Communication Summary", use_container_width=True):
             # Generate summary based on uploaded_text if present, otherwise just CRM history
-            with st.spinner("Generating communication summary..."):
-                result = run_tool("Communication Summary", {
-                    "lead_id": lead_id,
-                    "uploaded_document": uploaded_text
-                })
-                if "error" in result:
-                    st.error(result["error"])
-                else:
-                    st.session_state["comm_summary_report"] = result["result"]
-                    st.session_state["comm_summary_generated"] = True
-                    st.rerun()
+            # Render the summary as it is generated instead of behind a spinner
+            result = stream_tool("Communication Summary", {
+                "lead_id": lead_id,
+                "uploaded_document": uploaded_text
+            })
+            if "error" in result:
+                st.error(result["error"])
+            else:
+                st.session_state["comm_summary_report"] = result["result"]
+                st.session_state["comm_summary_generated"] = True
+                st.rerun()
     else:
         comm_summary = st.session_state["comm_summary_report"]
         # Format the summary using the formatting tool
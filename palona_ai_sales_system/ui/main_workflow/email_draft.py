@@ -75,17 +75,18 @@ def email_draft():
     if not st.session_state["email_draft_generated"]:
         st.info("Click the button below to generate an email draft using AI.")
         if st.button("Generate Email Draft", use_container_width=True):
-            with st.spinner("Generating email draft..."):
-                draft_tool = MessageDraftingTool(company_name=company_name, prospect_name=prospect_name, lead_id=lead_id)
-                result = draft_tool.run()
-                if result["status"] != "success":
-                    st.error("Failed to generate email draft.")
-                    return
-                message = result["message"]
-                st.session_state["email_subject"] = message["subject"]
-                st.session_state["email_body"] = message["body"]
-                st.session_state["email_draft_generated"] = True
-                st.rerun()
+            # Render the draft as it is generated instead of behind a spinner
+            draft_tool = MessageDraftingTool(company_name=company_name, prospect_name=prospect_name, lead_id=lead_id)
+            try:
+                draft = st.write_stream(draft_tool.run_stream())
+            except Exception:
+                st.error("Failed to generate email draft.")
+                return
+            message = MessageDraftingTool.parse_message(draft)
+            st.session_state["email_subject"] = message["subject"]
+            st.session_state["email_body"] = message["body"]
+            st.session_state["email_draft_generated"] = True
+            st.rerun()
     else:
         # Email form
         with st.form("email_form"):
@@ -2,6 +2,7 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import streamlit as st
+from crm.repository import get_repository
 from CRMSyncAgent.tools.LeadProfileIngestionTool import LeadProfileIngestionTool
 import pandas as pd
 
@@ -13,21 +14,23 @@ def lead_selection():
     Please select one to proceed to the sales preparation guide.
     """, unsafe_allow_html=True)
 
-    crm_tool = LeadProfileIngestionTool()
-    result = crm_tool.run()
-    if result["status"] != "success":
+    display_cols = ["first_name", "last_name", "company_name", "job_title", "became_a_lead_date", "lead_score", "customer_segment"]
+    # Only fetch the displayed columns of this user's leads, newest first
+    result = LeadProfileIngestionTool(
+        fields=display_cols,
+        filters={"sales_rep": st.session_state.get("current_user", "Sue")},
+        sort="-became_a_lead_date",
+        include_deals=False
+    ).run()
+    if result.get("status") != "success":
         st.error("Failed to load CRM data.")
         return
-    leads = result["leads"]
-    user = st.session_state.get("current_user", "Sue")
-    user_leads = [lead for lead in leads if lead.get("sales_rep") == user]
+    user_leads = result["leads"]
     if not user_leads:
         st.info("No new leads assigned to you.")
         return
-    # Sort by became_a_lead_date desc
-    user_leads.sort(key=lambda x: x.get("became_a_lead_date", ""), reverse=True)
-    display_cols = ["first_name", "last_name", "company_name", "job_title", "became_a_lead_date", "lead_score", "customer_segment"]
-    df = pd.DataFrame(user_leads)[display_cols]
+    repo = get_repository()
+    df = pd.DataFrame(user_leads, columns=display_cols)
 
     # prettify column names
     df = df.rename(columns={
@@ -63,8 +66,8 @@ def lead_selection():
         try:
             name_part, company_name = selected_lead.split(" - ")
             first_name, last_name = name_part.split(" ", 1)
-            # Find the lead in the leads list
-            lead = next((l for l in leads if l["first_name"] == first_name and l["last_name"] == last_name and l["company_name"] == company_name), None)
+            # Find the lead via the CRM name index
+            lead = repo.find_lead(first_name, last_name, company_name)
             if lead:
                 st.session_state["linkedin_url"] = lead.get("linkedin_url", "")
             else:
@@ -2,7 +2,7 @@ import streamlit as st
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from tools_utils import run_tool, get_tool_inputs
+from tools_utils import run_tool, stream_tool, get_tool_inputs
 from formatting_tool import ReportFormattingTool
 from pathlib import Path
 
@@ -160,17 +160,17 @@ def sales_prep():
                 if not st.session_state["company_research"] or not st.session_state["linkedin_research"]:
                     st.warning("Please complete both company and LinkedIn research first.")
                 else:
-                    with st.spinner("Generating your personalized sales prep guide..."):
-                        result = run_tool("Report Generation", {
-                            "company_name": company_name,
-                            "prospect_name": prospect_name
-                        })
-                        if "error" in result:
-                            st.error(result["error"])
-                        else:
-                            st.session_state["sales_prep_report"] = result["result"]
-                            st.session_state["sales_prep_generated"] = True
-                            st.rerun()
+                    # Render the guide as it is generated instead of behind a spinner
+                    result = stream_tool("Report Generation", {
+                        "company_name": company_name,
+                        "prospect_name": prospect_name
+                    })
+                    if "error" in result:
+                        st.error(result["error"])
+                    else:
+                        st.session_state["sales_prep_report"] = result["result"]
+                        st.session_state["sales_prep_generated"] = True
+                        st.rerun()
         with col2:
             if st.button("Skip to Communication Summary", use_container_width=True):
                 st.session_state["page"] = "Communication Summary"
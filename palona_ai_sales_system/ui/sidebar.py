@@ -10,6 +10,10 @@ def sidebar():
         index=["Main Page", "Lead Selection", "Sales Prep", "Communication Summary", "Message Drafting", "HubSpot Database"].index(st.session_state["page"])
     )
     st.session_state["page"] = page
+    st.sidebar.checkbox(
+        "Bypass LLM cache", key="bypass_llm_cache",
+        help="Regenerate research and reports instead of reusing answers cached for identical prompts"
+    )
     if st.sidebar.button("Logout"):
         st.session_state.clear()
         st.rerun()
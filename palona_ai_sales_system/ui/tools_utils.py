@@ -98,6 +98,16 @@ def run_tool(tool_name, inputs):
     except Exception as e:
         return {"error": str(e)}
 
+def stream_tool(tool_name, inputs):
+    """Stream a tool's output into the page as it is generated and return the result, like run_tool"""
+    try:
+        tool = TOOLS[tool_name]["class"](**inputs)
+        result = st.write_stream(tool.run_stream())
+        return {"success": True, "result": result}
+
+    except Exception as e:
+        return {"error": str(e)}
+
 def get_tool_inputs(tool_name):
     """Get input widgets for a specific tool"""
     tool_info = TOOLS[tool_name]
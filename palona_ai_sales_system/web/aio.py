@@ -0,0 +1,44 @@
+import asyncio
+import os
+import weakref
+from typing import Dict, Tuple, Union
+
+import aiohttp
+
+# Open connections per event loop, across all hosts
+WEB_MAX_CONNECTIONS = int(os.getenv("WEB_MAX_CONNECTIONS", "200"))
+# Total seconds per request, so one stalled source cannot hold up a batch of hundreds
+WEB_TIMEOUT = float(os.getenv("WEB_TIMEOUT", "30"))
+
+# aiohttp sessions are bound to the event loop they were created on
+_sessions = weakref.WeakKeyDictionary()
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    The running event loop's shared session, created on first use. Every async call of the tools and the LLM gateway
+    goes through it, so connections are pooled and kept alive across calls.
+    Close it with close_session() before the loop ends.
+    """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=WEB_MAX_CONNECTIONS, ttl_dns_cache=300)
+        session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=WEB_TIMEOUT))
+        _sessions[loop] = session
+    return session
+
+
+async def close_session():
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+def _timeout(timeout: Union[float, Tuple[float, float], None]) -> Dict:
+    # A (connect, read) pair, as with requests, bounds connecting and each wait for data within the WEB_TIMEOUT total
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return {"timeout": aiohttp.ClientTimeout(total=WEB_TIMEOUT, sock_connect=connect, sock_read=read)}
+    return {"timeout": aiohttp.ClientTimeout(total=timeout)} if timeout else {}
+
@@ -0,0 +1,316 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from web.aio import _timeout, get_session
+
+WEB_CACHE_PATH = Path(os.getenv("WEB_CACHE_PATH") or Path(__file__).parent.parent / "data" / "web_cache.sqlite3")
+# Least recently used responses are evicted beyond this total (compressed) size
+WEB_CACHE_MAX_BYTES = int(float(os.getenv("WEB_CACHE_MAX_MB", "100")) * 1024 * 1024)
+# Seconds a response is served without asking the server again, per research source: encyclopedic and company pages
+# change slowly, news and search results quickly. Override one with e.g. WEB_CACHE_TTL_WIKIPEDIA.
+WEB_CACHE_TTLS = {
+    "wikipedia": 7 * 24 * 3600,
+    "website": 24 * 3600,
+    "duckduckgo": 24 * 3600,
+    "google_custom_search": 24 * 3600,
+    "bing": 6 * 3600,
+    "bing_search": 6 * 3600,
+    "newsapi": 3600,
+    "google_news": 3600,
+}
+DEFAULT_TTL = 3600
+
+# As in llm/cache.py, triggers keep the total stored size in totals, so eviction never sums the table
+SCHEMA = """
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    raw_size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed);
+CREATE INDEX IF NOT EXISTS idx_responses_expires ON responses (expires);
+CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO totals SELECT 0, COALESCE(SUM(size), 0) FROM responses;
+CREATE TRIGGER IF NOT EXISTS responses_inserted AFTER INSERT ON responses
+    BEGIN UPDATE totals SET bytes = bytes + new.size; END;
+CREATE TRIGGER IF NOT EXISTS responses_deleted AFTER DELETE ON responses
+    BEGIN UPDATE totals SET bytes = bytes - old.size; END;
+CREATE TRIGGER IF NOT EXISTS responses_resized AFTER UPDATE OF size ON responses
+    BEGIN UPDATE totals SET bytes = bytes - old.size + new.size; END;
+COMMIT;
+"""
+# Responses read per step while evicting
+EVICT_BATCH = 256
+
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=20, pool_maxsize=20))
+_session.mount("http://", HTTPAdapter(pool_connections=20, pool_maxsize=20))
+
+
+def source_ttl(source: str) -> float:
+    return float(os.getenv(f"WEB_CACHE_TTL_{source.upper()}", WEB_CACHE_TTLS.get(source, DEFAULT_TTL)))
+
+
+def cache_key(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None) -> str:
+    """Everything that selects the response: URL, query parameters and request headers, hashed"""
+    payload = json.dumps([url, sorted((params or {}).items()), sorted((headers or {}).items())], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class WebCache:
+    """
+    Persistent HTTP response cache for the research sources in SQLite (WAL mode), keyed by cache_key.
+    Bodies are stored zlib-compressed. A response is fresh for its source's TTL; after that it is revalidated with
+    If-None-Match/If-Modified-Since when the server sent an ETag or Last-Modified, and a 304 keeps the stored body.
+    Beyond WEB_CACHE_MAX_BYTES the least recently used responses are evicted.
+    stats counts hits (fresh), revalidations (304), misses, stores, evictions and the response bytes not downloaded.
+    """
+
+    def __init__(self, db_path=WEB_CACHE_PATH, max_bytes: int = WEB_CACHE_MAX_BYTES):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stores": 0, "evictions": 0, "bytes_saved": 0}
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread, as in llm/cache.py
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str, n: int = 1):
+        with self._stats_lock:
+            self.stats[name] += n
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """The stored response as {"text", "raw_size", "etag", "last_modified", "fresh"}, or None"""
+        row = self._conn().execute(
+            "SELECT body, raw_size, etag, last_modified, expires FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        body, raw_size, etag, last_modified, expires = row
+        return {"text": zlib.decompress(body).decode("utf-8"), "raw_size": raw_size, "etag": etag,
+                "last_modified": last_modified, "fresh": expires > time.time()}
+
+    def hit(self, key: str, entry: Dict, ttl: Optional[float] = None):
+        """Count a served response; ttl renews a revalidated one"""
+        now = time.time()
+        if ttl is None:
+            self._conn().execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._count("hits")
+        else:
+            self._conn().execute("UPDATE responses SET accessed = ?, expires = ? WHERE key = ?", (now, now + ttl, key))
+            self._count("revalidated")
+        self._count("bytes_saved", entry["raw_size"])
+
+    def put(self, key: str, source: str, text: str, ttl: float, etag: Optional[str] = None,
+            last_modified: Optional[str] = None):
+        now = time.time()
+        raw = text.encode("utf-8")
+        body = zlib.compress(raw, 6)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET"
+                         " source = excluded.source, body = excluded.body, size = excluded.size,"
+                         " raw_size = excluded.raw_size, etag = excluded.etag, last_modified = excluded.last_modified,"
+                         " expires = excluded.expires, accessed = excluded.accessed",
+                         (key, source, body, len(body), len(raw), etag, last_modified, now + ttl, now))
+            # Expired responses without validators can never be served again
+            evicted = conn.execute("DELETE FROM responses WHERE expires < ? AND etag IS NULL AND last_modified IS NULL",
+                                   (now,)).rowcount
+            evicted += _evict_lru(conn, self.max_bytes)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._count("stores")
+        self._count("evictions", evicted)
+
+    def clear(self):
+        self._conn().execute("DELETE FROM responses")
+
+    def info(self) -> Dict:
+        conn = self._conn()
+        count, size, raw_size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) FROM responses").fetchone()
+        sources = dict(conn.execute("SELECT source, COUNT(*) FROM responses GROUP BY source").fetchall())
+        return {"path": str(self.db_path), "entries": count, "bytes": size, "uncompressed_bytes": raw_size,
+                "sources": sources, **get_web_cache_stats()}
+
+
+def _evict_lru(conn: sqlite3.Connection, max_bytes: int) -> int:
+    """Delete the least recently used responses until the stored total is within max_bytes; returns how many"""
+    excess = conn.execute("SELECT bytes FROM totals").fetchone()[0] - max_bytes
+    evicted = 0
+    while excess > 0:
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed LIMIT ?", (EVICT_BATCH,)).fetchall()
+        if not rows:
+            break
+        keys = []
+        for key, size in rows:
+            keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", keys)
+        evicted += len(keys)
+    return evicted
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_web_cache() -> WebCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = WebCache()
+        return _cache
+
+
+def get_web_cache_stats() -> Dict:
+    """This process's cache counters plus the hit ratio (fresh hits and 304s over all lookups)"""
+    cache = get_web_cache()
+    with cache._stats_lock:
+        stats = dict(cache.stats)
+    served = stats["hits"] + stats["revalidated"]
+    stats["hit_ratio"] = served / max(served + stats["misses"], 1)
+    return stats
+
+
+def _lookup(key: str) -> Tuple[Optional[Dict], Dict]:
+    """The stored response (None if unreadable, the cache is an optimization) and the conditional request headers"""
+    try:
+        entry = get_web_cache().lookup(key)
+    except (sqlite3.Error, zlib.error):
+        return None, {}
+    conditional = {}
+    if entry and not entry["fresh"]:
+        if entry["etag"]:
+            conditional["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            conditional["If-Modified-Since"] = entry["last_modified"]
+    return entry, conditional
+
+
+def _served(key: str, entry: Dict, ttl: Optional[float] = None) -> str:
+    try:
+        get_web_cache().hit(key, entry, ttl)
+    except sqlite3.Error:
+        pass
+    return entry["text"]
+
+
+def _store(key: str, source: str, text: str, response_headers):
+    try:
+        get_web_cache().put(key, source, text, source_ttl(source), response_headers.get("ETag"),
+                            response_headers.get("Last-Modified"))
+    except sqlite3.Error:
+        pass
+
+
+def _capped_text(response: requests.Response, max_bytes: int) -> str:
+    # Stop downloading at max_bytes (after content decoding)
+    body = bytearray()
+    for chunk in response.iter_content(64 * 1024):
+        body += chunk
+        if len(body) >= max_bytes:
+            break
+    return bytes(body[:max_bytes]).decode(response.encoding or "utf-8", errors="replace")
+
+
+def fetch_text(source: str, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+               timeout=None, raise_for_status: bool = True, max_bytes: Optional[int] = None) -> str:
+    """
+    GET a page's text through the cache: a fresh response is served without a request, a stale one is revalidated.
+    With max_bytes only the start of the page is downloaded (and stored). Only 200 responses are stored.
+    Raises requests exceptions like requests.get.
+    """
+    key = cache_key(url, params, headers)
+    entry, conditional = _lookup(key)
+    if entry and entry["fresh"]:
+        return _served(key, entry)
+    with _session.get(url, params=params, headers={**(headers or {}), **conditional}, timeout=timeout,
+                      stream=max_bytes is not None) as response:
+        if entry and conditional and response.status_code == 304:
+            return _served(key, entry, source_ttl(source))
+        get_web_cache()._count("misses")
+        if raise_for_status:
+            response.raise_for_status()
+        text = _capped_text(response, max_bytes) if max_bytes else response.text
+        if response.status_code == 200:
+            _store(key, source, text, response.headers)
+        return text
+
+
+def fetch_json(source: str, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None, timeout=None):
+    return json.loads(fetch_text(source, url, params, headers, timeout))
+
+
+async def afetch_text(source: str, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+                      timeout=None, raise_for_status: bool = True, max_bytes: Optional[int] = None) -> str:
+    """fetch_text() on the event loop's shared aiohttp session; raises aiohttp exceptions"""
+    key = cache_key(url, params, headers)
+    entry, conditional = _lookup(key)
+    if entry and entry["fresh"]:
+        return _served(key, entry)
+    async with get_session().get(url, params=params, headers={**(headers or {}), **conditional},
+                                 **_timeout(timeout)) as response:
+        if entry and conditional and response.status == 304:
+            return _served(key, entry, source_ttl(source))
+        get_web_cache()._count("misses")
+        if raise_for_status:
+            response.raise_for_status()
+        if max_bytes:
+            body = bytearray()
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                body += chunk
+                if len(body) >= max_bytes:
+                    break
+            text = bytes(body[:max_bytes]).decode(response.charset or "utf-8", errors="replace")
+        else:
+            text = await response.text(errors="replace")
+        if response.status == 200:
+            _store(key, source, text, response.headers)
+        return text
+
+
+async def afetch_json(source: str, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+                      timeout=None):
+    return json.loads(await afetch_text(source, url, params, headers, timeout))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the research sources' HTTP cache")
+    parser.add_argument("command", choices=["info", "clear"])
+    args = parser.parse_args()
+    if args.command == "clear":
+        get_web_cache().clear()
+    print(get_web_cache().info())
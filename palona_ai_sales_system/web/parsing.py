@@ -0,0 +1,116 @@
+import io
+from itertools import islice
+from typing import Dict, Iterator, List
+
+import lxml.html
+from lxml import etree
+
+# Visible text of an element, as BeautifulSoup's get_text(strip=True): stripped strings joined, scripts left out
+_TEXT = etree.XPath(".//text()[not(ancestor::script) and not(ancestor::style)]")
+_SOCIAL_NETWORKS = ("linkedin", "twitter", "facebook", "instagram")
+
+
+def _text(element) -> str:
+    return "".join(text.strip() for text in _TEXT(element))
+
+
+def _first(element, path: str):
+    found = element.xpath(path)
+    return found[0] if found else None
+
+
+def _has_class(element, name: str) -> bool:
+    return name in (element.get("class") or "").split()
+
+
+def parse_rss_items(text: str, limit: int = 10) -> List[Dict]:
+    """
+    title, link, pubDate and source of the first `limit` <item>s of an RSS feed. Parsed incrementally: the rest of
+    the feed is not parsed once `limit` items are collected, and a malformed feed yields the items before the error.
+    """
+    items = []
+    if not text:
+        return items
+    # The text is already decoded, so the encoding declared in the feed no longer applies
+    parser = etree.iterparse(io.BytesIO(text.encode("utf-8")), events=("end",), tag="item", encoding="utf-8",
+                             recover=True, resolve_entities=False, no_network=True)
+    try:
+        for _, item in parser:
+            items.append({
+                'title': item.findtext("title") or '',
+                'link': item.findtext("link") or '',
+                'pubDate': item.findtext("pubDate") or '',
+                'source': item.findtext("source") or ''
+            })
+            if len(items) >= limit:
+                break
+            item.clear()
+    except etree.XMLSyntaxError:
+        pass
+    return items
+
+
+def iter_bing_results(text: str) -> Iterator[Dict]:
+    """
+    title, link and snippet of Bing's organic results (li.b_algo), in page order. The page is parsed incrementally,
+    so the rest of it is not parsed once the caller stops iterating.
+    """
+    if not text:
+        return
+    parser = etree.iterparse(io.BytesIO(text.encode("utf-8")), events=("end",), tag="li", html=True, encoding="utf-8")
+    try:
+        for _, li in parser:
+            if not _has_class(li, "b_algo"):
+                continue
+            title_elem = _first(li, ".//h2")
+            link_elem = _first(li, ".//a")
+            snippet_elem = _first(li, ".//div[contains(concat(' ', normalize-space(@class), ' '), ' b_caption ')]")
+            if title_elem is not None and link_elem is not None and snippet_elem is not None:
+                title = _text(title_elem)
+                link = link_elem.get('href', '')
+                snippet = _text(snippet_elem)
+                if title and link and snippet:
+                    yield {
+                        'title': title,
+                        'link': link,
+                        'snippet': snippet
+                    }
+    except etree.XMLSyntaxError:
+        return
+
+
+def parse_bing_results(text: str, limit: int = 5) -> List[Dict]:
+    """The first `limit` Bing results; parsing stops once they are collected"""
+    return list(islice(iter_bing_results(text), limit))
+
+
+def parse_homepage(text: str) -> Dict:
+    """
+    What the research tools read from a company homepage, in one walk over its title, meta, a and p elements:
+    {"title", "meta" (name and property, lowercased, to content; first wins), "social_links" (network to link),
+    "about" (first paragraph mentioning the company or "about")}
+    """
+    page = {"title": None, "meta": {}, "social_links": {}, "about": None}
+    try:
+        root = lxml.html.fromstring(text.encode("utf-8"), parser=lxml.html.HTMLParser(encoding="utf-8"))
+    except (etree.ParserError, ValueError):
+        return page
+    for element in root.iter("title", "meta", "a", "p"):
+        if element.tag == "meta":
+            for key in (element.get("name"), element.get("property")):
+                if key:
+                    page["meta"].setdefault(key.lower(), element.get("content", ""))
+        elif element.tag == "a":
+            href = element.get("href", "")
+            for network in _SOCIAL_NETWORKS:
+                if f"{network}.com" in href:
+                    page["social_links"][network] = href
+                    break
+        elif element.tag == "p":
+            if page["about"] is None:
+                p_text = _text(element)
+                if 'about' in p_text.lower() or 'company' in p_text.lower():
+                    page["about"] = p_text
+        elif page["title"] is None:
+            page["title"] = element.text
+    return page